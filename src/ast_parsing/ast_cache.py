@@ -0,0 +1,62 @@
+"""
+Cache of solidity_parser results, so a source code is parsed once per process and once ever across runs.
+
+Parse results are kept as pickled bytes, in memory (MEMORY_CACHE_SIZE most recent) and in CACHE_DIRECTORY (config.ini),
+keyed by source hash. Callers modify the returned AST (i.e. children.pop(0)), so every lookup unpickles a private copy
+of the AST, which is much faster than parsing the source code again. AST_CACHE_VERSION must be increased whenever the parser or the format of
+its results changes.
+"""
+
+import os
+import pickle
+from src.compilation.artifact_cache import get_cache_directory, get_source_hash, get_cached, get_memory_cache_size
+from src.utils.atomic_file import atomic_write
+from src.utils.lru_cache import LRUCache
+
+AST_CACHE_VERSION = '1'
+
+# parsing holds only the lock of its source hash, so unrelated sources are parsed concurrently
+parsed_sources = LRUCache(get_memory_cache_size())
+
+
+def get_ast_cache_file(source_hash):
+    return os.path.join(get_cache_directory('ast'), source_hash + '-v' + AST_CACHE_VERSION + '.pickle')
+
+
+def load_parsed_source(source_code, parse):
+    """
+    Returns source unit parsed by the parse function, parsing the source code only on cache miss.
+
+    Parameters:
+        source_code (str): source code to be parsed.
+        parse (function): parser of the source code i.e. solidity_parser parse.
+
+    Returns:
+        source_unit (dict): a private copy of the parsed source unit.
+    """
+    source_hash = get_source_hash(source_code)
+    source_bytes = get_cached(parsed_sources, ('ast', source_hash), lambda: get_source_bytes(source_hash, source_code, parse))
+    return pickle.loads(source_bytes)
+
+
+def get_source_bytes(source_hash, source_code, parse):
+    # parsed source unit from the cache directory, parsing the source code if it is not cached
+    cache_file = get_ast_cache_file(source_hash)
+    if os.path.isfile(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                source_bytes = f.read()
+            pickle.loads(source_bytes)
+            return source_bytes
+        except Exception as e:
+            print("Warning: Could not load cached AST -", e)
+    source_bytes = pickle.dumps(parse(source_code), protocol=pickle.HIGHEST_PROTOCOL)
+    save_parsed_source(cache_file, source_bytes)
+    return source_bytes
+
+
+def save_parsed_source(cache_file, source_bytes):
+    try:
+        atomic_write(cache_file, lambda f: f.write(source_bytes))
+    except Exception as e:
+        print("Warning: Could not save parsed AST -", e)
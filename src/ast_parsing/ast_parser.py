@@ -1,4 +1,9 @@
-from solidity_parser import parser as sol_parser # type: ignore
+from configparser import ConfigParser
+from src.ast_parsing.ast_cache import load_parsed_source
+from src.compilation.artifact_cache import get_source_ast, get_source_hash
+from src.utils.lru_cache import LRUCache
+from src.ast_parsing.solc_ast_converter import convert_source_unit
+from src.ast_parsing.symbol_table import build_symbol_table, get_linearization, c3_linearization
 
 """
 An Abstract Syntax Tree (AST) is a hierarchical, tree-like representation of the structure of source code.
@@ -31,9 +36,63 @@ FunctionDefinition
 Note : The original implementation and return results by sol_parser must be taken into account.
 
 """
-def generate_ast(code):
-    source_unit = sol_parser.parse(code)
-    children = source_unit['children'] # type: ignore
+# sources solc could not compile, so every later parse goes to solidity_parser without retrying the compilation
+solc_ast_failures = LRUCache(256)
+
+
+def get_parser_backend():
+    config = ConfigParser()
+    config.read("config.ini")
+    return config.get('ast', 'parser_backend', fallback='solidity_parser')
+
+
+def parse_with_solidity_parser(code, use_cache=True):
+    from solidity_parser import parser as sol_parser # type: ignore
+    # parse results are cached by source hash, every call gets its own copy of the AST
+    if use_cache:
+        source_unit = load_parsed_source(code, sol_parser.parse)
+    else:
+        source_unit = sol_parser.parse(code)
+    return source_unit['children'] # type: ignore
+
+
+def parse_with_solc(code, compiler_version=''):
+    # solc AST is cached with the compilation artifacts, conversion gives every call its own copy of the AST
+    source_ast = get_source_ast(code, compiler_version)
+    if source_ast == None:
+        raise ValueError("solc did not return an AST")
+    return convert_source_unit(source_ast)
+
+
+def generate_ast(code, use_cache=True, backend=None, compiler_version=''):
+    """
+    Returns AST children of the source unit in solidity_parser format and the compiler version from the pragma.
+
+    Parameters:
+        code (str): source code.
+        use_cache (bool): if True, solidity_parser results are reused from the AST cache.
+        backend (str): 'solc' (solc compact-json AST, solidity_parser if the source code does not compile) or
+            'solidity_parser', PARSER_BACKEND of [ast] section in config.ini if not provided. Layout only callers use
+            'solidity_parser', so they never resolve or install a compiler to parse.
+        compiler_version (str): compiler version for the solc backend, read from the pragma if empty.
+
+    Returns:
+        children (list): source unit members, pragma directive first.
+        compiler_version (str): pragma version of the source code.
+    """
+    if backend == None:
+        backend = get_parser_backend()
+    children = None
+    if backend == 'solc':
+        failure_key = (get_source_hash(code), compiler_version)
+        if solc_ast_failures.get(failure_key) == None:
+            try:
+                children = parse_with_solc(code, compiler_version)
+            except Exception as e:
+                solc_ast_failures.put(failure_key, str(e))
+                print("Warning: Could not get solc AST, parsing with solidity_parser -", e)
+    if children == None:
+        children = parse_with_solidity_parser(code, use_cache)
     try:
         compiler_version = children[0]['value']
     except:
@@ -99,110 +158,82 @@ def check_if_stmt(statement, definition, functions, variables, mappings):
     return functions, variables, mappings
 
 
-def parse_ast(children, cont_name):
+def parse_ast(children, cont_name=None, symbols=None):
+    """
+    Returns functions, state variables, base contracts and mappings of each contract, and functions declared by each
+    contract. State variables of a contract are its own and the inherited ones, mappings are all mappings of the
+    source unit (shared by all contracts). symbols is the symbol table of the children, built if not provided.
+    """
+    if symbols == None:
+        symbols = build_symbol_table(children)
+    mappings = symbols['mappings']
     all_contracts_details = {}
-    variables = []
-    state_vars = []
-    cont_names = []
-    mappings = []
     cont_functions = {}
-    for contract in children:
-        if contract == None:
-            continue
-        if contract['type'] == "ContractDefinition":
-            cont_names.append(contract['name'])
-        else:
-            continue
+    for contract_name, contract in symbols['contracts'].items():
         functions = []
-        func_names = []
-        func_var = []
-        parents = []
+        variables = []
         all_functions = {}
-        try:
-            sub_nodes = contract['subNodes']
-        except:
-            sub_nodes = []
-        for definition in sub_nodes:
-            #print(definition['type'])
-            if definition['type'] == 'StateVariableDeclaration':
-                dec_vars = definition['variables']
-                state_vars = state_vars + [var['name'] for var in dec_vars]
-            try:
-                if definition['type'] == 'StateVariableDeclaration':
-                    if definition['variables'][0]['typeName']['type'] == 'Mapping':
-                        key_type = definition['variables'][0]['typeName']['keyType']['name']
-                        #print("key type", key_type)
-                        mappings.append([definition['variables'][0]['name'], key_type])
-                        #mappings.append(definition['variables'][0]['name'])
-            except:
-                pass
+        # functions and modifiers, the only definitions with a body
+        for definition in symbols['functions'][contract_name]:
             if definition['type'] == "FunctionDefinition":
-                all_functions[definition['name']] =  definition
+                all_functions[definition['name']] = definition
                 functions.append(definition)
             try:
                 statements = definition['body']
                 if statements != []:
-                    functions, variables, mappings = check_ast_nodes(
+                    functions, variables, _ = check_ast_nodes(
                         statements, definition, functions, variables, mappings)
             except KeyError:
                 continue
             except:
-                pass      
+                pass
         # replaces duplicate names of functions
+        func_names = []
         for func in functions:
+            if func['name'] == None:
+                func['name'] = 'constructor'
             if func['name'] not in func_names:
-                if func['name'] == None:
-                    func['name'] = 'constructor'
                 func_names.append(func['name'])
-        # replaces duplicate func, var pairs
-        for var in variables:
-            if var not in func_var:
-                func_var.append(var)
-        if 'baseContracts' in contract:
-            if contract['baseContracts'] != []:
-                parents = contract['baseContracts']
-                for base_contract in contract['baseContracts']:
-                    tmp = base_contract['baseName']['namePath']
-                    if tmp not in cont_names:
-                        continue                
-                    base_vars = all_contracts_details[tmp]['vars']
-                    base_funcs = all_contracts_details[tmp]['fbody']
-                    for func in base_funcs:
-                        if func not in functions:
-                            functions.append(func)
-                        if func['name'] not in func_names:
-                            if func['name'] == None:
-                                func['name'] = 'constructor'
-                            func_names.append(func['name'])
-                    # func_names = func_names + [func['name'] for func in base_funcs ]
-                    for var in base_vars:
-                        if type(var) == list:
-                            var_list = var
-                            for v in var_list:
-                                if v not in state_vars:
-                                    state_vars.append(v)
-                        else:
-                            if var not in state_vars:
-                                state_vars.append(var)
-        state_vars = list(set(state_vars))
-        func_names = list(set(func_names))
-        all_contracts_details[contract['name']] = {
-            'func': func_names, 'vars': state_vars, 'parents': parents, 'fbody': functions, 'maps': mappings}
-        cont_functions[contract['name']] = all_functions
+        state_vars = [var['name'] for var in symbols['state_vars'][contract_name]]
+        parents = []
+        if contract.get('baseContracts'):
+            parents = contract['baseContracts']
+            # functions and state variables of base contracts (including their own bases) declared before the contract
+            added_funcs = set(id(func) for func in functions)
+            added_vars = set(state_vars)
+            for base_name in symbols['inherit_tree'][contract_name]:
+                if base_name not in all_contracts_details:
+                    continue
+                for func in all_contracts_details[base_name]['fbody']:
+                    if id(func) not in added_funcs:
+                        added_funcs.add(id(func))
+                        functions.append(func)
+                    if func['name'] == None:
+                        func['name'] = 'constructor'
+                    if func['name'] not in func_names:
+                        func_names.append(func['name'])
+                for var in all_contracts_details[base_name]['vars']:
+                    if var not in added_vars:
+                        added_vars.add(var)
+                        state_vars.append(var)
+        all_contracts_details[contract_name] = {
+            'func': func_names, 'vars': list(dict.fromkeys(state_vars)), 'parents': parents, 'fbody': functions, 'maps': mappings}
+        cont_functions[contract_name] = all_functions
     return all_contracts_details, cont_functions
 
 
 def find_diamond_for_class(tree, class_name):
-    # A recursive function to get all base classes for a given class
-    def all_bases(cls, accum=None):
-        if accum is None:
+    # number of inheritance paths from a class to each of its base classes, memoized for shared base classes
+    memo = {}
+    def all_bases(cls):
+        if cls not in memo:
             accum = {}
-        bases = tree.get(cls, [])
-        # print(cls, "->", bases)
-        for base in bases:
-            accum[base] = accum.get(base, 0) + 1
-            all_bases(base, accum)
-        return accum
+            for base in tree.get(cls, []):
+                accum[base] = accum.get(base, 0) + 1
+                for base_cls, count in all_bases(base).items():
+                    accum[base_cls] = accum.get(base_cls, 0) + count
+            memo[cls] = accum
+        return memo[cls]
 
     # Find if the specified class has any base classes included multiple times
     bases = all_bases(class_name)
@@ -210,34 +241,6 @@ def find_diamond_for_class(tree, class_name):
     return diamond_bases
 
 
-def merge(sequences):
-    """
-    Merges multiple sequences into a single C3 linearization, as per the C3 algorithm.
-    """
-    result = []
-    while True:
-        non_empty_seqs = [seq for seq in sequences if seq]
-        if not non_empty_seqs:
-            return result
-        for seq in non_empty_seqs:  # find merge candidates among seq heads
-            candidate = seq[0]
-            if not any(candidate in s[1:] for s in non_empty_seqs):
-                break
-        else:
-            raise Exception("Inconsistent hierarchy")
-        result.append(candidate)
-        for seq in non_empty_seqs:  # remove candidate
-            if seq[0] == candidate:
-                del seq[0]
-
-def c3_linearization(classname, tree):
-    """
-    Calculates the C3 linearization for a given class.
-    """
-    base_classes = tree.get(classname, [])
-    sequences = [c3_linearization(base_class, tree) for base_class in base_classes] + [base_classes + [classname]]
-    return merge(sequences)
-
 def unroll_struct(struct, all_contract_dict):
     '''Takes in a struct data type, returns list of variables in the struct'''
     var_lst = []
@@ -381,29 +384,28 @@ def variable_unrolling(subnodes, all_contracts_dict, all_vars):
             all_contracts_dict[node['name']] = {'vars': [var_dict]}
     return statevars, all_contracts_dict, all_vars
 
-def get_contract_details(children, contract_name):
+# returns vars of the contracts in order, without duplicates, vars are compared by value as they are dicts
+def merge_parent_vars(parent_names, all_contracts_dict):
+    parent_vars = []
+    added_vars = set()
+    for parent_cont_name in parent_names:
+        for var in all_contracts_dict[parent_cont_name]['vars']:
+            var_list = var if type(var) == list else [var]
+            for va in var_list:
+                var_key = repr(va)
+                if var_key not in added_vars:
+                    added_vars.add(var_key)
+                    parent_vars.append(va)
+    return parent_vars
+
+def get_contract_details(children, contract_name, symbols=None):
     all_vars = []
     all_contracts_dict = {}
-    inherit_tree = {}
     linearized_inherit_tree = {}
-    # print("children", children)
-    for contract in children:
-        if contract == None:
-            continue
-        try:
-            sub_nodes = contract['subNodes']
-        except:
-            sub_nodes = []
-        if contract['type'] == 'PragmaDirective':
-            continue
-        if 'baseContracts' in contract:
-            if contract['baseContracts'] != []:
-                lst = contract['baseContracts']
-                parent_list = []
-                for basecontract in lst:
-                    parent_list.append(basecontract['baseName']['namePath'])
-                inherit_tree[contract['name']] = parent_list
-                
+    if symbols == None:
+        symbols = build_symbol_table(children)
+    inherit_tree = symbols['inherit_tree']
+
     diamonds = find_diamond_for_class(inherit_tree, contract_name)
     if diamonds:
         print("************************************")
@@ -412,15 +414,12 @@ def get_contract_details(children, contract_name):
     else:
         print(f"No diamond inheritance detected for class {contract_name}.")
     for cont in inherit_tree:
-        temp = c3_linearization(cont, inherit_tree)
-        linearized_inherit_tree[cont] = temp[:-1]
+        linearized_inherit_tree[cont] = get_linearization(symbols, cont)[:-1]
 
-    for contract in children:
+    for contract in symbols['units']:
         parent = []
-        if contract == None:
-            continue
-        if 'subNodes' in contract: #contract definition
-            sub_nodes = contract['subNodes']
+        if 'subNodes' in contract: #contract definition, only its state variable, struct and enum declarations
+            sub_nodes = symbols['declarations'][contract['name']]
         elif 'members' in contract: # struct definition
             if contract['type'] == 'EnumDefinition':
                 var_dict = {}
@@ -434,25 +433,14 @@ def get_contract_details(children, contract_name):
             continue
         else: # unknown case
             sub_nodes = []
-        if contract['type'] == 'PragmaDirective':
-            continue
         state_vars, all_contracts_dict, all_vars = variable_unrolling(
             sub_nodes, all_contracts_dict, all_vars)
         if 'baseContracts' in contract:
             if contract['baseContracts'] != []:
                     lst = linearized_inherit_tree[contract['name']]
                     parent_vars = []
-                    for parent_cont_name in lst:
-                        if len(all_contracts_dict) != 0:
-                            b_statevars = all_contracts_dict[parent_cont_name]['vars']
-                            for var in b_statevars:
-                                if type(var) == list:
-                                    for va in var:
-                                        if va not in parent_vars:
-                                            parent_vars.append(va)
-                                else:
-                                    if var not in parent_vars:
-                                        parent_vars.append(var)
+                    if len(all_contracts_dict) != 0:
+                        parent_vars = merge_parent_vars(lst, all_contracts_dict)
                     state_vars = parent_vars + state_vars
                     parent = lst
 
@@ -648,8 +636,9 @@ def get_contract_details_new(contracts, contract_name):
     else:
         print(f"No diamond inheritance detected for class {contract_name}.")
 
+    linearizations = {}
     for cont in inherit_tree:
-        temp = c3_linearization(cont, inherit_tree)
+        temp = c3_linearization(cont, inherit_tree, linearizations)
         linearized_inherit_tree[cont] = temp[:-1]
     # print(linearized_inherit_tree)
 
@@ -675,17 +664,8 @@ def get_contract_details_new(contracts, contract_name):
                 # if contract['name'] == contract_name:
                     lst = linearized_inherit_tree[contract['name']]
                     parent_vars = []
-                    for parent_cont_name in lst:
-                        if len(all_contracts_dict) != 0:
-                            b_statevars = all_contracts_dict[parent_cont_name]['vars']
-                            for var in b_statevars:
-                                if type(var) == list:
-                                    for va in var:
-                                        if va not in parent_vars:
-                                            parent_vars.append(va)
-                                else:
-                                    if var not in parent_vars:
-                                        parent_vars.append(var)
+                    if len(all_contracts_dict) != 0:
+                        parent_vars = merge_parent_vars(lst, all_contracts_dict)
                     state_vars = parent_vars + state_vars
                     parent = lst
             # else:
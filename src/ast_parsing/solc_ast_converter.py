@@ -0,0 +1,240 @@
+"""
+Converts solc compact-json AST (ast output of standard-json compilation) into the AST format of solidity_parser.
+
+parse_ast, get_contract_details, the key analysis scope and function fingerprints all read solidity_parser ASTs, so
+the solc AST is converted to the same shape instead of duplicating every consumer (as get_contract_details_new
+does). Nodes are converted the way solidity_parser parses them, i.e. assignments are binary operations, contract state
+variables are StateVariableDeclaration nodes, constructors have no name and array lengths are number literals. Nodes
+without a solidity_parser counterpart only keep their type and their converted child nodes.
+"""
+
+# solidity_parser names string literals 'stringLiteral'
+LITERAL_KINDS = {'number': 'NumberLiteral', 'bool': 'BooleanLiteral', 'string': 'stringLiteral',
+                 'unicodeString': 'stringLiteral', 'hexString': 'HexLiteral'}
+
+
+def convert_nodes(nodes):
+    return [convert_node(node) for node in nodes]
+
+
+def convert_type_name(type_name):
+    if type_name == None:
+        return None
+    node_type = type_name['nodeType']
+    if node_type == 'ElementaryTypeName':
+        elementary = {'type': 'ElementaryTypeName', 'name': type_name['name']}
+        if type_name.get('stateMutability') == 'payable':
+            elementary['stateMutability'] = 'payable'
+        return elementary
+    if node_type == 'UserDefinedTypeName':
+        try:
+            name_path = type_name['pathNode']['name']
+        except:
+            name_path = type_name.get('name')
+        return {'type': 'UserDefinedTypeName', 'namePath': name_path}
+    if node_type == 'Mapping':
+        return {'type': 'Mapping', 'keyType': convert_type_name(type_name['keyType']),
+                'valueType': convert_type_name(type_name['valueType'])}
+    if node_type == 'ArrayTypeName':
+        return {'type': 'ArrayTypeName', 'baseTypeName': convert_type_name(type_name['baseType']),
+                'length': convert_node(type_name.get('length'))}
+    return {'type': node_type}
+
+
+def convert_parameters(parameter_list):
+    if parameter_list == None:
+        return None
+    parameters = []
+    for param in parameter_list.get('parameters', []):
+        storage_location = param.get('storageLocation')
+        parameters.append({'type': 'Parameter', 'typeName': convert_type_name(param.get('typeName')),
+                           'name': param['name'] or None, 'storageLocation': None if storage_location == 'default' else storage_location,
+                           'isStateVar': False, 'isIndexed': param.get('indexed', False)})
+    return {'type': 'ParameterList', 'parameters': parameters}
+
+
+def convert_variable(variable, is_state_var=False):
+    if variable == None:
+        return None
+    return {'type': 'VariableDeclaration', 'typeName': convert_type_name(variable.get('typeName')),
+            'name': variable['name'], 'expression': convert_node(variable.get('value')),
+            'visibility': variable.get('visibility'), 'storageLocation': variable.get('storageLocation'),
+            'isStateVar': is_state_var, 'isDeclaredConst': variable.get('constant', False),
+            'isDeclaredImmutable': variable.get('mutability') == 'immutable', 'isIndexed': variable.get('indexed', False)}
+
+
+def convert_contract(contract):
+    base_contracts = []
+    for base in contract.get('baseContracts', []):
+        arguments = base.get('arguments')
+        base_contracts.append({'type': 'InheritanceSpecifier', 'baseName': convert_type_name(base['baseName']),
+                               'arguments': convert_nodes(arguments) if arguments else None})
+    return {'type': 'ContractDefinition', 'name': contract['name'], 'kind': contract.get('contractKind'),
+            'baseContracts': base_contracts, 'subNodes': convert_nodes(contract.get('nodes', []))}
+
+
+def convert_function(function):
+    # constructors declared with the constructor keyword have no name, old style constructors keep the contract name
+    name = function['name']
+    kind = function.get('kind')
+    if name == '' and (kind == 'constructor' or function.get('isConstructor')):
+        name = None
+    elif name == '' and kind in ['fallback', 'receive']:
+        name = kind
+    return_parameters = convert_parameters(function.get('returnParameters'))
+    if return_parameters == None or len(return_parameters['parameters']) == 0:
+        return_parameters = []
+    return {'type': 'FunctionDefinition', 'name': name, 'parameters': convert_parameters(function.get('parameters')),
+            'returnParameters': return_parameters, 'body': convert_node(function.get('body')),
+            'visibility': function.get('visibility'), 'modifiers': convert_nodes(function.get('modifiers', [])),
+            'isConstructor': name == None, 'isFallback': kind == 'fallback' or name == '', 'isReceive': kind == 'receive',
+            'stateMutability': function.get('stateMutability')}
+
+
+def convert_literal(literal):
+    literal_type = LITERAL_KINDS.get(literal.get('kind'), 'StringLiteral')
+    if literal_type == 'NumberLiteral':
+        return {'type': 'NumberLiteral', 'number': literal['value'], 'subdenomination': literal.get('subdenomination')}
+    if literal_type == 'BooleanLiteral':
+        return {'type': 'BooleanLiteral', 'value': literal['value'] == 'true'}
+    if literal_type == 'HexLiteral':
+        return {'type': 'HexLiteral', 'value': literal.get('hexValue')}
+    return {'type': 'stringLiteral', 'value': literal.get('value')}
+
+
+def convert_generic(node):
+    # keeps child nodes of unsupported nodes, so walkers of the AST still see their expressions and calls
+    converted = {'type': node['nodeType']}
+    for key in node:
+        if isinstance(node[key], dict) and 'nodeType' in node[key]:
+            converted[key] = convert_node(node[key])
+        elif isinstance(node[key], list) and any(isinstance(child, dict) and 'nodeType' in child for child in node[key]):
+            converted[key] = [convert_node(child) if isinstance(child, dict) else child for child in node[key]]
+    return converted
+
+
+def convert_node(node):
+    """
+    Returns solidity_parser AST of the solc AST node.
+
+    Parameters:
+        node (dict): solc compact-json AST node.
+
+    Returns:
+        stmt (dict): converted node, None if node is None.
+    """
+    if node == None:
+        return None
+    node_type = node['nodeType']
+    # source unit members
+    if node_type == 'PragmaDirective':
+        literals = node.get('literals', [])
+        return {'type': 'PragmaDirective', 'name': literals[0] if len(literals) > 0 else '', 'value': ''.join(literals[1:])}
+    if node_type == 'ImportDirective':
+        return {'type': 'ImportDirective', 'path': node.get('file')}
+    if node_type == 'ContractDefinition':
+        return convert_contract(node)
+    if node_type == 'StructDefinition':
+        return {'type': 'StructDefinition', 'name': node['name'],
+                'members': [convert_variable(member) for member in node.get('members', [])]}
+    if node_type == 'EnumDefinition':
+        return {'type': 'EnumDefinition', 'name': node['name'],
+                'members': [{'type': 'EnumValue', 'name': member['name']} for member in node.get('members', [])]}
+    if node_type == 'VariableDeclaration':
+        if node.get('stateVariable'):
+            variable = convert_variable(node, True)
+            return {'type': 'StateVariableDeclaration', 'variables': [variable], 'initialValue': variable['expression']}
+        return convert_variable(node)
+    if node_type == 'FunctionDefinition':
+        return convert_function(node)
+    if node_type == 'ModifierDefinition':
+        return {'type': 'ModifierDefinition', 'name': node['name'], 'parameters': convert_parameters(node.get('parameters')),
+                'body': convert_node(node.get('body'))}
+    if node_type == 'ModifierInvocation':
+        return {'type': 'ModifierInvocation', 'name': node['modifierName'].get('name'),
+                'arguments': convert_nodes(node.get('arguments') or [])}
+    if node_type == 'EventDefinition':
+        return {'type': 'EventDefinition', 'name': node['name'], 'parameters': convert_parameters(node.get('parameters'))}
+    # statements
+    if node_type in ['Block', 'UncheckedBlock']:
+        return {'type': 'Block', 'statements': convert_nodes(node.get('statements', []))}
+    if node_type == 'ExpressionStatement':
+        return {'type': 'ExpressionStatement', 'expression': convert_node(node['expression'])}
+    if node_type == 'VariableDeclarationStatement':
+        return {'type': 'VariableDeclarationStatement',
+                'variables': [convert_variable(variable) for variable in node.get('declarations', [])],
+                'initialValue': convert_node(node.get('initialValue'))}
+    if node_type == 'IfStatement':
+        return {'type': 'IfStatement', 'condition': convert_node(node['condition']),
+                'TrueBody': convert_node(node.get('trueBody')), 'FalseBody': convert_node(node.get('falseBody'))}
+    if node_type == 'ForStatement':
+        return {'type': 'ForStatement', 'initExpression': convert_node(node.get('initializationExpression')),
+                'conditionExpression': convert_node(node.get('condition')),
+                'loopExpression': convert_node(node.get('loopExpression')), 'body': convert_node(node.get('body'))}
+    if node_type in ['WhileStatement', 'DoWhileStatement']:
+        return {'type': node_type, 'condition': convert_node(node['condition']), 'body': convert_node(node.get('body'))}
+    if node_type == 'Return':
+        return {'type': 'ReturnStatement', 'expression': convert_node(node.get('expression'))}
+    if node_type == 'EmitStatement':
+        return {'type': 'EmitStatement', 'eventCall': convert_node(node['eventCall'])}
+    if node_type == 'PlaceholderStatement':
+        return {'type': 'PlaceholderStatement'}
+    if node_type in ['Break', 'Continue', 'Throw']:
+        return {'type': node_type + 'Statement'}
+    if node_type == 'InlineAssembly':
+        return {'type': 'InlineAssemblyStatement'}
+    # expressions
+    if node_type == 'Identifier':
+        return {'type': 'Identifier', 'name': node['name']}
+    if node_type == 'Literal':
+        return convert_literal(node)
+    if node_type == 'MemberAccess':
+        return {'type': 'MemberAccess', 'expression': convert_node(node['expression']), 'memberName': node['memberName']}
+    if node_type == 'IndexAccess':
+        return {'type': 'IndexAccess', 'base': convert_node(node['baseExpression']),
+                'index': convert_node(node.get('indexExpression'))}
+    if node_type == 'FunctionCall':
+        return {'type': 'FunctionCall', 'expression': convert_node(node['expression']),
+                'arguments': convert_nodes(node.get('arguments', [])), 'names': node.get('names', [])}
+    if node_type == 'FunctionCallOptions':
+        # call options (i.e. {value: amount}) are not part of solidity_parser AST
+        return convert_node(node['expression'])
+    if node_type == 'Assignment':
+        return {'type': 'BinaryOperation', 'operator': node['operator'], 'left': convert_node(node['leftHandSide']),
+                'right': convert_node(node['rightHandSide'])}
+    if node_type == 'BinaryOperation':
+        return {'type': 'BinaryOperation', 'operator': node['operator'], 'left': convert_node(node['leftExpression']),
+                'right': convert_node(node['rightExpression'])}
+    if node_type == 'UnaryOperation':
+        return {'type': 'UnaryOperation', 'operator': node['operator'], 'subExpression': convert_node(node['subExpression']),
+                'isPrefix': node.get('prefix', True)}
+    if node_type == 'TupleExpression':
+        return {'type': 'TupleExpression', 'components': convert_nodes(node.get('components', [])),
+                'isArray': node.get('isInlineArray', False)}
+    if node_type == 'Conditional':
+        return {'type': 'Conditional', 'condition': convert_node(node['condition']),
+                'TrueExpression': convert_node(node['trueExpression']), 'FalseExpression': convert_node(node['falseExpression'])}
+    if node_type == 'NewExpression':
+        return {'type': 'NewExpression', 'typeName': convert_type_name(node.get('typeName'))}
+    if node_type == 'ElementaryTypeNameExpression':
+        # older compilers give the type name as a string
+        type_name = node['typeName']
+        if isinstance(type_name, dict):
+            type_name = type_name['name']
+        return {'type': 'ElementaryTypeNameExpression', 'typeName': {'type': 'ElementaryTypeName', 'name': type_name}}
+    if node_type in ['ElementaryTypeName', 'UserDefinedTypeName', 'Mapping', 'ArrayTypeName']:
+        return convert_type_name(node)
+    return convert_generic(node)
+
+
+def convert_source_unit(source_unit):
+    """
+    Returns children of the solc source unit in solidity_parser format, as returned by solidity_parser parse.
+
+    Parameters:
+        source_unit (dict): solc compact-json AST of the source unit.
+
+    Returns:
+        children (list): converted source unit members, in source order.
+    """
+    return convert_nodes(source_unit.get('nodes', []))
@@ -0,0 +1,105 @@
+"""
+Symbol table of a source unit, built in one pass over the solidity_parser AST children.
+
+Contracts, their functions and declarations, state variables, mappings and the inheritance tree are indexed by name.
+The table is built once per analysis and passed to parse_ast, get_contract_details and the key analysis scope, which
+look them up instead of walking the children again. C3 linearizations are memoized, so every base contract of a deep
+hierarchy is linearized once.
+"""
+
+DECLARATION_TYPES = ['StateVariableDeclaration', 'StructDefinition', 'EnumDefinition']
+
+
+def add_mapping(variable, mappings):
+    # mappings are saved with name and key type, only elementary key types (as in parse_ast)
+    try:
+        if variable['typeName']['type'] == 'Mapping':
+            mappings.append([variable['name'], variable['typeName']['keyType']['name']])
+    except:
+        pass
+
+
+def build_symbol_table(children):
+    """
+    Returns symbol table of the source unit.
+
+    Parameters:
+        children (list): AST children of the source unit (generate_ast results, pragma directive may be removed).
+
+    Returns:
+        symbols (dict):
+            'units' (list): top level definitions (contracts, structs, enums...) in source order, without pragma.
+            'contracts' (dict): contract name to ContractDefinition node, in source order.
+            'functions' (dict): contract name to FunctionDefinition and ModifierDefinition nodes of the contract.
+            'declarations' (dict): contract name to its state variable, struct and enum declarations, in source order.
+            'state_vars' (dict): contract name to VariableDeclaration nodes of the contract state variables.
+            'mappings' (list): name and key type of all mappings in the source unit, in source order.
+            'inherit_tree' (dict): contract name to names of its direct base contracts, for contracts with bases.
+            'linearizations' (dict): memoized C3 linearizations (get_linearization).
+    """
+    symbols = {'units': [], 'contracts': {}, 'functions': {}, 'declarations': {}, 'state_vars': {}, 'mappings': [],
+               'inherit_tree': {}, 'linearizations': {}}
+    for child in children:
+        if child == None or child['type'] == 'PragmaDirective':
+            continue
+        symbols['units'].append(child)
+        if child['type'] != 'ContractDefinition':
+            continue
+        name = child['name']
+        symbols['contracts'][name] = child
+        symbols['functions'][name] = []
+        symbols['declarations'][name] = []
+        symbols['state_vars'][name] = []
+        if child.get('baseContracts'):
+            symbols['inherit_tree'][name] = [base['baseName']['namePath'] for base in child['baseContracts']]
+        for sub_node in child.get('subNodes') or []:
+            if sub_node == None:
+                continue
+            if sub_node['type'] in ['FunctionDefinition', 'ModifierDefinition']:
+                symbols['functions'][name].append(sub_node)
+            elif sub_node['type'] in DECLARATION_TYPES:
+                symbols['declarations'][name].append(sub_node)
+                if sub_node['type'] == 'StateVariableDeclaration':
+                    for variable in sub_node['variables']:
+                        symbols['state_vars'][name].append(variable)
+                    add_mapping(sub_node['variables'][0], symbols['mappings'])
+    return symbols
+
+
+def merge(sequences):
+    """
+    Merges multiple sequences into a single C3 linearization, as per the C3 algorithm.
+    """
+    result = []
+    while True:
+        non_empty_seqs = [seq for seq in sequences if seq]
+        if not non_empty_seqs:
+            return result
+        for seq in non_empty_seqs:  # find merge candidates among seq heads
+            candidate = seq[0]
+            if not any(candidate in s[1:] for s in non_empty_seqs):
+                break
+        else:
+            raise Exception("Inconsistent hierarchy")
+        result.append(candidate)
+        for seq in non_empty_seqs:  # remove candidate
+            if seq[0] == candidate:
+                del seq[0]
+
+
+def c3_linearization(classname, tree, memo=None):
+    """
+    Calculates the C3 linearization for a given class, linearizations of base classes are saved in memo (if provided).
+    """
+    if memo == None:
+        memo = {}
+    if classname not in memo:
+        base_classes = tree.get(classname, [])
+        sequences = [c3_linearization(base_class, tree, memo) for base_class in base_classes] + [base_classes + [classname]]
+        memo[classname] = merge(sequences)
+    return list(memo[classname])
+
+
+def get_linearization(symbols, contract_name):
+    """Returns C3 linearization of the contract (base contracts first, contract last)."""
+    return c3_linearization(contract_name, symbols['inherit_tree'], symbols['linearizations'])
@@ -0,0 +1,215 @@
+"""
+Content-addressed cache of compilation artifacts.
+
+Artifacts are keyed by (source hash, compiler version, requested outputs) and produced by one standard-JSON
+compilation that requests only those outputs. Every caller (ABI generation, solc AST fallback and storage layout)
+requests the same outputs, so a source code is compiled once and every later call is a cache hit, in memory or from
+CACHE_DIRECTORY (config.ini) across runs.
+
+Slither needs bytecode and source map outputs as well, so key approximation analysis compiles once with
+SLITHER_OUTPUTS and Slither is built from those artifacts (cached_platform.py) without running solc again. Later calls
+requesting the default outputs reuse these artifacts instead of compiling again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from configparser import ConfigParser
+from packaging.version import Version
+from src.compilation.compiler_resolver import resolve_compiler, get_pragma_version, parse_compiler_version
+from src.utils.lru_cache import LRUCache
+from src.utils.atomic_file import atomic_write
+
+DEFAULT_OUTPUTS = ('abi', 'ast', 'storageLayout')
+SLITHER_OUTPUTS = DEFAULT_OUTPUTS + ('devdoc', 'evm.bytecode', 'evm.deployedBytecode', 'userdoc')
+SOURCE_NAME = '<stdin>'
+# compiler version from which solc provides the storageLayout output
+STORAGE_LAYOUT_MIN_VERSION = Version('0.5.13')
+
+MEMORY_CACHE_SIZE = 32
+
+
+def get_memory_cache_size():
+    config = ConfigParser()
+    config.read("config.ini")
+    return config.getint('cache', 'memory_cache_size', fallback=MEMORY_CACHE_SIZE)
+
+
+# in memory caches are bounded, as the service keeps the process running
+artifacts_cache = LRUCache(get_memory_cache_size())
+crytic_compile_cache = LRUCache(get_memory_cache_size())
+# a lock per key, so a slow compilation only blocks callers waiting for the same artifacts
+key_locks = {}
+cache_lock = threading.Lock()
+
+
+def get_cached(cache, key, create):
+    """Returns cached value of the key, create() is called by one caller of the key at a time on cache miss."""
+    value = cache.get(key)
+    if value != None:
+        return value
+    with cache_lock:
+        key_lock = key_locks.setdefault(key, threading.Lock())
+    try:
+        with key_lock:
+            value = cache.get(key)
+            if value == None:
+                value = cache.put(key, create())
+    finally:
+        with cache_lock:
+            if key_locks.get(key) is key_lock:
+                del key_locks[key]
+    return value
+
+
+def get_cache_directory(sub_dir):
+    config = ConfigParser()
+    config.read("config.ini")
+    cache_dir = os.path.join(config.get('cache', 'cache_directory', fallback='.smartmuv_cache/'), sub_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def get_source_hash(source_code):
+    return hashlib.sha256(source_code.encode("utf-8")).hexdigest()
+
+
+# removes outputs not supported by the compiler version
+def get_supported_outputs(outputs, version):
+    supported = []
+    for output in outputs:
+        if output == 'storageLayout':
+            try:
+                if Version(version) < STORAGE_LAYOUT_MIN_VERSION:
+                    continue
+            except Exception:
+                continue
+        supported.append(output)
+    return tuple(sorted(supported))
+
+
+def supports_storage_layout(source_code, compiler_version=''):
+    """Returns True if the required compiler provides storageLayout, checked without resolving or installing it."""
+    version = parse_compiler_version(compiler_version or get_pragma_version(source_code))
+    try:
+        return Version(version) >= STORAGE_LAYOUT_MIN_VERSION
+    except Exception:
+        return False
+
+
+def compile_standard_json(source_code, compiler, outputs):
+    from solcx import compile_standard
+    contract_outputs = [output for output in outputs if output != 'ast']
+    output_selection = {'*': {'*': contract_outputs}}
+    if 'ast' in outputs:
+        output_selection['*'][''] = ['ast']
+    input_json = {
+        'language': 'Solidity',
+        'sources': {SOURCE_NAME: {'content': source_code}},
+        'settings': {'outputSelection': output_selection},
+    }
+    compiled = compile_standard(input_json, solc_binary=compiler['solc_binary'])
+    artifacts = {'version': compiler['version'], 'outputs': list(outputs), 'contracts': {}, 'ast': None}
+    for source_name in compiled.get('contracts', {}):
+        for contract_name, details in compiled['contracts'][source_name].items():
+            artifacts['contracts'][contract_name] = details
+    if SOURCE_NAME in compiled.get('sources', {}):
+        artifacts['ast'] = compiled['sources'][SOURCE_NAME].get('ast')
+    return artifacts
+
+
+def get_compilation_artifacts(source_code, compiler_version='', outputs=DEFAULT_OUTPUTS):
+    """
+    Returns compilation artifacts of the source code, compiling it only on cache miss.
+
+    Parameters:
+        source_code (str): source code of the contract.
+        compiler_version (str): required compiler version or pragma, if empty it is read from the source code pragma.
+        outputs (tuple): required compiler outputs i.e. abi, ast and storageLayout.
+
+    Returns:
+        artifacts (dict): compiler version, requested outputs of all contracts and the source AST.
+    """
+    compiler = resolve_compiler(compiler_version, source_code)
+    outputs = get_supported_outputs(outputs, compiler['version'])
+    key = ('artifacts', get_source_hash(source_code), compiler['version'], outputs)
+    slither_outputs = get_supported_outputs(SLITHER_OUTPUTS, compiler['version'])
+    if outputs != slither_outputs and set(outputs) <= set(slither_outputs):
+        # artifacts compiled for Slither contain every default output
+        artifacts = find_cached_artifacts(key[:3] + (slither_outputs,))
+        if artifacts != None:
+            return artifacts
+    return get_cached(artifacts_cache, key, lambda: load_compilation_artifacts(key, source_code, compiler, outputs))
+
+
+def get_artifacts_file(key):
+    return os.path.join(get_cache_directory('artifacts'), '-'.join([key[1], key[2]] + list(key[3])) + '.json')
+
+
+# returns artifacts of the key from memory or CACHE_DIRECTORY, None if they are not cached
+def find_cached_artifacts(key):
+    artifacts = artifacts_cache.get(key)
+    if artifacts != None:
+        return artifacts
+    cache_file = get_artifacts_file(key)
+    if os.path.isfile(cache_file):
+        with open(cache_file) as f:
+            return artifacts_cache.put(key, json.load(f))
+    return None
+
+
+def load_compilation_artifacts(key, source_code, compiler, outputs):
+    cache_file = get_artifacts_file(key)
+    if os.path.isfile(cache_file):
+        with open(cache_file) as f:
+            return json.load(f)
+    artifacts = compile_standard_json(source_code, compiler, outputs)
+    try:
+        atomic_write(cache_file, lambda f: json.dump(artifacts, f), 'w')
+    except Exception as e:
+        print("Warning: Could not save compilation artifacts -", e)
+    return artifacts
+
+
+def get_contract_abi(source_code, contract_name, compiler_version=''):
+    artifacts = get_compilation_artifacts(source_code, compiler_version)
+    return artifacts['contracts'][contract_name]['abi']
+
+
+# returns solc compact-json AST of the source unit
+def get_source_ast(source_code, compiler_version=''):
+    artifacts = get_compilation_artifacts(source_code, compiler_version)
+    return artifacts['ast']
+
+
+def get_crytic_compile(code_file, source_code, compiler_version=''):
+    """
+    Returns crytic-compile compilation of the source code for Slither, built from the cached compilation artifacts.
+
+    Parameters:
+        code_file (str): path of the source code file.
+        source_code (str): source code of the contract.
+        compiler_version (str): required compiler version or pragma.
+
+    Returns:
+        crytic_compile (object): CryticCompile object that can be passed to Slither in place of the file path.
+    """
+    compiler = resolve_compiler(compiler_version, source_code)
+    key = ('crytic_compile', get_source_hash(source_code), compiler['version'])
+    return get_cached(crytic_compile_cache, key, lambda: load_crytic_compile(code_file, source_code, compiler))
+
+
+def load_crytic_compile(code_file, source_code, compiler):
+    from crytic_compile import CryticCompile
+    try:
+        artifacts = get_compilation_artifacts(source_code, compiler['version'], SLITHER_OUTPUTS)
+    except Exception as e:
+        # compilers older than 0.4.11 have no standard-JSON interface, crytic-compile compiles them on its own
+        print("Warning: Could not compile standard-JSON artifacts for Slither -", e)
+        return CryticCompile(code_file, solc=compiler['slither_binary'])
+    from src.compilation.cached_platform import CachedSolc
+    crytic_compile = CryticCompile(CachedSolc(code_file, artifacts))
+    # source content is kept in memory, the source file is temporary
+    crytic_compile.src_content = {filename.absolute: source_code for filename in crytic_compile.filenames}
+    return crytic_compile
@@ -0,0 +1,26 @@
+from crytic_compile.compilation_unit import CompilationUnit
+from crytic_compile.compiler.compiler import CompilerVersion
+from crytic_compile.platform.solc import Solc
+from crytic_compile.platform.solc_standard_json import parse_standard_json_output
+
+
+class CachedSolc(Solc):
+    """
+    crytic-compile platform that loads the cached standard-JSON output of a source file instead of running solc.
+
+    Parameters:
+        code_file (str): path of the source code file, used as the source name of the compilation.
+        artifacts (dict): compilation artifacts (artifact_cache format) with bytecode and source map outputs.
+    """
+    def __init__(self, code_file, artifacts):
+        super().__init__(code_file)
+        self.artifacts = artifacts
+
+    def compile(self, crytic_compile, **kwargs):
+        compilation_unit = CompilationUnit(crytic_compile, 'cached_standard_json')
+        compilation_unit.compiler_version = CompilerVersion(compiler='solc', version=self.artifacts['version'], optimized=False)
+        targets_json = {
+            'sources': {self.target: {'id': 0, 'ast': self.artifacts['ast']}},
+            'contracts': {self.target: self.artifacts['contracts']},
+        }
+        parse_standard_json_output(targets_json, compilation_unit)
@@ -0,0 +1,113 @@
+"""
+Resolves the Solidity compiler required by a source code to the path of a locally cached solc binary.
+
+Resolved binary paths are passed explicitly to solc compilation and Slither, so the global solcx/solc-select
+versions are never switched and contracts with different pragmas can be analyzed concurrently.
+
+i.e
+
+resolve_compiler('^0.4.24') -> {'version': '0.4.24', 'solc_binary': '~/.solcx/solc-v0.4.24', 'slither_binary': '~/.solc-select/artifacts/solc-0.4.24/solc-0.4.24'}
+"""
+
+import os
+import re
+import threading
+
+resolved_compilers = {}
+resolve_lock = threading.Lock()
+
+
+# returns version string of the solidity pragma of the source code i.e. '^0.4.24'
+def get_pragma_version(source_code):
+    pragma = re.search(r'pragma\s+solidity\s+([^;]+);', source_code)
+    if pragma == None:
+        return ''
+    return pragma.group(1).strip()
+
+
+# converts pragma version i.e. '>=0.4.22 <0.6.0' or '^0.4.24' to a single compiler version
+def parse_compiler_version(compiler_version):
+    if compiler_version == '':
+        return ''
+    for i in range(len(compiler_version)):
+        if compiler_version[i].isdigit():
+            compiler_version = compiler_version[i:]
+            break
+    for i in range(len(compiler_version)):
+        if not compiler_version[len(compiler_version)-i-1].isdigit():
+            compiler_version = compiler_version[:len(compiler_version)-i-1]
+            break
+        else:
+            break
+    if len(compiler_version.split('<=')) > 1:
+        compiler_version = compiler_version.split('<=')[1]
+    if len(compiler_version.split('<')) > 1:
+        compiler_version = compiler_version.split('<')[1]
+    compiler_version = compiler_version.split('>')[0]
+    compiler_version = compiler_version.split('^')[0]
+    compiler_version = compiler_version.strip()
+    if compiler_version.count('.') == 1:
+        compiler_version += '.0'
+    return compiler_version
+
+
+def get_solcx_binary(version):
+    import solcx
+    # solcx does not provide compilers older than 0.4.11
+    if '0.3' in version:
+        version = '0.4.11'
+    if '0.4.1' in version and len(version) <= 5:
+        version = '0.4.11'
+    try:
+        return str(solcx.get_executable(version))
+    except Exception:
+        solcx.install_solc(version)
+        return str(solcx.get_executable(version))
+
+
+def get_solc_select_binary(version):
+    from solc_select import solc_select
+    from solc_select.constants import ARTIFACTS_DIR
+    if '0.3' in version:
+        version = '0.4.0'
+    paths = [os.path.join(ARTIFACTS_DIR, f"solc-{version}", f"solc-{version}"), os.path.join(ARTIFACTS_DIR, f"solc-{version}")]
+    for path in paths:
+        if os.path.isfile(path):
+            return path
+    solc_select.install_artifacts([version])
+    for path in paths:
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def resolve_compiler(compiler_version, source_code=None):
+    """
+    Maps the required compiler version to locally cached solc binaries, installing them if not available.
+
+    Parameters:
+        compiler_version (str): required compiler version or pragma, if empty it is read from the source code pragma.
+        source_code (str): source code of the contract (optional).
+
+    Returns:
+        compiler (dict): resolved version, solc binary path for compilation and solc binary path for Slither.
+    """
+    if compiler_version == '' and source_code != None:
+        compiler_version = get_pragma_version(source_code)
+    version = parse_compiler_version(compiler_version)
+    if version in resolved_compilers:
+        return resolved_compilers[version]
+    with resolve_lock:
+        if version not in resolved_compilers:
+            compiler = {'version': version}
+            compiler['solc_binary'] = get_solcx_binary(version)
+            # solc-select provides compilers older than 0.4.11, solcx binary is used if it is not available
+            try:
+                compiler['slither_binary'] = get_solc_select_binary(version)
+            except Exception as e:
+                print('solc-select -', str(e))
+                compiler['slither_binary'] = None
+            if compiler['slither_binary'] == None:
+                compiler['slither_binary'] = compiler['solc_binary']
+            resolved_compilers[version] = compiler
+    return resolved_compilers[version]
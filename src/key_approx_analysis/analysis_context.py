@@ -0,0 +1,29 @@
+class AnalysisContext:
+    """
+    State of reach analysis of one function, passed explicitly to the node handlers instead of being kept in module
+    or function attributes, so functions can be analyzed concurrently in threads and processes.
+
+    Parameters:
+        cont_mappings (list): list of all detected state contract mappings.
+        summaries (dict): summaries of called functions by function name (function_summary), applied at call sites.
+    """
+    def __init__(self, cont_mappings, summaries=None):
+        self.maps = set(cont_mappings)
+        self.summaries = summaries or {}
+        self.marked_nodes = []
+        self.marked = set()
+
+    def mark_node(self, node_id, var_expr, resolved=None):
+        # marks node where a mapping (or its reference) is modified, for back tracking
+        # resolved keys (of marks synthesized from summaries at call sites) are not back tracked
+        if not resolved:
+            resolved = None
+        mark_key = (node_id, var_expr, repr(resolved))
+        if mark_key in self.marked:
+            return
+        if var_expr.split(':')[0] in self.maps:
+            self.marked.add(mark_key)
+            if resolved != None:
+                self.marked_nodes.append([node_id, var_expr, resolved])
+            else:
+                self.marked_nodes.append([node_id, var_expr])
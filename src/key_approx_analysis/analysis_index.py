@@ -0,0 +1,66 @@
+"""
+Indexes used by key approximation analysis, so contracts, functions and function ASTs are looked up by name instead
+of scanning Slither contracts and function lists for every analyzed function.
+
+Function index of a Slither object is built once and shared by all analyses using the same Slither object.
+"""
+
+import collections
+import threading
+import weakref
+
+function_indexes = weakref.WeakKeyDictionary()
+index_lock = threading.Lock()
+
+
+def build_function_index(slither):
+    """
+    Returns contract name -> function name -> Slither function index, if names repeat the last one is indexed.
+    """
+    function_index = {}
+    for cont in slither.contracts:
+        if cont.name not in function_index:
+            function_index[cont.name] = {}
+        for func in cont.functions:
+            function_index[cont.name][func.name] = func
+    return function_index
+
+
+def get_function_index(slither):
+    with index_lock:
+        try:
+            if slither not in function_indexes:
+                function_indexes[slither] = build_function_index(slither)
+            return function_indexes[slither]
+        except TypeError:
+            # object can not be weakly referenced, index is not shared
+            return build_function_index(slither)
+
+
+def build_ast_index(functions_ast):
+    """
+    Returns contract name -> function name -> ASTs of functions with that name (in their order in the source code).
+
+    Parameters:
+        functions_ast (dict): contract name to list of function ASTs (fbody of parse_ast results).
+
+    Returns:
+        ast_index (dict): function ASTs indexed by contract and function name.
+    """
+    ast_index = {}
+    for contract in functions_ast:
+        ast_index[contract] = {}
+        for func in functions_ast[contract]:
+            if func['name'] not in ast_index[contract]:
+                ast_index[contract][func['name']] = collections.deque()
+            ast_index[contract][func['name']].append(func)
+    return ast_index
+
+
+def pop_function_ast(ast_index, contract, func_name):
+    """Returns first not yet analyzed AST of the function and removes it from the index."""
+    func_asts = ast_index.get(contract, {}).get(func_name)
+    if func_asts == None or len(func_asts) == 0:
+        print("func:", func_name, "ast not found!")
+        raise ValueError(f"AST of function {func_name} of {contract} not found")
+    return func_asts.popleft()
@@ -0,0 +1,130 @@
+"""
+Restricts key approximation analysis to the functions that can produce keys of the target contract's mappings.
+
+Analyzed contracts are the contracts in the C3 linearization of the target contract, and analyzed functions are the
+functions writing a mapping (an assignment marked by check_mapping, or an assignment to a member of a mapping value)
+and the functions calling them through internal calls, directly or transitively. Libraries, interfaces, unrelated
+contracts and functions that only read state (i.e. view/pure functions) are skipped.
+"""
+
+from src.ast_parsing.ast_parser import check_mapping
+from src.ast_parsing.symbol_table import get_linearization
+
+
+# returns name of the variable an assignment writes to, if it is indexed (i.e. m[a] = x or m[a].b = x)
+def get_indexed_base(expression):
+    indexed = False
+    while expression != None and expression.get('type') in ['IndexAccess', 'MemberAccess']:
+        if expression['type'] == 'IndexAccess':
+            indexed = True
+            expression = expression['base']
+        else:
+            expression = expression['expression']
+    if indexed and expression != None and expression.get('type') == 'Identifier':
+        return expression['name']
+    return None
+
+
+def writes_mapping(statement, definition, mappings):
+    try:
+        writers, _, _ = check_mapping(statement, definition, [], [], mappings)
+        if len(writers) > 0:
+            return True
+    except:
+        pass
+    expression = statement.get('expression')
+    if expression == None or expression.get('type') != 'BinaryOperation':
+        return False
+    if '=' not in expression['operator'] or expression['operator'] in ['==', '!=', '<=', '>=']:
+        return False
+    return get_indexed_base(expression['left']) in [mapp[0] for mapp in mappings]
+
+
+def walk_function(node, definition, mappings, details):
+    if isinstance(node, list):
+        for child in node:
+            walk_function(child, definition, mappings, details)
+        return
+    if not isinstance(node, dict):
+        return
+    if node.get('type') == 'ExpressionStatement' and writes_mapping(node, definition, mappings):
+        details['writes_mapping'] = True
+    elif node.get('type') == 'FunctionCall':
+        called = node.get('expression') or {}
+        if called.get('type') == 'Identifier':
+            details['calls'].add(called['name'])
+        elif called.get('type') == 'MemberAccess' and (called.get('expression') or {}).get('name') == 'super':
+            details['calls'].add(called['memberName'])
+    for key in node:
+        walk_function(node[key], definition, mappings, details)
+
+
+def get_mapping_writers(functions, mappings):
+    """
+    Returns names of functions writing a mapping directly or through internal calls.
+
+    Parameters:
+        functions (list): function ASTs of the contract (fbody of parse_ast results).
+        mappings (list): mapping names and key types (maps of parse_ast results).
+
+    Returns:
+        writers (set): names of functions writing a mapping.
+    """
+    writers = set()
+    callers = {}
+    for func in functions:
+        details = {'writes_mapping': False, 'calls': set()}
+        walk_function(func.get('body'), func, mappings, details)
+        if details['writes_mapping']:
+            writers.add(func['name'])
+        for called in details['calls']:
+            if called not in callers:
+                callers[called] = set()
+            callers[called].add(func['name'])
+    # functions calling a writer, transitively
+    stack = list(writers)
+    while len(stack) > 0:
+        func_name = stack.pop()
+        for caller in callers.get(func_name, []):
+            if caller not in writers:
+                writers.add(caller)
+                stack.append(caller)
+    return writers
+
+
+def get_analysis_scope(symbols, all_contracts_details, contract_name):
+    """
+    Returns contracts and functions to be analyzed for the target contract, and the skipped ones.
+
+    Parameters:
+        symbols (dict): symbol table of the source unit (build_symbol_table results).
+        all_contracts_details (dict): parse_ast results.
+        contract_name (str): target contract name.
+
+    Returns:
+        scope (dict): contract name to names of functions to be analyzed.
+        skipped (dict): skipped 'contracts' and skipped 'functions' of each analyzed contract.
+    """
+    try:
+        linearization = get_linearization(symbols, contract_name)
+    except Exception as e:
+        print("Warning: Could not linearize inheritance, analyzing all contracts -", e)
+        linearization = list(all_contracts_details.keys())
+    scope = {}
+    skipped = {'contracts': [], 'functions': {}}
+    for cont in all_contracts_details:
+        if cont not in linearization:
+            skipped['contracts'].append(cont)
+            continue
+        writers = get_mapping_writers(all_contracts_details[cont]['fbody'], all_contracts_details[cont]['maps'])
+        scope[cont] = [func for func in all_contracts_details[cont]['func'] if func in writers]
+        skipped['functions'][cont] = [func for func in all_contracts_details[cont]['func'] if func not in writers]
+    return scope, skipped
+
+
+def print_skipped(skipped):
+    if len(skipped['contracts']) > 0:
+        print("Skipped contracts (not inherited by the target contract):", ", ".join(skipped['contracts']))
+    for cont in skipped['functions']:
+        if len(skipped['functions'][cont]) > 0:
+            print(f"Skipped functions of {cont} (not writing any mapping):", ", ".join(sorted(skipped['functions'][cont])))
@@ -0,0 +1,54 @@
+"""
+Serializes Slither CFG of a function into plain node dicts, so reach analysis and back tracking can run in worker
+processes without the Slither object.
+
+Each node dict contains:
+    node_id (int): Slither node id.
+    keyword (str): node type i.e. ENTRY_POINT, NEW, EXPRESSION, IF, etc.
+    sons, fathers (list): node ids of successor and predecessor nodes.
+    expression (dict): expression AST of the node (solidity_parser format), None if node has no expression.
+    expression_str (str): printed node expression.
+    right_type (str): type of right hand side expression of the node, None if expression has no right hand side.
+    right_value (str): value of right hand side identifier or literal.
+    left_str, right_str (str): printed left and right hand side expressions.
+"""
+
+from src.key_approx_analysis.slither_expressions import expression_to_ast
+
+
+def serialize_node(node):
+    node_dict = {}
+    node_dict['node_id'] = node.node_id
+    node_dict['keyword'] = str(node).split()[0]
+    node_dict['sons'] = [son.node_id for son in node.sons]
+    node_dict['fathers'] = [father.node_id for father in node.fathers]
+    exp = node.expression
+    node_dict['expression'] = expression_to_ast(exp)
+    node_dict['expression_str'] = str(exp)
+    node_dict['right_type'] = None
+    node_dict['right_value'] = None
+    node_dict['left_str'] = None
+    node_dict['right_str'] = None
+    try:
+        right = exp.expression_right
+    except:
+        return node_dict
+    node_dict['right_type'] = str(type(right))
+    if hasattr(right, 'value'):
+        node_dict['right_value'] = str(right.value)
+    node_dict['left_str'] = str(exp.expression_left)
+    node_dict['right_str'] = str(right)
+    return node_dict
+
+
+def serialize_function_cfg(func_nodes):
+    """
+    Returns serialized CFG of the function.
+
+    Parameters:
+        func_nodes (list): Slither nodes of the function (generate_function_cfg results).
+
+    Returns:
+        cfg_nodes (list): node dicts of the function CFG, in Slither order (entry point first).
+    """
+    return [serialize_node(node) for node in func_nodes]
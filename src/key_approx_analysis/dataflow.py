@@ -0,0 +1,113 @@
+"""
+Worklist based reaching definitions analysis on function CFGs.
+
+Every definition [var, node_id] is numbered, and IN/OUT sets of the nodes are integer bitsets of the definition
+numbers, so merging predecessors is a bitwise OR and unchanged sets are shared between nodes instead of copied. Nodes
+are processed from a worklist until no OUT set changes, so definitions in loops reach a fixed point.
+
+A node redefines a variable only if some definition of the variable reaches it (i.e. state variables, parameters or
+local variables, and not e.g. 'tou' entries of unknown values), in which case all the reaching definitions of the
+variable are killed. Declarations (NEW nodes) always define their variable.
+"""
+
+from collections import deque
+
+
+def number_definitions(entry_defs, node_defs):
+    """
+    Numbers all definitions of the function.
+
+    Parameters:
+        entry_defs (list): [var, node_id] definitions at function entry (state variables, parameters, globals).
+        node_defs (dict): node id to (declared var or None, list of vars defined by the node).
+
+    Returns:
+        defs (list): [var, node_id] of each definition number.
+        def_bits (dict): (var, node_id) to bit of the definition.
+        var_masks (dict): var to bitset of all definitions of the var.
+    """
+    defs = []
+    def_bits = {}
+    var_masks = {}
+
+    def add_definition(var, node_id):
+        if (var, node_id) in def_bits:
+            return
+        bit = 1 << len(defs)
+        defs.append([var, node_id])
+        def_bits[(var, node_id)] = bit
+        var_masks[var] = var_masks.get(var, 0) | bit
+
+    for var, node_id in entry_defs:
+        add_definition(var, node_id)
+    for node_id in node_defs:
+        declared_var, vars_used = node_defs[node_id]
+        if declared_var != None:
+            add_definition(declared_var, int(node_id))
+        for var in vars_used:
+            add_definition(var, int(node_id))
+    return defs, def_bits, var_masks
+
+
+def transfer(in_set, node_id, node_def, def_bits, var_masks):
+    declared_var, vars_used = node_def
+    out_set = in_set
+    if declared_var != None:
+        out_set |= def_bits[(declared_var, int(node_id))]
+    for var in vars_used:
+        if out_set & var_masks[var]:
+            out_set = (out_set & ~var_masks[var]) | def_bits[(var, int(node_id))]
+    return out_set
+
+
+def reaching_definitions(exec_sequence, fathers, sons, entry_id, entry_defs, node_defs):
+    """
+    Computes definitions reaching each node, iterating until fixed point.
+
+    Parameters:
+        exec_sequence (list): ids of nodes reachable from the entry node, in the order they are visited first.
+        fathers (dict): node id to predecessor node ids.
+        sons (dict): node id to successor node ids.
+        entry_id (int): id of entry node.
+        entry_defs (list): [var, node_id] definitions at function entry.
+        node_defs (dict): node id to (declared var or None, list of vars defined by the node), for exec_sequence nodes.
+
+    Returns:
+        in_sets (dict): node id to bitset of reaching definitions.
+        defs (list): [var, node_id] of each definition number.
+    """
+    defs, def_bits, var_masks = number_definitions(entry_defs, node_defs)
+    out_sets = {}
+    for node_id in exec_sequence:
+        out_sets[node_id] = 0
+    out_sets[entry_id] = 0
+    for var, node_id in entry_defs:
+        out_sets[entry_id] |= def_bits[(var, node_id)]
+    in_sets = {}
+    worklist = deque(exec_sequence)
+    in_worklist = set(exec_sequence)
+    while len(worklist) > 0:
+        node_id = worklist.popleft()
+        in_worklist.discard(node_id)
+        in_set = 0
+        for pred in fathers[node_id]:
+            in_set |= out_sets.get(pred, 0)
+        in_sets[node_id] = in_set
+        out_set = transfer(in_set, node_id, node_defs[node_id], def_bits, var_masks)
+        if out_set != out_sets[node_id]:
+            out_sets[node_id] = out_set
+            for son in sons[node_id]:
+                if son != entry_id and son not in in_worklist:
+                    worklist.append(son)
+                    in_worklist.add(son)
+    return in_sets, defs
+
+
+def decode_definitions(bitset, defs):
+    """Returns [var, node_id] definitions of the bitset, in definition number order."""
+    definitions = []
+    while bitset:
+        low_bit = bitset & -bitset
+        definitions.append(list(defs[low_bit.bit_length() - 1]))
+        bitset ^= low_bit
+    return definitions
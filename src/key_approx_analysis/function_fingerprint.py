@@ -0,0 +1,158 @@
+"""
+Function fingerprints for memoization of key approximation results across contracts.
+
+A fingerprint is the hash of the normalized function AST, where parameter and local variable names are replaced by
+positional names (only if it is safe, i.e. they do not shadow state variables or mappings, and no literal has the same
+value), together with the state variables and mappings the function refers to. Functions with the same fingerprint
+(i.e. token-for-token identical ERC20 transfer, approve, etc.) have the same back tracking results, apart from the
+names of their parameters and local variables, which are restored from the fingerprint names.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import pickle
+import threading
+from src.compilation.artifact_cache import get_cache_directory
+from src.utils.atomic_file import atomic_write
+from src.key_approx_analysis.result_cache import ANALYZER_VERSION
+
+DECLARATION_TYPES = ['VariableDeclaration', 'Parameter']
+LITERAL_TYPES = {'StringLiteral': 'value', 'stringLiteral': 'value', 'NumberLiteral': 'number', 'BooleanLiteral': 'value', 'HexLiteral': 'value'}
+# positions (in each key result) of key variable name and key value, the only results that can contain local names
+KEY_RESULT_SIZE = 6
+KEY_NAME_POSITIONS = [1, 2]
+
+function_results = {}
+store_lock = threading.Lock()
+
+
+def collect_names(node, identifiers, declarations, literals):
+    if isinstance(node, list):
+        for child in node:
+            collect_names(child, identifiers, declarations, literals)
+        return
+    if not isinstance(node, dict):
+        return
+    node_type = node.get('type')
+    if node_type == 'Identifier':
+        identifiers.add(node['name'])
+    elif node_type in DECLARATION_TYPES and node.get('name') != None and node['name'] not in declarations:
+        declarations.append(node['name'])
+    elif node_type in LITERAL_TYPES:
+        literals.add(str(node.get(LITERAL_TYPES[node_type])))
+    for key in node:
+        collect_names(node[key], identifiers, declarations, literals)
+
+
+def canonicalize_names(node, names):
+    if isinstance(node, list):
+        return [canonicalize_names(child, names) for child in node]
+    if not isinstance(node, dict):
+        return node
+    canonical = {}
+    for key in node:
+        canonical[key] = canonicalize_names(node[key], names)
+    if node.get('type') in DECLARATION_TYPES + ['Identifier'] and node.get('name') in names:
+        canonical['name'] = names[node['name']]
+    return canonical
+
+
+def get_function_fingerprint(func_body, state_vars, cont_mappings):
+    """
+    Returns fingerprint of the function and the names of its parameters and local variables in the fingerprint.
+
+    Parameters:
+        func_body (dict): AST of the function.
+        state_vars (list): list of contract's state variables.
+        cont_mappings (list): list of all detected state contract mappings.
+
+    Returns:
+        fingerprint (str): hash of the normalized function.
+        names (dict): parameter/local variable name to its positional name, empty if names could not be normalized.
+    """
+    identifiers = set()
+    declarations = []
+    literals = set()
+    func_ast = copy.copy(func_body)
+    func_ast.pop('name', None)
+    collect_names(func_ast, identifiers, declarations, literals)
+    names = {}
+    for ind, name in enumerate(declarations):
+        names[name] = '__fp_' + str(ind)
+    # names are kept as they are, if renaming could change meaning of the function or its results
+    for name in declarations:
+        if name in state_vars or name in cont_mappings or name in literals or name in ['msg', 'tou']:
+            names = {}
+            break
+    referenced = []
+    for name in sorted(identifiers | set(declarations)):
+        referenced.append([names.get(name, name), name in state_vars, name in cont_mappings])
+    referenced.sort()
+    normalized = json.dumps([ANALYZER_VERSION, canonicalize_names(func_ast, names), referenced], sort_keys=True, default=str)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest(), names
+
+
+def rename_key_results(back_track_results, tou_keys, names):
+    """Renames names in results of a function (without function name) using names dict."""
+    renamed_results = []
+    for result in back_track_results:
+        result = list(result)
+        for ind in range(0, len(result), KEY_RESULT_SIZE):
+            for pos in KEY_NAME_POSITIONS:
+                if isinstance(result[ind+pos], str) and result[ind+pos] in names:
+                    result[ind+pos] = names[result[ind+pos]]
+        renamed_results.append(result)
+    renamed_tou_keys = []
+    for tou_key in tou_keys:
+        tou_key = list(tou_key)
+        if isinstance(tou_key[1], str) and tou_key[1] in names:
+            tou_key[1] = names[tou_key[1]]
+        renamed_tou_keys.append(tou_key)
+    return renamed_results, renamed_tou_keys
+
+
+def get_fingerprint_file(fingerprint):
+    return os.path.join(get_cache_directory('fingerprints'), fingerprint + '.pickle')
+
+
+def load_function_results(fingerprint, func_name, names):
+    """
+    Returns back tracking results of an already analyzed function with the same fingerprint, None if not found.
+
+    Parameters:
+        fingerprint (str): fingerprint of the function.
+        func_name (str): name of the function being analyzed.
+        names (dict): parameter/local variable names of the function in the fingerprint.
+
+    Returns:
+        back_track_results (list): results of key source from back tracking.
+        tou_key_list (list): list of keys that could not be back tracked.
+    """
+    if fingerprint not in function_results:
+        fingerprint_file = get_fingerprint_file(fingerprint)
+        if not os.path.isfile(fingerprint_file):
+            return None
+        try:
+            with open(fingerprint_file, 'rb') as f:
+                function_results[fingerprint] = pickle.load(f)
+        except Exception as e:
+            print("Warning: Could not load function fingerprint results -", e)
+            return None
+    results, tou_keys = function_results[fingerprint]
+    original_names = {names[name]: name for name in names}
+    results, tou_keys = rename_key_results(results, tou_keys, original_names)
+    return [[func_name] + result for result in results], [[func_name] + tou_key for tou_key in tou_keys]
+
+
+def save_function_results(fingerprint, names, back_track_results, tou_key_list):
+    results, tou_keys = rename_key_results(
+        [result[1:] for result in back_track_results], [tou_key[1:] for tou_key in tou_key_list], names)
+    with store_lock:
+        function_results[fingerprint] = (results, tou_keys)
+    fingerprint_file = get_fingerprint_file(fingerprint)
+    try:
+        atomic_write(fingerprint_file, lambda f: pickle.dump((results, tou_keys), f, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception as e:
+        print("Warning: Could not save function fingerprint results -", e)
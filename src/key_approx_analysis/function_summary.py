@@ -0,0 +1,101 @@
+"""
+Summaries of analyzed functions, applied at internal call sites of their callers.
+
+Results of an internal function with keys from its parameters (i.e. balances[to] in _transfer(from, to, amount)) can
+not be used during state extraction, as internal functions never appear in transactions. The summary of a function
+keeps these results, and at each call site the caller gets them with the parameter keys replaced by the call
+arguments, which are then back tracked within the caller like the keys of its own mapping writes. msg.sender and
+msg.value are passed through internal calls unchanged, and keys not depending on the call (static or state variable
+keys) are taken from the summary as they are.
+
+Functions are analyzed bottom-up in the call graph, so summaries of callees (including the results callees got from
+their own callees) are ready when their callers are analyzed, and the body of a helper is analyzed only once.
+"""
+
+import hashlib
+
+PASSED_GLOBALS = ['msg.sender', 'msg.value']
+KEY_RESULT_SIZE = 6
+
+
+def get_function_summary(func_body, back_track_results):
+    """
+    Returns summary of the analyzed function.
+
+    Parameters:
+        func_body (dict): AST of the function.
+        back_track_results (list): back tracking results of the function.
+
+    Returns:
+        summary (dict): number of function 'params' and 'rows' of results with keys from parameters, each row is a
+            list of key results (mapping, key var, key value, key type, position in args, kind) of mapping dimensions.
+    """
+    summary = {'params': len(func_body['parameters']['parameters']), 'rows': []}
+    for result in back_track_results:
+        keys = [list(result[q:q + KEY_RESULT_SIZE]) for q in range(1, len(result), KEY_RESULT_SIZE)]
+        if any(key[3] == 'Argument' for key in keys) and keys not in summary['rows']:
+            summary['rows'].append(keys)
+    return summary
+
+
+def get_called_functions(node, calls=None):
+    """
+    Returns name and argument ASTs of internal function calls (f(...) and super.f(...)) in the AST.
+    """
+    if calls == None:
+        calls = []
+    if isinstance(node, list):
+        for child in node:
+            get_called_functions(child, calls)
+        return calls
+    if not isinstance(node, dict):
+        return calls
+    if node.get('type') == 'FunctionCall':
+        called = node.get('expression') or {}
+        if called.get('type') == 'Identifier':
+            calls.append((called['name'], node.get('arguments') or []))
+        elif called.get('type') == 'MemberAccess' and (called.get('expression') or {}).get('name') == 'super':
+            calls.append((called['memberName'], node.get('arguments') or []))
+    for key in node:
+        get_called_functions(node[key], calls)
+    return calls
+
+
+def get_call_marks(summaries, arg_keys):
+    """
+    Returns marks synthesized at a call site from the summaries of the called function.
+
+    Parameters:
+        summaries (list): summaries of functions with the called name (overloads are matched by number of arguments).
+        arg_keys (list): key expressions (expr_helper format) of the call arguments.
+
+    Returns:
+        call_marks (list): [var_expr, resolved] of each summary row, var_expr is mapping:i:key expression (call argument
+            for parameter keys) and resolved contains key results not depending on the call, by key index.
+    """
+    call_marks = []
+    for summary in summaries:
+        if summary['params'] != len(arg_keys):
+            continue
+        for keys in summary['rows']:
+            var_expr = keys[0][0]
+            resolved = {}
+            for key_idx, key in enumerate(keys):
+                if key[3] == 'Argument' and key[1] in PASSED_GLOBALS:
+                    var_expr += ':i:' + key[1]
+                elif key[3] == 'Argument' and isinstance(key[4], int) and 0 <= key[4] < summary['params']:
+                    var_expr += ':i:' + arg_keys[key[4]]
+                else:
+                    var_expr += ':i:' + 'summary'
+                    resolved[key_idx] = list(key)
+            if [var_expr, resolved] not in call_marks:
+                call_marks.append([var_expr, resolved])
+    return call_marks
+
+
+def get_summary_fingerprint(fingerprint, call_summaries):
+    """Returns fingerprint of a function combined with summaries of its callees, results depend on both."""
+    summary_hash = hashlib.sha256(fingerprint.encode())
+    for func_name in sorted(call_summaries):
+        summary_hash.update(repr([func_name, call_summaries[func_name]]).encode())
+    return summary_hash.hexdigest()
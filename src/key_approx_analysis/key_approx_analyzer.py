@@ -1,17 +1,33 @@
 import copy
+import collections
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
 from logging import raiseExceptions
 import pprint
 import itertools
-from slither.slither import Slither
 from configparser import ConfigParser
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from src.ast_parsing.ast_parser import generate_ast, get_contract_details, get_contract_details_new
 from src.ast_parsing.ast_parser import parse_ast
-from web3.auto import Web3
-from web3.middleware import geth_poa_middleware
-import solcx
-from solcx import compile_source
-from solc_select import solc_select
-from src.state_extraction.slot_calculator import calculate_slots
+from src.ast_parsing.symbol_table import build_symbol_table
+from src.state_extraction.layout_provider import get_variables_layout
+from src.state_extraction.array_ranges import RANGE_TYPE
+from src.compilation.artifact_cache import get_crytic_compile, get_source_ast
+from src.key_approx_analysis.result_cache import load_analysis_results, save_analysis_results
+from src.key_approx_analysis.analysis_context import AnalysisContext
+from src.key_approx_analysis.function_summary import get_function_summary, get_called_functions, get_call_marks, get_summary_fingerprint
+from src.key_approx_analysis.cfg_serializer import serialize_function_cfg
+from src.key_approx_analysis.analysis_scope import get_analysis_scope, print_skipped
+from src.key_approx_analysis.analysis_index import get_function_index, build_ast_index, pop_function_ast
+from src.key_approx_analysis.dataflow import reaching_definitions, decode_definitions
+from src.key_approx_analysis.function_fingerprint import get_function_fingerprint, load_function_results, save_function_results
+
+# heavy dependencies (slither, crytic-compile, solcx) are imported only in the code paths that need them,
+# so layout only usage (get_slot_details) starts without loading them
 
 
 def print_all(data_list):
@@ -20,56 +36,6 @@ def print_all(data_list):
     return
 
 
-# switch Solidity compiler to required version
-def switch_compiler(compiler_version):
-    if compiler_version != '':
-        for i in range(len(compiler_version)):
-            if compiler_version[i].isdigit():
-                compiler_version = compiler_version[i:]
-                break
-        for i in range(len(compiler_version)):
-            if not compiler_version[len(compiler_version)-i-1].isdigit():
-                compiler_version = compiler_version[:len(compiler_version)-i-1]
-                break
-            else:
-                break
-        if len(compiler_version.split('<=')) > 1:
-            compiler_version = compiler_version.split('<=')[1]
-        if len(compiler_version.split('<')) > 1:
-            compiler_version = compiler_version.split('<')[1]
-        compiler_version = compiler_version.split('>')[0]
-        compiler_version = compiler_version.split('^')[0]
-        if compiler_version.count('.') == 1:
-            compiler_version += '.0'
-
-        if str(solcx.get_solc_version()) != compiler_version:
-            compiler_version_solcx = compiler_version
-            if '0.3' in compiler_version:
-                compiler_version_solcx = '0.4.11'
-            if '0.4.1' in compiler_version and len(compiler_version) <= 5:
-                compiler_version_solcx = '0.4.11'
-            try:
-                solcx.set_solc_version(compiler_version_solcx)
-                print('solcx ->', solcx.get_solc_version())
-            except Exception as e:
-                print('solcx -', e)
-                try:
-                    solcx.install_solc(compiler_version_solcx)
-                    solcx.set_solc_version(compiler_version_solcx)
-                except:
-                    pass
-        if solc_select.current_version()[0] != compiler_version:
-            if '0.3' in compiler_version:
-                compiler_version = '0.4.0'
-            try:
-                solc_select.switch_global_version(compiler_version, True)
-                print('solc ->', solc_select.current_version()[0])
-            except Exception as e:
-                print('solc-select -', str(e))
-    return
-
-
-
 def read_source_code(contract_name, input_dir):
     input_path = input_dir + contract_name + ".sol"
     f = open(input_path)
@@ -86,14 +52,10 @@ def generate_sol_file(cname, source_code, input_dir):
 
 
 def generate_function_cfg(slither, cont_name, func_name):
-    req_cfg = []
-    for cont in slither.contracts:
-        if cont.name == cont_name:
-            funcs = cont.functions
-            for func in funcs:
-                if func.name == func_name:
-                    req_cfg = func.nodes
-    return req_cfg
+    func = get_function_index(slither).get(cont_name, {}).get(func_name)
+    if func == None:
+        return []
+    return func.nodes
 
 
 # returns name/value of the index from the node expression AST
@@ -152,27 +114,12 @@ def get_vars(expr):
         return_vars.append(vars_split[0].strip())
     return return_vars
 
-def handle_expression_node(exp, out_nodes, node, compiler_version):
-    var = exp.split(' = ')[0]  # get left hand operand
-    var = var.split('.')[0]  # get classname if member is being accessed
-    if var[:8] == 'require(':
-        return out_nodes
+def handle_expression_node(expression, node, context):
+    # expression AST is converted from the Slither expression of the node (cfg_serializer), instead of parsing its printed form
     vars_used = []
-    code = "pragma solidity " + compiler_version + \
-        ";\ncontract test3 {   \n    function test () public {\n       " + \
-        exp + ";\n    }    \n}"
-    try:
-        children, _ = generate_ast(code)
-    except:
-        return out_nodes
-    contract = children[1]
-    try:
-        statements = contract['subNodes'][0]['body']['statements'][0]
-    except:
-        return out_nodes
-    stmt = statements
-    if 'expression' not in stmt:
-        return out_nodes
+    stmt = {'expression': expression}
+    if stmt['expression'] == None:
+        return vars_used
     if stmt['expression']['type'] == 'BinaryOperation':
         sub_stmt_dict = {}
         sub_stmt_dict['left'] = stmt['expression']['left']
@@ -188,43 +135,47 @@ def handle_expression_node(exp, out_nodes, node, compiler_version):
                 sub_stmt = sub_stmt['left']
             var_expr = expr_helper(sub_stmt)
             if type(var_expr) == str:
-                if ':i:' in var_expr and not [int(node.node_id), var_expr] in reach_analysis.marked_nodes:
-                    # to seperate indexes and base variable
-                    sepv = var_expr.split(':')
-                    if sepv[0] in reach_analysis.maps:
-                        reach_analysis.marked_nodes.append(
-                            [int(node.node_id), var_expr])
+                if ':i:' in var_expr:
+                    context.mark_node(int(node['node_id']), var_expr)
                 vars_used.append(var_expr)
             elif type(var_expr) == list:
                 for vexp in var_expr:
                     vars_used.append(vexp)
-    else:
-        return out_nodes
-    # updates the old definition with new one
-    for var in vars_used:
-        for dff in out_nodes:
-            if dff[0] == var:
-                ind = out_nodes.index(dff)
-                out_nodes.pop(ind)
-                out_nodes.append([var, int(node.node_id)])
-                break
-    return out_nodes
-
-def handle_func_nodes(in_nodes, node, compiler_version):
-    out_nodes = copy.deepcopy(in_nodes)
-    tmp = str(node).split()
-    keywrd = tmp[0]
-    exp = str(node.expression)
+    return vars_used
+
+# returns key expression of a call argument, arguments that can not be back tracked are 'tou'
+def get_argument_key(arg):
+    try:
+        key = expr_helper(arg)
+    except:
+        key = None
+    if type(key) != str or ':i:' in key:
+        return 'tou'
+    return key
+
+# marks calls of summarized functions with results of the called function, keys from its parameters become call arguments
+def handle_call_nodes(expression, node, context):
+    if len(context.summaries) == 0 or expression == None:
+        return
+    for func_name, arguments in get_called_functions(expression):
+        if func_name not in context.summaries:
+            continue
+        arg_keys = [get_argument_key(arg) for arg in arguments]
+        for var_expr, resolved in get_call_marks(context.summaries[func_name], arg_keys):
+            context.mark_node(int(node['node_id']), var_expr, resolved)
+
+# returns var declared by the node (if any) and vars (re)defined by the node, marks nodes modifying mappings
+def handle_func_nodes(node, context):
+    keywrd = node['keyword']
+    handle_call_nodes(node['expression'], node, context)
     if keywrd == 'NEW':
+        exp = node['expression_str']
         var = exp.split(' = ')[0]
-        out_nodes.append([var, int(node.node_id)])
-        out_nodes = handle_expression_node(exp, out_nodes, node, compiler_version)
-        return out_nodes
+        return var, handle_expression_node(node['expression'], node, context)
     elif keywrd == 'EXPRESSION':
-        out_nodes = handle_expression_node(exp, out_nodes, node, compiler_version)
-        return out_nodes
+        return None, handle_expression_node(node['expression'], node, context)
     else:
-        return out_nodes
+        return None, []
 
 
 def generate_final_key_approx_results(results):
@@ -245,71 +196,69 @@ def generate_final_key_approx_results(results):
             final_results[cont_name][func_name] = [rslt[3:]]
     return final_results
 
-def reach_analysis(cont_name, func_name, slither, state_vars, func_ast_nodes, cont_mappings, compiler_version):
+def reach_analysis(cont_name, func_name, func_nodes, state_vars, func_ast_nodes, cont_mappings, summaries=None):
     """
     Performs Reach Analysis on the provided function using its cfg to determine outnode of each line of code of provided function.
     Reach Analysis: "data-flow analysis which statically determines which definitions may reach a given point in the code." 
+    Definitions are propagated by the worklist engine in dataflow.py until fixed point.
 
     Parameters:
         cont_name (str): contract name.
         func_name (str): function name to be analyzed.
-        slither (object): Slither object.
+        func_nodes (list): serialized CFG nodes of the function (serialize_function_cfg results).
         state_vars (list): list of contract's state variables.
         func_ast_nodes (dict): AST of the function.
         cont_mappings (list): list of all detected state contract mappings.
-        compiler_version (str): required Solidity version.
+        summaries (dict): summaries of called functions by function name, applied at call sites (optional).
 
     Returns:
         in_nodes (dict): in nodes details of each function node.
         marked_nodes (list): list of all marked node for backtracking. 
     """
-    out_nodes = {}
     in_nodes = {}
-    func_nodes = generate_function_cfg(slither, cont_name, func_name)
-    unchanged_nodes = generate_function_cfg(slither, cont_name, func_name)
+    nodes = {}
     exec_sequence = []
-    reach_analysis.marked_nodes = []
-    reach_analysis.maps = cont_mappings[:]
+    context = AnalysisContext(cont_mappings, summaries)
+    if len(func_nodes) <= 1:
+        return in_nodes, context.marked_nodes
     for f_node in func_nodes:
-        out_nodes[f_node.node_id] = []
-    if len(func_nodes) > 0:
-        for st_var in state_vars:
-            out_nodes[func_nodes[0].node_id].append([st_var, 0])
-        paramlist = func_ast_nodes['parameters']['parameters']
-        for para in paramlist:
-            out_nodes[func_nodes[0].node_id].append([para['name'], -1])
-        out_nodes[func_nodes[0].node_id].append(['msg.sender', -1])
-        out_nodes[func_nodes[0].node_id].append(['msg.value', -1])
-        node = unchanged_nodes.pop(0)
-        if len(unchanged_nodes) == 0:
-            return in_nodes, reach_analysis.marked_nodes
-        node_stack = []
-        for son in node._sons:
+        nodes[f_node['node_id']] = f_node
+    entry_id = func_nodes[0]['node_id']
+    entry_defs = []
+    for st_var in state_vars:
+        entry_defs.append([st_var, 0])
+    paramlist = func_ast_nodes['parameters']['parameters']
+    for para in paramlist:
+        entry_defs.append([para['name'], -1])
+    entry_defs.append(['msg.sender', -1])
+    entry_defs.append(['msg.value', -1])
+    # nodes reachable from the entry node, in breadth first order
+    visited = set([entry_id])
+    node_stack = collections.deque()
+    for son in func_nodes[0]['sons']:
+        if son not in visited:
+            visited.add(son)
+            node_stack.append(son)
+    while len(node_stack) > 0:
+        node_id = node_stack.popleft()
+        exec_sequence.append(node_id)
+        for son in nodes[node_id]['sons']:
+            if son not in visited: # if already visited... skip
+                visited.add(son)
                 node_stack.append(son)
-        while len(node_stack) > 0:
-            node = node_stack.pop(0)
-            exec_sequence.append(node)
-            new_sucs = node.sons
-            for node in new_sucs:
-                if node not in exec_sequence and node not in node_stack: # if already visited... skip
-                    node_stack.append(node)
-
-    for node in exec_sequence:
-        preds = node._fathers
-        prev_out_nodes = []
-        for pred in preds:
-            for nd in out_nodes[pred.node_id]:
-                if nd not in prev_out_nodes:
-                    prev_out_nodes.append(nd)
-        in_nodes[node.node_id] = copy.deepcopy(prev_out_nodes)
-        out_nodes[node.node_id] = copy.deepcopy(
-            handle_func_nodes(in_nodes[node.node_id], node, compiler_version))
-    # if reach_analysis.marked_nodes != []:
-    #     print(f"{func_name} -> {reach_analysis.marked_nodes}")
-    return in_nodes, reach_analysis.marked_nodes
-
-
-def back_track(current_contract, func_name, marked_nodes, in_nodes, slither):
+    # definitions of each node are independent of the reaching definitions, so nodes are handled (and marked) once
+    node_defs = {}
+    for node_id in exec_sequence:
+        node_defs[node_id] = handle_func_nodes(nodes[node_id], context)
+    fathers = {node_id: nodes[node_id]['fathers'] for node_id in nodes}
+    sons = {node_id: nodes[node_id]['sons'] for node_id in nodes}
+    in_sets, defs = reaching_definitions(exec_sequence, fathers, sons, entry_id, entry_defs, node_defs)
+    for node_id in exec_sequence:
+        in_nodes[node_id] = decode_definitions(in_sets[node_id], defs)
+    return in_nodes, context.marked_nodes
+
+
+def back_track(current_contract, func_name, marked_nodes, in_nodes, func_nodes):
     """
     Performs back tracking analysis on nodes marked during reach analysis, to get source of mapping keys from with in the marked nodes.
         Parameters:
@@ -317,19 +266,22 @@ def back_track(current_contract, func_name, marked_nodes, in_nodes, slither):
             func_name (str): function name.
             marked_nodes (list): list of nodes marked during reach analysis.
             in_nodes (dict): in nodes details of each function node.
-            slither (object): Slither object.
+            func_nodes (list): serialized CFG nodes of the function (serialize_function_cfg results).
         Returns:
             back_track_results (list): results of key source from back tracking.
             tou_key_list (list): list of keys that could not be back tracked.
     """
-    in_nodes = copy.deepcopy(in_nodes)
-    func_nodes = generate_function_cfg(slither, current_contract, func_name)
     back_track_results = []
     tou_key_list = []
+    nodes = {}
+    for fn in func_nodes:
+        nodes[fn['node_id']] = fn
     # marked nodes are those nodes where a contract mapping or its reference was modified
     for node in marked_nodes:
         # node contains node id and mapping_name:i:key
         node_id = node[0]
+        # keys resolved by the summary of a called function (marks of call sites) are not back tracked
+        resolved = node[2] if len(node) > 2 else {}
         map_name_key = node[1].split(':i:')
         mapping_name = map_name_key.pop(0)
         map_keys = map_name_key
@@ -338,6 +290,9 @@ def back_track(current_contract, func_name, marked_nodes, in_nodes, slither):
         for key_idx, m_key in enumerate(map_keys):
             if key_idx not in map_keys_details:
                 map_keys_details[key_idx] = []
+            if key_idx in resolved:
+                map_keys_details[key_idx].append([m_key, 'x', 'summary'])
+                continue
             if m_key == 'tou':
                 map_keys_details[key_idx].append([m_key, 'tou', 'regular'])
                 continue
@@ -365,6 +320,9 @@ def back_track(current_contract, func_name, marked_nodes, in_nodes, slither):
         map_key_results = {}
         # for back tracking
         for key_idx in map_keys_details:
+            if key_idx in resolved:
+                map_key_results[key_idx] = [list(resolved[key_idx])]
+                continue
             for map_key in map_keys_details[key_idx]:
                 new_details_added = False
                 if map_key[1] == 'tou':
@@ -380,22 +338,16 @@ def back_track(current_contract, func_name, marked_nodes, in_nodes, slither):
                         map_keys_details[key_idx].append([map_key[0], 'tou', 'regular'])
                         break
                     # getting node where value of key was last modified
-                    for fn in func_nodes:
-                        if fn.node_id == key_source_id:
-                            last_mod_node = fn
-                    node_details = str(last_mod_node).split()
-                    keywrd = node_details[0]
-                    exp = last_mod_node.expression  # getting exp of node, to get right hand side value
+                    last_mod_node = nodes[key_source_id]
+                    keywrd = last_mod_node['keyword']
                     # if right hand side is equal to some variable, get that variable node id from "in_nodes" and repeat loop
-                    try:
-                        right = exp.expression_right
-                        right_type = str(type(right))
-                    except:
+                    right_type = last_mod_node['right_type']
+                    if right_type == None:
                         new_details_added = True
                         map_keys_details[key_idx].append([key_val, 'tou', 'regular'])
                         break
                     if 'identifier' in right_type:
-                        new_var = str(right.value)
+                        new_var = last_mod_node['right_value']
                         new_var = new_var.replace('msg:m:sender', 'msg.sender')
                         if ':m:' in new_var:
                             new_var = new_var.split(':m:')[0]
@@ -415,11 +367,11 @@ def back_track(current_contract, func_name, marked_nodes, in_nodes, slither):
                         else:
                             key_source_id = temp_id
                     elif 'literal' in right_type:
-                        key_val = str(right.value)
+                        key_val = last_mod_node['right_value']
                         break
                     elif 'tuple_expression' in right_type: # source of value is some tuple expression
-                        left_vals = get_vars(str(exp.expression_left))
-                        right_vals = get_vars(str(right))
+                        left_vals = get_vars(last_mod_node['left_str'])
+                        right_vals = get_vars(last_mod_node['right_str'])
                         for i, val in enumerate(left_vals):
                             if map_key[0] == val:
                                 new_var = right_vals[i]
@@ -451,7 +403,7 @@ def back_track(current_contract, func_name, marked_nodes, in_nodes, slither):
                 key_pos_in_arg = -1
                 if key_source_id == -1:
                     keywrd = 'Argument'
-                    defs = in_nodes[func_nodes[1].node_id]
+                    defs = in_nodes[func_nodes[1]['node_id']]
                     for deff in defs:
                         if deff[1] == -1:
                             key_pos_in_arg += 1
@@ -487,7 +439,224 @@ def back_track(current_contract, func_name, marked_nodes, in_nodes, slither):
     return back_track_results, tou_key_list
 
 
-def key_approx_analysis(contract_name, contract, state_vars, func_name, slither, functions_ast, cont_mappings, results, compiler_version):
+def get_function_declarer(slither, contract, func_name):
+    func = get_function_index(slither).get(contract, {}).get(func_name)
+    try:
+        return func.contract_declarer.name
+    except:
+        return contract
+
+
+def prepare_function_analysis(contract, state_vars, func_name, func_body, slither, cont_mappings, use_cache=True, declared_tasks=None, analyzed_functions=None):
+    """
+    Serializes CFG of the function, so the function can be analyzed without Slither object.
+    An inherited function, already prepared for another contract, is only linked to that function's task
+    (shared_task), so it is analyzed once and the results are attributed to every contract inheriting it.
+    Functions calling other analyzed functions of the contract are neither shared nor looked up in the cache here,
+    as their results depend on summaries of the called functions (see analyze_functions).
+
+    Parameters:
+        contract (str): name of current contract type being analyzed.
+        state_vars (list): list of all state variables in the contract.
+        func_name (str): name of function to run analysis on.
+        func_body (dict): AST of the function.
+        slither (object): Slither object used to get CFGs.
+        cont_mappings (list): list of all detected state contract mappings.
+        use_cache (bool): if True, results of already analyzed functions with the same fingerprint are reused.
+        declared_tasks (dict): tasks of already prepared functions by defining contract, name and fingerprint (optional).
+        analyzed_functions (list): names of all analyzed functions of the contract, whose calls get summaries (optional).
+
+    Returns:
+        function_task (dict): function details for analyze_function, with cached results if found.
+    """
+    function_task = {'contract': contract, 'func_name': func_name, 'state_vars': state_vars, 'func_body': func_body,
+                     'cont_mappings': cont_mappings, 'func_nodes': None, 'results': None, 'shared_task': None,
+                     'calls': [], 'summaries': {}, 'use_cache': use_cache}
+    function_task['fingerprint'], function_task['names'] = get_function_fingerprint(func_body, state_vars, cont_mappings)
+    if analyzed_functions != None:
+        # recursive calls are not summarized
+        called = set(name for name, _ in get_called_functions(func_body.get('body')))
+        function_task['calls'] = sorted(called.intersection(analyzed_functions) - set([func_name]))
+    if len(function_task['calls']) > 0:
+        function_task['func_nodes'] = serialize_function_cfg(generate_function_cfg(slither, contract, func_name))
+        return function_task
+    if use_cache:
+        function_task['results'] = load_function_results(function_task['fingerprint'], func_name, function_task['names'])
+    if function_task['results'] != None:
+        return function_task
+    if declared_tasks != None:
+        # fingerprint is part of the key, so a function is only shared if it refers to the same state variables and mappings
+        declared_key = (get_function_declarer(slither, contract, func_name), func_name, function_task['fingerprint'])
+        if declared_key in declared_tasks:
+            function_task['shared_task'] = declared_tasks[declared_key]
+            return function_task
+        declared_tasks[declared_key] = function_task
+    function_task['func_nodes'] = serialize_function_cfg(generate_function_cfg(slither, contract, func_name))
+    return function_task
+
+
+def analyze_function(function_task):
+    """
+    Performs reach analysis and back tracking of the function, only uses serialized CFG so it can run in a worker process.
+
+    Parameters:
+        function_task (dict): function details from prepare_function_analysis.
+
+    Returns:
+        back_track_results (list): results of key source from back tracking.
+        tou_key_list (list): list of keys that could not be back tracked.
+    """
+    in_nodes, marked_nodes = reach_analysis(function_task['contract'], function_task['func_name'], function_task['func_nodes'],
+        function_task['state_vars'], function_task['func_body'], function_task['cont_mappings'], function_task.get('summaries'))
+    return back_track(function_task['contract'], function_task['func_name'], marked_nodes, in_nodes, function_task['func_nodes'])
+
+
+# one process pool is shared by every analysis of the process (and every job of the service), created on first use
+analysis_pool = None
+analysis_pool_workers = 0
+analysis_pool_lock = threading.Lock()
+# number of analyses running at the same time (service workers), cores are divided between them
+concurrent_analyses = 1
+
+
+def set_concurrent_analyses(jobs):
+    global concurrent_analyses
+    concurrent_analyses = max(1, jobs)
+
+
+def get_analysis_workers():
+    config = ConfigParser()
+    config.read("config.ini")
+    workers = config.getint('analysis', 'workers', fallback=0)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return max(1, workers // concurrent_analyses)
+
+
+def get_analysis_pool(workers):
+    """Returns the shared analysis process pool, workers are started with forkserver/spawn so they never inherit
+    locks held by threads of this process."""
+    global analysis_pool, analysis_pool_workers
+    with analysis_pool_lock:
+        if analysis_pool == None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            analysis_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            analysis_pool_workers = workers
+        return analysis_pool
+
+
+def discard_analysis_pool(pool):
+    global analysis_pool
+    with analysis_pool_lock:
+        if analysis_pool is pool:
+            analysis_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_function_analysis(pending, pool):
+    """
+    Analyzes functions on the process pool, serially if there is no pool or a single function.
+
+    Returns:
+        function_results (list): analyze_function results of the functions, in the same order.
+        pool (object): pool to use for the next functions, None if the pool failed.
+    """
+    if pool != None and len(pending) > 1:
+        chunk_size = max(1, len(pending) // (analysis_pool_workers * 4))
+        try:
+            return list(pool.map(analyze_function, pending, chunksize=chunk_size)), pool
+        except BrokenProcessPool as e:
+            # a worker died, the next analysis starts a new pool
+            discard_analysis_pool(pool)
+            pool = None
+            print("Warning: Analysis worker process failed, analyzing serially -", e)
+        except pickle.PicklingError as e:
+            print("Warning: Could not send functions to analysis workers, analyzing serially -", e)
+    return [analyze_function(task) for task in pending], pool
+
+
+def add_function_summaries(function_tasks, summaries):
+    for task in function_tasks:
+        summary_key = (task['contract'], task['func_name'])
+        if summary_key not in summaries:
+            summaries[summary_key] = []
+        summaries[summary_key].append(get_function_summary(task['func_body'], task['results'][0]))
+
+
+def apply_function_summaries(function_task, summaries):
+    # summaries of called functions are part of the fingerprint, so cached results are only reused with same summaries
+    function_task['summaries'] = {}
+    for called in function_task['calls']:
+        call_summaries = [summary for summary in summaries.get((function_task['contract'], called), []) if len(summary['rows']) > 0]
+        if len(call_summaries) > 0:
+            function_task['summaries'][called] = call_summaries
+    if len(function_task['summaries']) > 0:
+        function_task['fingerprint'] = get_summary_fingerprint(function_task['fingerprint'], function_task['summaries'])
+    if function_task['use_cache']:
+        function_task['results'] = load_function_results(function_task['fingerprint'], function_task['func_name'], function_task['names'])
+
+
+def analyze_functions(function_tasks, workers=None):
+    """
+    Analyzes all functions without cached results, bottom-up in the call graph of each contract, so summaries of called
+    functions are applied at call sites of their callers. Functions of each level of the call graph are analyzed in
+    parallel on a process pool if there is more than one worker. Functions calling each other recursively are analyzed
+    together, with the summaries found so far.
+
+    Parameters:
+        function_tasks (list): function details from prepare_function_analysis.
+        workers (int): number of worker processes, WORKERS of [analysis] section in config.ini if not provided.
+
+    Returns:
+        function_tasks (list): function details with analysis results, in the same order.
+    """
+    if workers == None:
+        workers = get_analysis_workers()
+    summaries = {}
+    add_function_summaries([task for task in function_tasks if task['results'] != None], summaries)
+    remaining = [task for task in function_tasks if task['results'] == None and task.get('shared_task') == None]
+    shared_tasks = [task for task in function_tasks if task['results'] == None and task.get('shared_task') != None]
+    # pool is taken once and used for every level of the call graph
+    pool = None
+    if min(workers, len(remaining)) > 1:
+        pool = get_analysis_pool(workers)
+    analyzed = 0
+    shared = 0
+    levels = 0
+    while len(remaining) > 0 or len(shared_tasks) > 0:
+        # inherited functions get results of the function in their defining contract
+        resolved = [task for task in shared_tasks if task['shared_task']['results'] != None]
+        for task in resolved:
+            task['results'] = copy.deepcopy(task['shared_task']['results'])
+        add_function_summaries(resolved, summaries)
+        shared += len(resolved)
+        shared_tasks = [task for task in shared_tasks if task['results'] == None]
+        if len(remaining) == 0:
+            break
+        unanalyzed = set((task['contract'], task['func_name']) for task in remaining + shared_tasks)
+        level = [task for task in remaining if not any((task['contract'], called) in unanalyzed for called in task['calls'])]
+        if len(level) == 0:
+            level = remaining
+        level_ids = set(id(task) for task in level)
+        remaining = [task for task in remaining if id(task) not in level_ids]
+        for task in level:
+            if len(task['calls']) > 0:
+                apply_function_summaries(task, summaries)
+        pending = [task for task in level if task['results'] == None]
+        function_results, pool = run_function_analysis(pending, pool)
+        for task, function_result in zip(pending, function_results):
+            task['results'] = function_result
+            save_function_results(task['fingerprint'], task['names'], function_result[0], function_result[1])
+        add_function_summaries(level, summaries)
+        analyzed += len(pending)
+        levels += 1
+    if shared > 0 or levels > 1:
+        print(f"Analyzed {analyzed} functions in {levels} call graph levels, reused results for {shared} inherited functions.")
+    return function_tasks
+
+
+def key_approx_analysis(contract_name, contract, state_vars, func_name, slither, functions_ast, cont_mappings, results, compiler_version, use_cache=True):
     """
     Performs key approximation analysis on provided function using ASTs and CFGs.
     
@@ -501,6 +670,7 @@ def key_approx_analysis(contract_name, contract, state_vars, func_name, slither,
         cont_mappings (list): list of all detected state contract mappings.
         results (list): list of all key approximation analysis results. 
         compiler_version (str): required compiler version.
+        use_cache (bool): if True, results of already analyzed functions with the same fingerprint are reused.
     
     Returns:
         results (list): list of all key approximation analysis results.
@@ -518,10 +688,10 @@ def key_approx_analysis(contract_name, contract, state_vars, func_name, slither,
         print("func:", func_name, "ast not found!")
     if func_body == None:
         raise ValueError
-    in_nodes, marked_nodes = reach_analysis(contract, func_name,
-        slither, state_vars, func_body, cont_mappings, compiler_version)
-    function_backtrack_results, tou_keys = back_track(contract,
-        func_name, marked_nodes, in_nodes, slither)
+    function_task = prepare_function_analysis(
+        contract, state_vars, func_name, func_body, slither, cont_mappings, use_cache)
+    analyze_functions([function_task], workers=1)
+    function_backtrack_results, tou_keys = function_task['results']
 
     for result in function_backtrack_results:
         results.append([contract_name, contract] + result)
@@ -572,6 +742,8 @@ def extract_slot_details(variables_slot_results):
             for i in range(dim):
                 bracket+="[]"
             var_details = var_ast["dataTypeName"]+" "+bracket+" "+var_ast['name']+";"
+        elif var_ast['type'] == RANGE_TYPE:
+            var_details = var_ast['dataType']+" ["+str(var_ast['count'])+"] "+var_ast['name']+";"
         elif var_ast['type'] == "UserDefinedTypeName":
             var_details = var_ast['dataType']+" "+var_ast['name']+";"
 
@@ -579,64 +751,117 @@ def extract_slot_details(variables_slot_results):
     return slot_details
 
 
-def key_approx_analyzer(contract_name, source_code, compiler_version):
-    config = ConfigParser()
-    config.read("config.ini")
+# returns Slither object of the source code, compilation is reused from the artifact cache
+def generate_slither(contract_name, source_code, compiler_version=''):
+    from slither.slither import Slither
+    # source code is compiled from a unique temporary directory, so concurrent analyses never share a file
+    with tempfile.TemporaryDirectory(prefix='smartmuv-') as tmp_dir:
+        code_file = generate_sol_file(contract_name, source_code, tmp_dir + os.sep)
+        crytic_compile = get_crytic_compile(code_file, source_code, compiler_version)
+        return Slither(crytic_compile)
+
+
+def print_slot_layout(slot_details):
+    if len(slot_details) > 0:
+        print("\nThe slot layout of the provided smart contract is as follow:\n")
+        print_all(slot_details)
+    else:
+        print("\nNo state variable detected in the smart contract. \n")
+
 
-    input_dir = config.get('directories', 'contract_directory')
-    code_file = generate_sol_file(contract_name, source_code, input_dir)
+def key_approx_analyzer(contract_name, source_code, compiler_version, slither=None, use_cache=True, prune_scope=None):
+    """
+    Performs key approximation analysis of all functions of the contract, results are cached persistently and reused
+    for unchanged source code.
+
+    Parameters:
+        contract_name (str): contract name.
+        source_code (str): source code of the contract.
+        compiler_version (str): required Solidity compiler version.
+        slither (object): already generated Slither object (optional), only used if results are not cached.
+        use_cache (bool): if False, analysis of every function is always performed and cached results are replaced.
+        prune_scope (bool): if True, only mapping writers of the target contract linearization are analyzed,
+            PRUNE_SCOPE of [analysis] section in config.ini if not provided.
+
+    Returns:
+        final_results (list): key approximation results.
+        complete_analysis_results (dict): state variables, functions, slot details and contract details.
+    """
+    if prune_scope == None:
+        config = ConfigParser()
+        config.read("config.ini")
+        prune_scope = config.getboolean('analysis', 'prune_scope', fallback=True)
+    scope = 'pruned' if prune_scope else 'full'
+    if use_cache:
+        analysis_results = load_analysis_results(contract_name, source_code, compiler_version, scope)
+        if analysis_results != None:
+            print("Using cached key analysis results.")
+            print_slot_layout(analysis_results[1]['slot_details'])
+            return analysis_results
+    analysis_results = run_key_approx_analyzer(contract_name, source_code, compiler_version, slither, use_cache, prune_scope)
+    save_analysis_results(contract_name, source_code, compiler_version, analysis_results, scope)
+    return analysis_results
+
+
+def run_key_approx_analyzer(contract_name, source_code, compiler_version, slither=None, use_cache=True, prune_scope=True):
+    # Slither is built first, its compilation artifacts also provide the solc AST and the storage layout
+    if slither == None:
+        slither = generate_slither(contract_name, source_code, compiler_version)
     if compiler_version != '':
-        children, _ = generate_ast(source_code)
-        switch_compiler(compiler_version)
+        children, _ = generate_ast(source_code, compiler_version=compiler_version)
     else:
         children, compiler_version = generate_ast(source_code)
-        switch_compiler(compiler_version)
     children.pop(0)
-    all_contracts_details, all_functions_ast = parse_ast(children)
-    slither = Slither(code_file)
+    # symbol table is built once, for parse_ast, the analysis scope and the contract details of the layout
+    symbols = build_symbol_table(children)
+    all_contracts_details, all_functions_ast = parse_ast(children, symbols=symbols)
 
     results = []
     func_calls_analyzed = []
     all_tou_keys = []
-    all_funcs_names = [] # to ignore functions like require
     functions_ast = {}
     func_names = {} # saves all functions for each contract
+    function_tasks = []
+    declared_tasks = {}
+    for cntrct in all_contracts_details:
+        functions_ast[cntrct] = all_contracts_details[cntrct]['fbody']
+    # function ASTs are looked up by name, functions with same name get their ASTs in source order
+    ast_index = build_ast_index(functions_ast)
+    skipped = {'contracts': [], 'functions': {}}
+    if prune_scope:
+        scope, skipped = get_analysis_scope(symbols, all_contracts_details, contract_name)
+        print_skipped(skipped)
     # extracting all function and performing reach analysis and back tracking on each function node
     for cntrct in all_contracts_details:
+        if prune_scope and cntrct not in scope:
+            continue
         state_vars = all_contracts_details[cntrct]['vars']
-        func_names[cntrct] = all_contracts_details[cntrct]['func']
-        functions_ast[cntrct] = all_contracts_details[cntrct]['fbody']
-        all_funcs_names += list(all_functions_ast[cntrct].keys())
-        for fn in func_names[cntrct]:
-            if fn not in all_funcs_names:
-                all_funcs_names.append(fn)
+        func_names[cntrct] = scope[cntrct] if prune_scope else all_contracts_details[cntrct]['func']
         mappings = [mapp[0] for mapp in all_contracts_details[cntrct]['maps']]
         for f_name in func_names[cntrct]:
             func_calls_analyzed+=[f_name]
-            results, functions_ast, tou_keys = key_approx_analysis(
-                contract_name, cntrct, state_vars, f_name, slither, functions_ast, mappings, results, compiler_version)
-            all_tou_keys += tou_keys
+            func_body = pop_function_ast(ast_index, cntrct, f_name)
+            function_tasks.append(prepare_function_analysis(
+                cntrct, state_vars, f_name, func_body, slither, mappings, use_cache, declared_tasks, func_names[cntrct]))
+    # functions are analyzed bottom-up in the call graph (in parallel within each level) and results are merged in order
+    analyze_functions(function_tasks)
+    for function_task in function_tasks:
+        function_backtrack_results, tou_keys = function_task['results']
+        for result in function_backtrack_results:
+            results.append([contract_name, function_task['contract']] + result)
+        all_tou_keys += tou_keys
 
     try:
-        children, compiler_version = generate_ast(source_code)
-        children.pop(0)
-        all_vars, all_contracts_dict, diamonds = get_contract_details(children, contract_name)
+        all_vars, all_contracts_dict, diamonds = get_contract_details(children, contract_name, symbols)
     except Exception as e:
         print("Error occured in get_contract_details -", str(e))
-        compiled_sol = compile_source(source_code)
-        cont_ast = compiled_sol['<stdin>:'+contract_name]['ast']['nodes']
+        cont_ast = get_source_ast(source_code, compiler_version)['nodes']
         all_vars, all_contracts_dict, diamonds = get_contract_details_new(cont_ast, contract_name)
         
-    _, variables_slot_results = calculate_slots(
-        all_contracts_dict[contract_name]['vars'], -1, all_contracts_dict)
+    variables_slot_results = get_variables_layout(contract_name, source_code, compiler_version, all_contracts_dict)
 
     slot_details = extract_slot_details(variables_slot_results)
-
-    if len(slot_details) > 0:
-        print("\nThe slot layout of the provided smart contract is as follow:\n")
-        print_all(slot_details)
-    else:
-        print("\nNo state variable detected in the smart contract. \n")
+    print_slot_layout(slot_details)
 
     state_vars = {}
     for cont in all_contracts_dict:
@@ -651,6 +876,7 @@ def key_approx_analyzer(contract_name, source_code, compiler_version):
     complete_analysis_results['state_vars'] = state_vars
     complete_analysis_results['all_funcs'] = all_cont_func
     complete_analysis_results['func_call_analyzed'] = func_calls_analyzed
+    complete_analysis_results['skipped'] = skipped
     complete_analysis_results['tou_keys'] = all_tou_keys
     complete_analysis_results['slot_details'] = slot_details
     complete_analysis_results['all_contracts_dict'] = all_contracts_dict
@@ -662,28 +888,31 @@ def key_approx_analyzer(contract_name, source_code, compiler_version):
     return final_results, complete_analysis_results
 
 
-def get_slot_details(contract_name, source_code, compiler_version):
-    config = ConfigParser()
-    config.read("config.ini")
+def get_contract_layout(contract_name, source_code, compiler_version):
+    """
+    Returns state variables and their slot layout, struct/contract details are taken from the parsed AST and slots
+    from solc storageLayout if supported. Layout only queries parse with solidity_parser, without resolving or compiling
+    for the AST.
 
-    if compiler_version != '':
-        switch_compiler(compiler_version)
-    else:
-        _, compiler_version = generate_ast(source_code)
-        switch_compiler(compiler_version)
-        
+    Returns:
+        all_vars (list): state variables of the contract.
+        variables_slot_results (list): details of slots of all state variables.
+    """
     try:
-        children, compiler_version = generate_ast(source_code)
+        children, _ = generate_ast(source_code, backend='solidity_parser')
         children.pop(0)
-        _, all_contracts_dict, diamonds = get_contract_details(children, contract_name)
+        all_vars, all_contracts_dict, diamonds = get_contract_details(children, contract_name, build_symbol_table(children))
     except Exception as e:
         print("Error occured in get_contract_details -", str(e))
-        compiled_sol = compile_source(source_code)
-        cont_ast = compiled_sol['<stdin>:'+contract_name]['ast']['nodes']
-        _, all_contracts_dict, diamonds = get_contract_details_new(cont_ast, contract_name)
+        cont_ast = get_source_ast(source_code, compiler_version)['nodes']
+        all_vars, all_contracts_dict, diamonds = get_contract_details_new(cont_ast, contract_name)
 
-    _, variables_slot_results = calculate_slots(
-        all_contracts_dict[contract_name]['vars'], -1, all_contracts_dict)
+    variables_slot_results = get_variables_layout(contract_name, source_code, compiler_version, all_contracts_dict)
+    return all_vars, variables_slot_results
+
+
+def get_slot_details(contract_name, source_code, compiler_version):
+    _, variables_slot_results = get_contract_layout(contract_name, source_code, compiler_version)
     slot_details = extract_slot_details(variables_slot_results)
         
     return slot_details
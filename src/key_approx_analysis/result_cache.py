@@ -0,0 +1,65 @@
+"""
+Persistent cache of key_approx_analyzer results (final_results and complete_analysis_results).
+
+Results are keyed by source hash, contract name, compiler version, analysis scope, ANALYZER_VERSION and the settings
+the cached layout and parsed contract details depend on, so analysis of an unchanged source code skips Slither and the
+reach/back-track analysis. ANALYZER_VERSION must be increased whenever a change in
+the analysis changes its results, so stale results of the older analyzer are not reused.
+"""
+
+import hashlib
+import os
+import pickle
+from configparser import ConfigParser
+from src.compilation.artifact_cache import get_cache_directory, get_source_hash
+from src.utils.atomic_file import atomic_write
+
+ANALYZER_VERSION = '7'
+
+
+def get_settings_hash():
+    """Returns hash of the config.ini settings results depend on (layout provider, range threshold and parser backend)."""
+    config = ConfigParser()
+    config.read("config.ini")
+    settings = [config.get('layout', 'layout_provider', fallback='auto'),
+                config.get('layout', 'range_array_length', fallback='10000'),
+                config.get('ast', 'parser_backend', fallback='solidity_parser')]
+    return hashlib.sha256('|'.join(settings).encode("utf-8")).hexdigest()[:12]
+
+
+def get_analysis_cache_file(contract_name, source_code, compiler_version, scope='full'):
+    file_name = '-'.join([get_source_hash(source_code), contract_name, compiler_version or 'pragma', scope, 'v' + ANALYZER_VERSION,
+                          get_settings_hash()])
+    return os.path.join(get_cache_directory('key_analysis'), file_name + '.pickle')
+
+
+def load_analysis_results(contract_name, source_code, compiler_version, scope='full'):
+    """
+    Returns cached key_approx_analyzer results, None if the source code was not analyzed before.
+
+    Parameters:
+        contract_name (str): contract name.
+        source_code (str): source code of the contract.
+        compiler_version (str): required compiler version.
+        scope (str): analysis scope, 'full' or 'pruned'.
+
+    Returns:
+        analysis_results (tuple): final_results and complete_analysis_results, or None.
+    """
+    cache_file = get_analysis_cache_file(contract_name, source_code, compiler_version, scope)
+    if not os.path.isfile(cache_file):
+        return None
+    try:
+        with open(cache_file, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        print("Warning: Could not load cached key analysis results -", e)
+        return None
+
+
+def save_analysis_results(contract_name, source_code, compiler_version, analysis_results, scope='full'):
+    cache_file = get_analysis_cache_file(contract_name, source_code, compiler_version, scope)
+    try:
+        atomic_write(cache_file, lambda f: pickle.dump(analysis_results, f, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception as e:
+        print("Warning: Could not save key analysis results -", e)
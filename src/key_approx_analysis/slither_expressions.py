@@ -0,0 +1,91 @@
+"""
+Converts Slither expression objects of CFG nodes into the expression AST format of solidity_parser.
+
+Reach analysis used to print each node expression, wrap it in a dummy contract and parse it again with
+solidity_parser. The conversion produces the same AST from the expression objects already in memory, following how
+solidity_parser parses the printed expression (assignments are binary operations, Solidity functions and type
+conversions to elementary types are calls without a function name, etc.), so results of reach analysis are same.
+"""
+
+
+def elementary_type_name(name):
+    return {'type': 'ElementaryTypeNameExpression', 'typeName': {'type': 'ElementaryTypeName', 'name': name}}
+
+
+# composed solidity variables (msg.sender, block.number) are member accesses in solidity_parser AST
+def solidity_variable_to_ast(name):
+    names = name.split('.')
+    stmt = {'type': 'Identifier', 'name': names[0]}
+    for member in names[1:]:
+        stmt = {'type': 'MemberAccess', 'expression': stmt, 'memberName': member}
+    return stmt
+
+
+def literal_to_ast(expression):
+    value = str(expression)
+    literal_type = str(expression.type)
+    if literal_type == 'bool':
+        return {'type': 'BooleanLiteral', 'value': value == 'true'}
+    if literal_type == 'string':
+        return {'type': 'StringLiteral', 'value': value}
+    return {'type': 'NumberLiteral', 'number': value, 'subdenomination': None}
+
+
+def expression_to_ast(expression):
+    """
+    Returns solidity_parser AST of the Slither expression, unsupported expressions only keep their type.
+
+    Parameters:
+        expression (object): Slither expression of a CFG node.
+
+    Returns:
+        stmt (dict): expression AST.
+    """
+    from slither.core.expressions import (Identifier, Literal, MemberAccess, IndexAccess, CallExpression,
+        TupleExpression, BinaryOperation, AssignmentOperation, UnaryOperation, TypeConversion,
+        ConditionalExpression, ElementaryTypeNameExpression, NewContract, NewArray, NewElementaryType)
+    from slither.core.declarations.solidity_variables import SolidityFunction
+    from slither.core.solidity_types import ElementaryType
+
+    if expression == None:
+        return None
+    if isinstance(expression, Identifier):
+        value = expression.value
+        if isinstance(value, SolidityFunction):
+            # printed with its signature i.e. require(bool), which is parsed as a call
+            return {'type': 'FunctionCall', 'expression': elementary_type_name(value.name), 'arguments': []}
+        return solidity_variable_to_ast(str(value))
+    if isinstance(expression, Literal):
+        return literal_to_ast(expression)
+    if isinstance(expression, MemberAccess):
+        return {'type': 'MemberAccess', 'expression': expression_to_ast(expression.expression),
+                'memberName': expression.member_name}
+    if isinstance(expression, IndexAccess):
+        return {'type': 'IndexAccess', 'base': expression_to_ast(expression.expression_left),
+                'index': expression_to_ast(expression.expression_right)}
+    if isinstance(expression, CallExpression):
+        return {'type': 'FunctionCall', 'expression': expression_to_ast(expression.called),
+                'arguments': [expression_to_ast(arg) for arg in expression.arguments]}
+    if isinstance(expression, TypeConversion):
+        if isinstance(expression.type, ElementaryType):
+            called = elementary_type_name(str(expression.type))
+        else:
+            called = {'type': 'Identifier', 'name': str(expression.type)}
+        return {'type': 'FunctionCall', 'expression': called, 'arguments': [expression_to_ast(expression.expression)]}
+    if isinstance(expression, TupleExpression):
+        return {'type': 'TupleExpression', 'components': [expression_to_ast(exp) for exp in expression.expressions],
+                'isArray': False}
+    if isinstance(expression, (BinaryOperation, AssignmentOperation)):
+        return {'type': 'BinaryOperation', 'operator': str(expression.type),
+                'left': expression_to_ast(expression.expression_left),
+                'right': expression_to_ast(expression.expression_right)}
+    if isinstance(expression, UnaryOperation):
+        return {'type': 'UnaryOperation', 'operator': str(expression.type),
+                'subExpression': expression_to_ast(expression.expression)}
+    if isinstance(expression, ConditionalExpression):
+        return {'type': 'Conditional'}
+    if isinstance(expression, ElementaryTypeNameExpression):
+        return elementary_type_name(str(expression.type))
+    if isinstance(expression, (NewContract, NewArray, NewElementaryType)):
+        return {'type': 'NewExpression'}
+    return {'type': type(expression).__name__}
@@ -0,0 +1,132 @@
+import heapq
+import itertools
+import threading
+import uuid
+from src.utils.lru_cache import LRUCache
+
+# lower value runs first
+PRIORITY_LAYOUT = 0
+PRIORITY_REGULAR = 1
+PRIORITY_STATE = 2
+
+
+class Job:
+    """
+    Single unit of work, every request with the same key attaches to the same job.
+
+    Parameters:
+        key (tuple): identity of the job i.e. (kind, network, address, source hash, block).
+        run (function): function that computes the result of the job.
+        priority (int): priority of the job, lower value runs first.
+        heavy (bool): heavy jobs (complete state extraction) can not occupy all the workers.
+    """
+    def __init__(self, key, run, priority, heavy):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.run = run
+        self.priority = priority
+        self.heavy = heavy
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.waiters = 1
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        self.done.wait(timeout)
+        return self.done.is_set()
+
+    def details(self):
+        details = {'job_id': self.id, 'status': self.status, 'waiters': self.waiters}
+        if self.status == 'done':
+            details['result'] = self.result
+        elif self.status == 'failed':
+            details['error'] = self.error
+        return details
+
+
+class JobQueue:
+    """
+    Priority job queue with deduplication of identical jobs and a bounded pool of worker threads.
+
+    Parameters:
+        workers (int): number of worker threads, at least max_heavy + 1 threads are started.
+        max_heavy (int): maximum number of workers that can run heavy jobs at the same time (workers - 1 by default,
+            at least 1), remaining workers are kept free for small (layout/regular variable) jobs.
+        finished_size (int): number of finished jobs kept for result coalescing.
+    """
+    def __init__(self, workers, max_heavy=None, finished_size=128):
+        if max_heavy == None:
+            max_heavy = max(1, workers - 1)
+        # one worker always runs only light jobs, so layout queries are never stuck behind state extractions
+        workers = max(workers, max_heavy + 1)
+        self.max_heavy = max_heavy
+        self.running_heavy = 0
+        self.light_jobs = []
+        self.heavy_jobs = []
+        self.counter = itertools.count()
+        self.in_flight = {}
+        self.jobs = LRUCache(finished_size)
+        self.finished = LRUCache(finished_size)
+        self.cond = threading.Condition()
+        self.threads = []
+        for _ in range(workers):
+            thread = threading.Thread(target=self.worker, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, key, run, priority, heavy=False):
+        """Returns the in-flight or finished job with the same key, otherwise queues a new job."""
+        with self.cond:
+            if key in self.in_flight:
+                job = self.in_flight[key]
+                job.waiters += 1
+                return job
+            job = self.finished.get(key)
+            if job != None and job.status == 'done':
+                job.waiters += 1
+                return job
+            job = Job(key, run, priority, heavy)
+            self.in_flight[key] = job
+            self.jobs.put(job.id, job)
+            queue = self.heavy_jobs if heavy else self.light_jobs
+            heapq.heappush(queue, (priority, next(self.counter), job))
+            self.cond.notify()
+        return job
+
+    def get_job(self, job_id):
+        return self.jobs.get(job_id)
+
+    def next_job(self):
+        with self.cond:
+            while True:
+                candidates = []
+                if self.light_jobs:
+                    candidates.append(self.light_jobs)
+                if self.heavy_jobs and self.running_heavy < self.max_heavy:
+                    candidates.append(self.heavy_jobs)
+                if candidates:
+                    queue = min(candidates, key=lambda q: q[0][:2])
+                    _, _, job = heapq.heappop(queue)
+                    if job.heavy:
+                        self.running_heavy += 1
+                    job.status = 'running'
+                    return job
+                self.cond.wait()
+
+    def worker(self):
+        while True:
+            job = self.next_job()
+            try:
+                job.result = job.run()
+                job.status = 'done'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'failed'
+            with self.cond:
+                if job.heavy:
+                    self.running_heavy -= 1
+                self.in_flight.pop(job.key, None)
+                self.finished.put(job.key, job)
+                self.cond.notify_all()
+            job.done.set()
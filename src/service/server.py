@@ -0,0 +1,221 @@
+"""
+Long-running SmartMuv service, serves slot layout, regular variables and complete state extraction over a local HTTP/JSON interface.
+
+Imports, slot layouts, analysis results, ABIs and RPC sessions are kept warm between requests, and are bounded by an
+LRU cache (CACHE_SIZE in config.ini). Slither objects and parsed ASTs are not kept, they are only needed to compute the
+layout and the analysis results, which are kept instead (and parsed ASTs are cached by source hash in ast_cache.py).
+
+Every request runs as a job identified by (network, address, source hash, block), identical concurrent requests
+attach to the in-flight job and finished results are reused. Jobs run on a bounded pool of workers (WORKERS in config.ini),
+layout and regular variable jobs have higher priority and complete state jobs can never occupy all the workers.
+Requests at a new block reuse the analysis results and ABI of the same source code.
+
+i.e
+
+POST /slot_details        {"contract_name": ..., "source_code": ..., "compiler_version": ...}
+POST /regular_variables   {"contract_name": ..., "source_code": ..., "compiler_version": ..., "address": ..., "network": ...}
+POST /contract_state      {"contract_name": ..., "source_code": ..., "compiler_version": ..., "address": ..., "network": ...}
+GET  /jobs/<job_id>
+GET  /health
+
+Optional request fields: "block" (block number to extract state at, latest by default),
+"priority" (overrides default job priority) and "wait" (false returns job id immediately).
+"""
+
+import copy
+import json
+import threading
+from configparser import ConfigParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.key_approx_analysis.key_approx_analyzer import get_contract_layout, extract_slot_details, key_approx_analyzer, set_concurrent_analyses
+from src.compilation.compiler_resolver import get_pragma_version
+from src.state_extraction.state_extractor import extract_contract_state, extract_regular_variables, generate_abi, connect_web3
+from src.service.warm_cache import source_hash
+from src.utils.lru_cache import LRUCache
+from src.service.job_queue import JobQueue, PRIORITY_LAYOUT, PRIORITY_REGULAR, PRIORITY_STATE
+
+contracts_cache = None
+web3_sessions = None
+job_queue = None
+
+
+def init_service(cache_size, workers):
+    global contracts_cache, web3_sessions, job_queue
+    contracts_cache = LRUCache(cache_size)
+    web3_sessions = LRUCache(cache_size)
+    job_queue = JobQueue(workers)
+    # analyses of concurrent heavy jobs share the analysis process pool
+    set_concurrent_analyses(job_queue.max_heavy)
+    return
+
+
+# returns warm entry of the contract, every entry holds lazily computed artifacts of one source code
+def get_contract_entry(contract_name, source_code, compiler_version):
+    if compiler_version == '':
+        compiler_version = get_pragma_version(source_code)
+    key = (contract_name, source_hash(source_code), compiler_version)
+    # entry lock makes sure artifacts of the same source code are computed only once
+    entry = contracts_cache.get_or_create(key, lambda: {'compiler_version': compiler_version, 'lock': threading.Lock()})
+    return entry
+
+
+def get_web3(net):
+    return web3_sessions.get_or_create(net, lambda: connect_web3(net))
+
+
+# returns web3 object sharing the warm RPC session of the network, pinned to the provided block
+def get_web3_at_block(net, block):
+    from web3.auto import Web3
+    from web3.middleware import geth_poa_middleware
+    session = get_web3(net)
+    w3 = Web3(session.provider)
+    w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+    w3.eth.default_block = block
+    return w3
+
+
+def resolve_block(request):
+    if request.get('block') != None:
+        return int(request['block'])
+    return get_web3(request.get('network', 'mainnet')).eth.block_number
+
+
+# returns warm entry of the contract with its state variables and slot layout
+def get_layout_entry(contract_name, source_code, compiler_version):
+    entry = get_contract_entry(contract_name, source_code, compiler_version)
+    with entry['lock']:
+        if 'layout' not in entry:
+            entry['layout'] = get_contract_layout(contract_name, source_code, entry['compiler_version'])
+            entry['slot_details'] = extract_slot_details(entry['layout'][1])
+    return entry
+
+
+def serve_slot_details(request):
+    entry = get_layout_entry(request['contract_name'], request['source_code'], request.get('compiler_version', ''))
+    return entry['slot_details']
+
+
+def serve_regular_variables(request):
+    entry = get_layout_entry(request['contract_name'], request['source_code'], request.get('compiler_version', ''))
+    w3 = get_web3_at_block(request.get('network', 'mainnet'), request['block'])
+    # extraction updates the variable details in place, so the cached layout is copied
+    results, slot_details, slots_and_data, block_number = extract_regular_variables(
+        request['contract_name'], request['source_code'], request['address'], entry['compiler_version'],
+        request.get('network', 'mainnet'), w3=w3, layout=copy.deepcopy(entry['layout']))
+    return {'results': results, 'slot_details': slot_details, 'slots_and_data': slots_and_data, 'block_number': block_number}
+
+
+def serve_contract_state(request):
+    contract_name = request['contract_name']
+    source_code = request['source_code']
+    entry = get_contract_entry(contract_name, source_code, request.get('compiler_version', ''))
+    with entry['lock']:
+        if 'analysis_results' not in entry or 'abi' not in entry:
+            # Slither is only generated by the analyzer if results are not in the persistent cache
+            entry['analysis_results'] = key_approx_analyzer(contract_name, source_code, entry['compiler_version'])
+            entry['abi'] = generate_abi(source_code, contract_name, entry['compiler_version'])
+    w3 = get_web3_at_block(request.get('network', 'mainnet'), request['block'])
+    # extraction updates the variable details in place, so cached analysis results are copied
+    final_results, _, slot_details, slots_and_data, key_analysis_result, block_number = extract_contract_state(
+        contract_name, source_code, request['address'], entry['compiler_version'], request.get('network', 'mainnet'),
+        w3=w3, contract_abi=copy.deepcopy(entry['abi']), analysis_results=copy.deepcopy(entry['analysis_results']))
+    return {'results': final_results, 'slot_details': slot_details, 'slots_and_data': slots_and_data,
+            'key_analysis_result': key_analysis_result, 'block_number': block_number}
+
+
+# path -> (function, default priority, heavy job, job depends on chain state)
+routes = {
+    '/slot_details': (serve_slot_details, PRIORITY_LAYOUT, False, False),
+    '/regular_variables': (serve_regular_variables, PRIORITY_REGULAR, False, True),
+    '/contract_state': (serve_contract_state, PRIORITY_STATE, True, True),
+}
+
+
+def submit_job(path, request):
+    serve, priority, heavy, on_chain = routes[path]
+    code_hash = source_hash(request['source_code'])
+    if on_chain:
+        request['block'] = resolve_block(request)
+        key = (path, request.get('network', 'mainnet'), request['address'].lower(), code_hash, request['block'])
+    else:
+        key = (path, request['contract_name'], code_hash, request.get('compiler_version', ''))
+    priority = int(request.get('priority', priority))
+    return job_queue.submit(key, lambda: serve(request), priority, heavy)
+
+
+def to_json(data):
+    def default(obj):
+        if isinstance(obj, (bytes, bytearray)):
+            return '0x' + bytes(obj).hex()
+        return str(obj)
+    return json.dumps(data, default=default).encode("utf-8")
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+
+    def send_json(self, status, data):
+        body = to_json(data)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.send_json(200, {'status': 'ok', 'cached_contracts': len(contracts_cache)})
+        elif self.path.startswith('/jobs/'):
+            job = job_queue.get_job(self.path[len('/jobs/'):])
+            if job == None:
+                self.send_json(404, {'error': f"Unknown job - {self.path}"})
+            else:
+                self.send_json(200, job.details())
+        else:
+            self.send_json(404, {'error': f"Unknown path - {self.path}"})
+
+    def do_POST(self):
+        if self.path not in routes:
+            self.send_json(404, {'error': f"Unknown path - {self.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length))
+        except Exception as e:
+            self.send_json(400, {'error': f"Invalid request - {e}"})
+            return
+        try:
+            job = submit_job(self.path, request)
+        except KeyError as e:
+            self.send_json(400, {'error': f"Missing field - {e}"})
+            return
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+            return
+        if request.get('wait', True) == False:
+            self.send_json(202, job.details())
+            return
+        job.wait()
+        if job.status == 'failed':
+            self.send_json(500, job.details())
+        else:
+            self.send_json(200, job.details())
+
+
+def run_server():
+    config = ConfigParser()
+    config.read("config.ini")
+    host = config.get('service', 'host')
+    port = int(config.get('service', 'port'))
+    init_service(int(config.get('service', 'cache_size')), int(config.get('service', 'workers')))
+    server = ThreadingHTTPServer((host, port), RequestHandler)
+    print(f"SmartMuv service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    return
+
+
+if __name__ == "__main__":
+    run_server()
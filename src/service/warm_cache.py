@@ -0,0 +1,5 @@
+import hashlib
+
+
+def source_hash(source_code):
+    return hashlib.sha256(source_code.encode("utf-8")).hexdigest()
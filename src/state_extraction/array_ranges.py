@@ -0,0 +1,101 @@
+"""
+Range descriptors of large static arrays.
+
+Static arrays longer than RANGE_ARRAY_LENGTH (config.ini) are not expanded into a var dict for every element, they are
+laid out as a single var dict of type StaticArrayRange:
+    'slot'            - first slot of the array.
+    'count'           - number of elements.
+    'elementsPerSlot' - elements packed into one slot (elementary types smaller than 16 bytes), otherwise 1.
+    'stride'          - slots used by an element (or by the elements packed into one slot).
+    'element'         - layout of a single element relative to slot 0, names are suffixes of the element name
+                        (i.e. '' for elementary types, '.member' for struct members).
+so layout time and memory do not depend on the array length. Elements are expanded only when their data is extracted,
+expand_array_range returns the same var dicts the expanded layout would contain.
+"""
+
+from configparser import ConfigParser
+
+RANGE_TYPE = 'StaticArrayRange'
+RANGE_ARRAY_LENGTH = 10000
+RANGE_BATCH_SLOTS = 256
+
+
+range_array_length = None
+
+
+def get_range_array_length():
+    """Returns length above which static arrays are laid out as ranges (read from config.ini once, layouts are
+    calculated for every mapping key)."""
+    global range_array_length
+    if range_array_length == None:
+        config = ConfigParser()
+        config.read("config.ini")
+        range_array_length = config.getint('layout', 'RANGE_ARRAY_LENGTH', fallback=RANGE_ARRAY_LENGTH)
+    return range_array_length
+
+
+def get_range_batch_slots():
+    """Returns number of slots of array ranges read in one batch request."""
+    config = ConfigParser()
+    config.read("config.ini")
+    return max(1, config.getint('extraction', 'RANGE_BATCH_SLOTS', fallback=RANGE_BATCH_SLOTS))
+
+
+def get_array_range(name, data_type, slot, count, element, elements_per_slot=1, stride=1):
+    """
+    Returns range descriptor (var dict) of a static array.
+
+    Parameters:
+        name (str): array name.
+        data_type (str): element type name.
+        slot (int): first slot of the array.
+        count (int): number of elements.
+        element (list): var dicts of a single element, relative to slot 0.
+        elements_per_slot (int): elements packed into one slot.
+        stride (int): slots used by an element, or by the elements packed into one slot.
+
+    Returns:
+        array_range (dict): range descriptor.
+    """
+    return {'name': name, 'type': RANGE_TYPE, 'dataType': data_type, 'slot': slot, 'count': count,
+            'elementsPerSlot': elements_per_slot, 'stride': stride, 'element': element}
+
+
+def get_range_slot_count(array_range):
+    """Returns number of slots used by the array."""
+    per_slot = array_range['elementsPerSlot']
+    return (array_range['count'] + per_slot - 1) // per_slot * array_range['stride']
+
+
+def get_range_batches(array_range, batch_slots):
+    """Returns [start, stop] element indexes of batches, each batch using about batch_slots slots."""
+    batch_size = max(1, batch_slots // array_range['stride']) * array_range['elementsPerSlot']
+    return [[start, min(start + batch_size, array_range['count'])]
+            for start in range(0, array_range['count'], batch_size)]
+
+
+def expand_array_range(array_range, start=0, stop=None):
+    """
+    Returns var dicts of array elements from start to stop (excluded), as laid out without range descriptor.
+
+    Parameters:
+        array_range (dict): range descriptor.
+        start (int): index of first element.
+        stop (int): index after the last element, all elements from start if not provided.
+
+    Returns:
+        vars_slot_details (list): var dicts of the elements, nested ranges are kept as ranges.
+    """
+    if stop == None or stop > array_range['count']:
+        stop = array_range['count']
+    per_slot = array_range['elementsPerSlot']
+    vars_slot_details = []
+    for i in range(start, stop):
+        base_slot = array_range['slot'] + i // per_slot * array_range['stride']
+        element_name = array_range['name'] + ':' + str(i)
+        for entry in array_range['element']:
+            var_dict = dict(entry)
+            var_dict['name'] = element_name + entry['name']
+            var_dict['slot'] = base_slot + entry['slot']
+            vars_slot_details.append(var_dict)
+    return vars_slot_details
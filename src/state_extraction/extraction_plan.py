@@ -0,0 +1,166 @@
+"""
+Extraction plan, a portable artifact of everything state extraction needs from the source code analysis.
+
+The analyze step (build_extraction_plan) runs the key approximation analysis and ABI generation, which need solc,
+solc-select, Slither and crytic-compile, and writes the slot layout, the struct/contract details it refers to, the
+function ABI with selectors and the key approximation results of the contract into a versioned JSON file. The extract
+step (extract_state_from_plan) loads the plan and extracts the state with web3 only, so extraction workers need no
+compiler toolchain and never parse or compile the source code.
+
+PLAN_VERSION must be increased whenever the format of the plan changes, plans of other versions are rejected.
+
+i.e
+    python3 -m src.state_extraction.extraction_plan analyze <contract name> <source file> <compiler version> <plan file>
+    python3 -m src.state_extraction.extraction_plan extract <plan file> <contract address> <network> [results file]
+"""
+
+import json
+import sys
+from src.compilation.artifact_cache import get_source_hash
+from src.utils.atomic_file import atomic_write
+from src.key_approx_analysis.result_cache import ANALYZER_VERSION
+
+PLAN_FORMAT = 'smartmuv-extraction-plan'
+PLAN_VERSION = 1
+
+
+def get_referenced_contracts(variables_slot_results, all_contracts_dict):
+    """Returns details of the structs and contracts the layout refers to (directly or by their members)."""
+    referenced = {}
+    pending = [variables_slot_results]
+    while len(pending) > 0:
+        node = pending.pop()
+        if isinstance(node, dict):
+            pending += list(node.values())
+        elif isinstance(node, list):
+            pending += node
+        elif isinstance(node, str) and node in all_contracts_dict and node not in referenced:
+            details = all_contracts_dict[node]
+            referenced[node] = {key: details[key] for key in ['type', 'vars'] if key in details}
+            pending.append(referenced[node]['vars'])
+    return referenced
+
+
+def get_function_selectors(contract_abi):
+    """Returns function ABI entries of the contract, and their selectors (selector -> function name)."""
+    from eth_utils import function_abi_to_4byte_selector
+    functions_abi = [entry for entry in contract_abi if entry.get('type') == 'function']
+    selectors = {}
+    for entry in functions_abi:
+        selectors['0x' + function_abi_to_4byte_selector(entry).hex()] = entry['name']
+    return functions_abi, selectors
+
+
+def build_extraction_plan(contract_name, source_code, compiler_version, analysis_results=None, contract_abi=None):
+    """
+    Analyze step, returns extraction plan of the contract.
+
+    Parameters:
+        contract_name (str): contract name.
+        source_code (str): source code of the contract.
+        compiler_version (str): required Solidity compiler version.
+        analysis_results (tuple): already computed results of key_approx_analyzer (optional).
+        contract_abi (list): already generated ABI of the contract (optional).
+
+    Returns:
+        plan (dict): extraction plan (JSON serializable).
+    """
+    # analysis dependencies are only needed by the analyze step
+    from src.key_approx_analysis.key_approx_analyzer import key_approx_analyzer
+    from src.state_extraction.state_extractor import generate_abi
+    if analysis_results == None:
+        analysis_results = key_approx_analyzer(contract_name, source_code, compiler_version)
+    if contract_abi == None:
+        contract_abi = generate_abi(source_code, contract_name, compiler_version)
+    key_analysis_result, complete_analysis_results = analysis_results
+    variables_slot_results = complete_analysis_results['variables_slot_results']
+    functions_abi, selectors = get_function_selectors(contract_abi)
+    plan = {}
+    plan['format'] = PLAN_FORMAT
+    plan['version'] = PLAN_VERSION
+    plan['analyzer_version'] = ANALYZER_VERSION
+    plan['contract_name'] = contract_name
+    plan['compiler_version'] = compiler_version
+    plan['source_hash'] = get_source_hash(source_code)
+    plan['abi'] = functions_abi
+    plan['selectors'] = selectors
+    plan['key_analysis_result'] = {}
+    if contract_name in key_analysis_result:
+        plan['key_analysis_result'][contract_name] = key_analysis_result[contract_name]
+    plan['variables_slot_results'] = variables_slot_results
+    plan['all_contracts_dict'] = get_referenced_contracts(variables_slot_results, complete_analysis_results['all_contracts_dict'])
+    plan['slot_details'] = complete_analysis_results['slot_details']
+    plan['all_vars'] = complete_analysis_results['all_vars']
+    return plan
+
+
+def save_extraction_plan(plan, plan_file):
+    atomic_write(plan_file, lambda f: json.dump(plan, f), 'w')
+
+
+def load_extraction_plan(plan_file):
+    """
+    Returns extraction plan saved by the analyze step.
+
+    Parameters:
+        plan_file (str): path of the plan file.
+
+    Returns:
+        plan (dict): extraction plan, raises error if the file is not a plan of PLAN_VERSION.
+    """
+    with open(plan_file) as f:
+        plan = json.load(f)
+    if plan.get('format') != PLAN_FORMAT:
+        raise ValueError(f"Not an extraction plan - {plan_file}")
+    if plan.get('version') != PLAN_VERSION:
+        raise ValueError(f"Unsupported extraction plan version {plan.get('version')} (requires {PLAN_VERSION}) - {plan_file}")
+    return plan
+
+
+def get_plan_analysis_results(plan):
+    """Returns plan details in the format of key_approx_analyzer results."""
+    complete_analysis_results = {}
+    for key in ['variables_slot_results', 'all_contracts_dict', 'slot_details', 'all_vars']:
+        complete_analysis_results[key] = plan[key]
+    return plan['key_analysis_result'], complete_analysis_results
+
+
+def extract_state_from_plan(plan, cont_addr, net, w3=None, storage=None):
+    """
+    Extract step, extracts complete state of the contract using the extraction plan (no source code analysis).
+
+    Parameters:
+        plan (dict): extraction plan (load_extraction_plan results).
+        cont_addr (str): contract address.
+        net (str): Blockchain Network (should be configured in config.ini file).
+        w3 (object): already connected web3 object (optional).
+        storage (object): storage backend (optional), i.e StateDumpBackend for offline extraction.
+
+    Returns:
+        same as extract_contract_state.
+    """
+    from src.state_extraction.state_extractor import extract_contract_state
+    return extract_contract_state(plan['contract_name'], None, cont_addr, plan['compiler_version'], net, w3=w3,
+                                  contract_abi=plan['abi'], analysis_results=get_plan_analysis_results(plan),
+                                  selectors=plan['selectors'], storage=storage)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 6 and sys.argv[1] == 'analyze':
+        _, _, contract_name, source_file, compiler_version, plan_file = sys.argv
+        with open(source_file) as f:
+            source_code = f.read()
+        save_extraction_plan(build_extraction_plan(contract_name, source_code, compiler_version), plan_file)
+        print("Extraction plan saved -", plan_file)
+    elif len(sys.argv) in [5, 6] and sys.argv[1] == 'extract':
+        final_results = extract_state_from_plan(load_extraction_plan(sys.argv[2]), sys.argv[3], sys.argv[4])[0]
+        if len(sys.argv) == 6:
+            with open(sys.argv[5], 'w') as f:
+                json.dump(final_results, f, default=lambda obj: '0x' + bytes(obj).hex() if isinstance(obj, (bytes, bytearray)) else str(obj))
+        else:
+            for var in final_results:
+                print(var)
+    else:
+        print("Usage:")
+        print("    python3 -m src.state_extraction.extraction_plan analyze <contract name> <source file> <compiler version> <plan file>")
+        print("    python3 -m src.state_extraction.extraction_plan extract <plan file> <contract address> <network> [results file]")
@@ -0,0 +1,399 @@
+"""
+Iterative slot layout engine, producing the same var dicts as calculate_slots.
+
+Variables are laid out from an explicit stack of frames instead of recursive calls, one frame for each struct and
+static array being unrolled, so nested structs and large static arrays never hit the recursion limit. Each frame keeps
+a running byte counter of the slot being packed, sizes come from the static TYPE_BYTES table, and elements of static
+arrays are generated lazily while they are laid out. Static arrays longer than RANGE_ARRAY_LENGTH are laid out as a
+single range descriptor (array_ranges).
+
+calculate_slots copies every member of a struct when the struct is done, once for each enclosing struct. Here members
+are copied once, when they are laid out, with the names of all enclosing structs as prefix (i.e. 'a.b.c'), which
+gives the same results. Results of a frame are appended to a single list, in the order calculate_slots returns them.
+
+Layouts of types laid out at many base slots (mapping values, dynamic array contents and elements of array ranges) are
+memoized relative to slot 0 for each all_contracts, and rebased by adding the base slot (get_rebased_layout), so a
+mapping of 1M struct values lays out the struct once.
+"""
+
+import collections
+import threading
+from src.state_extraction.slot_calculator import TYPE_BYTES
+from src.state_extraction.array_ranges import get_array_range, get_range_array_length, get_range_slot_count, expand_array_range
+
+SLOT_BYTES = 32
+# relative layouts of the most recently used all_contracts, id(all_contracts) -> [all_contracts, {type key: layout}]
+RELATIVE_LAYOUT_CONTRACTS = 8
+relative_layouts = collections.OrderedDict()
+relative_layouts_lock = threading.Lock()
+
+
+class LayoutFrame:
+    """Variables of a struct or static array being laid out, and the slot being packed."""
+    __slots__ = ('variables', 'prefix', 'pending', 'pending_bytes')
+
+    def __init__(self, variables, prefix):
+        self.variables = iter(variables)
+        self.prefix = prefix
+        self.pending = []
+        self.pending_bytes = 0
+
+
+class LayoutEngine:
+    __slots__ = ('slot', 'all_contracts', 'results', 'range_length')
+
+    def __init__(self, curr_slot_num, all_contracts, range_length=None):
+        self.slot = curr_slot_num
+        self.all_contracts = all_contracts
+        self.results = []
+        self.range_length = range_length
+
+    def add_result(self, frame, var):
+        if frame.prefix == '':
+            self.results.append(var)
+            return
+        # members of structs are copied with names of enclosing structs (as calculate_slots does for each struct)
+        var_dict = dict(var)
+        var_dict['name'] = frame.prefix + var['name']
+        if var['type'] != 'Mapping' and 'dataType' not in var:
+            var_dict['dataType'] = var['dataTypeType']
+        self.results.append(var_dict)
+
+    def flush(self, frame):
+        # assigns the next slot to the variables packed so far
+        pending = frame.pending
+        if len(pending) == 0:
+            return
+        self.slot += 1
+        for var in pending:
+            var['slot'] = self.slot
+        if frame.prefix == '':
+            self.results.extend(pending)
+        else:
+            for var in pending:
+                self.add_result(frame, var)
+        frame.pending = []
+        frame.pending_bytes = 0
+
+    def new_slot(self, frame, var):
+        self.slot += 1
+        var['slot'] = self.slot
+        self.add_result(frame, var)
+
+    def pack(self, frame, var, var_bytes):
+        if frame.pending_bytes + var_bytes > SLOT_BYTES:
+            self.flush(frame)
+            if var_bytes == SLOT_BYTES:
+                self.new_slot(frame, var)
+                return
+        frame.pending.append(var)
+        frame.pending_bytes += var_bytes
+        if frame.pending_bytes == SLOT_BYTES:
+            self.flush(frame)
+
+    def is_contract(self, data_type):
+        details = self.all_contracts.get(data_type)
+        return details != None and details.get('type') == 'ContractDefinition'
+
+    def layout_user_defined(self, frame, var, stack):
+        if self.is_contract(var['dataType']):
+            # contracts are stored as addresses
+            var['dataType'] = 'address'
+            if ':key:' not in var['name']:
+                var['name'] = var['name'] + '.address'
+            var['type'] = 'ElementaryTypeName'
+            var['bytes'] = 20
+            self.pack(frame, var, 20)
+            return
+        self.flush(frame)
+        type_vars = var['typeVars']
+        if type(type_vars) == str:
+            type_vars = self.all_contracts[type_vars]['vars']
+        if type_vars != []:
+            stack.append(LayoutFrame(type_vars, frame.prefix + var['name'] + '.'))
+        else:
+            # empty struct definition gets an empty slot
+            var['bytes'] = 32
+            self.new_slot(frame, var)
+
+    def layout_dynamic_array(self, frame, var):
+        all_contracts = self.all_contracts
+        if var['dataTypeName'] in TYPE_BYTES:
+            var['bytes'] = TYPE_BYTES[var['dataTypeName']]
+        if var['dataTypeType'] == 'UserDefinedTypeName':
+            if '.' in var['dataTypeName']:
+                var['dataTypeName'] = var['dataTypeName'].split('.')[-1]
+            type_vars = all_contracts[var['dataTypeName']]['vars']
+            if type_vars == []:
+                var['dataType'] = 'address'
+            elif 'dataType' in type_vars[0]:
+                if type_vars[0]['dataType'] == 'enum':
+                    var['dataType'] = 'enum'
+            else:
+                var['typeVars'] = type_vars
+        self.new_slot(frame, var)
+
+    def layout_array_range(self, frame, var, array_len, element):
+        array_range = get_element_range(var, array_len, element, self.slot + 1, self.all_contracts, self.range_length)
+        self.slot += get_range_slot_count(array_range)
+        self.add_result(frame, array_range)
+
+    def layout_static_array(self, frame, var, stack):
+        # returns True if a frame was pushed for the elements
+        if self.range_length == None:
+            self.range_length = get_range_array_length()
+        if var['dimension'] == 'single':
+            array_len = int(var['length'][0])
+            if array_len > self.range_length:
+                self.layout_array_range(frame, var, array_len, get_static_array_element(var, '', self.all_contracts))
+                return False
+            stack.append(LayoutFrame(static_array_elements(var, array_len, self.all_contracts), frame.prefix))
+            return True
+        # elements of a multi dimension static array are arrays of the remaining dimensions (lengths are innermost first)
+        var['curr'] += 1
+        remaining = len(var['length']) - var['curr'] - 1
+        array_len = int(var['length'][remaining])
+        if array_len > self.range_length:
+            self.layout_array_range(frame, var, array_len, get_multi_array_element(var, '', remaining))
+            return False
+        stack.append(LayoutFrame(multi_array_elements(var, array_len, remaining), frame.prefix))
+        return True
+
+    def layout_variable(self, frame, var, stack):
+        # returns True if a frame was pushed for the variable (struct or static array)
+        var_type = var['type']
+        if var_type == 'Mapping':
+            self.flush(frame)
+            self.new_slot(frame, var)
+        elif var_type == 'UserDefinedTypeName':
+            depth = len(stack)
+            self.layout_user_defined(frame, var, stack)
+            return len(stack) > depth
+        elif var_type == 'ArrayTypeName':
+            self.flush(frame)
+            if var['StorageType'] == 'dynamic':
+                self.layout_dynamic_array(frame, var)
+                return False
+            return self.layout_static_array(frame, var, stack)
+        return False
+
+    def run(self, var_list):
+        stack = [LayoutFrame(var_list, '')]
+        while len(stack) > 0:
+            frame = stack[-1]
+            pushed = False
+            # the frame iterator is kept, so the frame continues after the pushed frame is done
+            for var in frame.variables:
+                if var['type'] == 'ElementaryTypeName':
+                    # elementary variables are packed inline, as most variables are elementary
+                    var_bytes = TYPE_BYTES[var['dataType']]
+                    var['bytes'] = var_bytes
+                    if frame.pending_bytes + var_bytes <= SLOT_BYTES:
+                        frame.pending.append(var)
+                        frame.pending_bytes += var_bytes
+                        if frame.pending_bytes == SLOT_BYTES:
+                            self.flush(frame)
+                    else:
+                        self.pack(frame, var, var_bytes)
+                elif self.layout_variable(frame, var, stack):
+                    pushed = True
+                    break
+            if not pushed:
+                # frame is done, its last slot is assigned before the enclosing frame continues
+                self.flush(frame)
+                stack.pop()
+        return self.slot, self.results
+
+
+def get_static_array_element(var, name, all_contracts):
+    var_dict = {}
+    var_dict['dataType'] = var['dataTypeName']
+    var_dict['type'] = var['dataTypeType']
+    var_dict['name'] = name
+    if var_dict['type'] == 'UserDefinedTypeName':
+        if '.' in var_dict['dataType']:
+            var_dict['dataType'] = var_dict['dataType'].split('.')[-1]
+        type_vars = all_contracts[var_dict['dataType']]['vars']
+        if type_vars == []:
+            var_dict['type'] = 'ElementaryTypeName'
+            var_dict['dataType'] = 'address'
+            var_dict['bytes'] = 20
+        elif type_vars[0].get('dataType') == 'enum':
+            var_dict['type'] = 'ElementaryTypeName'
+            var_dict['dataType'] = 'enum'
+        else:
+            var_dict['typeVars'] = type_vars
+    return var_dict
+
+
+def get_multi_array_element(var, name, remaining):
+    var_dict = var.copy()
+    var_dict['name'] = name
+    if remaining == 1:
+        var_dict['dimension'] = 'single'
+    return var_dict
+
+
+def static_array_elements(var, array_len, all_contracts):
+    # elements of a single dimension static array, generated while they are laid out
+    for i in range(0, array_len):
+        yield get_static_array_element(var, var['name'] + ':' + str(i), all_contracts)
+
+
+def multi_array_elements(var, array_len, remaining):
+    for i in range(0, array_len):
+        yield get_multi_array_element(var, var['name'] + ':' + str(i), remaining)
+
+
+def get_type_key(var, all_contracts):
+    # details of the type (all but the name), None if the type can not be memoized
+    key = []
+    for detail in sorted(var.keys()):
+        if detail in ['name', 'slot']:
+            continue
+        value = var[detail]
+        if detail == 'typeVars' and type(value) != str:
+            # struct members are identified by the struct name
+            if value is not all_contracts.get(var.get('dataType'), {}).get('vars'):
+                return None
+            value = var['dataType']
+        key.append((detail, repr(value)))
+    return tuple(key)
+
+
+def get_relative_layout(var, all_contracts, range_length=None):
+    """
+    Returns layout of the variable relative to slot 0, memoized for each type of all_contracts.
+
+    Parameters:
+        var (dict): var dict of the variable (not modified).
+        all_contracts (dict): details of all contracts and structs.
+        range_length (int): length above which static arrays are laid out as ranges, read from config.ini if not
+            provided.
+
+    Returns:
+        placeholder (str): name of the variable in the relative layout, prefix of every name in the layout.
+        slot_count (int): number of slots used by the variable.
+        layout (list): var dicts relative to slot 0 (shared, must not be modified).
+    """
+    if range_length == None:
+        range_length = get_range_array_length()
+    # names of contract variables change with ':key:' (mapping values), every other name is just a prefix
+    placeholder = ':key:' if ':key:' in var['name'] else ''
+    type_key = get_type_key(var, all_contracts)
+    if type_key != None:
+        type_key = (placeholder, range_length, type_key)
+        with relative_layouts_lock:
+            if id(all_contracts) in relative_layouts:
+                relative_layouts.move_to_end(id(all_contracts))
+                memo = relative_layouts[id(all_contracts)][1]
+                if type_key in memo:
+                    return memo[type_key]
+    relative_var = dict(var)
+    relative_var['name'] = placeholder
+    last_slot, layout = calculate_layout([relative_var], -1, all_contracts, range_length)
+    relative_layout = (placeholder, last_slot + 1, layout)
+    if type_key != None:
+        with relative_layouts_lock:
+            if id(all_contracts) not in relative_layouts:
+                relative_layouts[id(all_contracts)] = [all_contracts, {}]
+                if len(relative_layouts) > RELATIVE_LAYOUT_CONTRACTS:
+                    relative_layouts.popitem(last=False)
+            relative_layouts[id(all_contracts)][1][type_key] = relative_layout
+    return relative_layout
+
+
+def get_rebased_layout(var, slot, all_contracts, range_length=None):
+    """
+    Returns layout of the variable starting at the slot (same as calculate_layout([var], slot - 1, all_contracts)
+    results), rebased from the memoized relative layout of its type.
+
+    Parameters:
+        var (dict): var dict of the variable (not modified).
+        slot (int): first slot of the variable.
+        all_contracts (dict): details of all contracts and structs.
+        range_length (int): length above which static arrays are laid out as ranges, read from config.ini if not
+            provided.
+
+    Returns:
+        vars_slot_details (list): var dicts with slot details.
+    """
+    placeholder, _, layout = get_relative_layout(var, all_contracts, range_length)
+    name = var['name']
+    prefix_len = len(placeholder)
+    vars_slot_details = []
+    for entry in layout:
+        var_dict = entry.copy()
+        var_dict['name'] = name + entry['name'][prefix_len:]
+        var_dict['slot'] += slot
+        vars_slot_details.append(var_dict)
+    return vars_slot_details
+
+
+def get_element_range(var, array_len, element, slot, all_contracts, range_length=None):
+    """
+    Returns range descriptor of a static array starting at the slot, only a single element is laid out.
+
+    Parameters:
+        var (dict): var dict of the array.
+        array_len (int): number of elements.
+        element (dict): var dict of an element, named ''.
+        slot (int): first slot of the array.
+        all_contracts (dict): details of all contracts and structs.
+        range_length (int): length above which static arrays are laid out as ranges.
+
+    Returns:
+        array_range (dict): range descriptor (array_ranges).
+    """
+    _, element_slots, element_layout = get_relative_layout(element, all_contracts, range_length)
+    # elements smaller than 16 bytes are packed like elementary variables
+    elements_per_slot = 1
+    if len(element_layout) == 1 and element_layout[0]['type'] == 'ElementaryTypeName':
+        elements_per_slot = SLOT_BYTES // element_layout[0]['bytes']
+    return get_array_range(var['name'], element.get('dataType', var['dataTypeName']), slot, array_len, element_layout,
+                           elements_per_slot, element_slots)
+
+
+def get_array_layout(var, slot, all_contracts, range_length=None):
+    """
+    Returns layout of a single dimension static array starting at the slot (same as calculate_layout results), built
+    from the memoized layout of its element type.
+
+    Parameters:
+        var (dict): var dict of the array.
+        slot (int): first slot of the array.
+        all_contracts (dict): details of all contracts and structs.
+        range_length (int): length above which static arrays are laid out as ranges, read from config.ini if not
+            provided.
+
+    Returns:
+        vars_slot_details (list): var dicts of the elements, or range descriptor of arrays longer than range_length.
+    """
+    if range_length == None:
+        range_length = get_range_array_length()
+    array_len = int(var['length'][0])
+    element = get_static_array_element(var, '', all_contracts)
+    array_range = get_element_range(var, array_len, element, slot, all_contracts, range_length)
+    if array_len > range_length:
+        return [array_range]
+    return expand_array_range(array_range)
+
+
+def calculate_layout(var_list, curr_slot_num, all_contracts, range_length=None):
+    """
+    Takes in a array of variables, start slot number and list of all contracts inside the source file, returns slot
+    number of each variable in the input array (same results as calculate_slots).
+
+    Parameters:
+        var_list (list): var dicts of state variables (get_contract_details results).
+        curr_slot_num (int): slot before the first variable.
+        all_contracts (dict): details of all contracts and structs.
+        range_length (int): length above which static arrays are laid out as ranges, read from config.ini if not
+            provided.
+
+    Returns:
+        curr_slot_num (int): last used slot.
+        vars_slot_details (list): var dicts with slot (and bytes) of each variable, struct members and array elements
+            (range descriptors of static arrays longer than range_length).
+    """
+    return LayoutEngine(curr_slot_num, all_contracts, range_length).run(var_list)
@@ -0,0 +1,248 @@
+"""
+Provides slot layout of the contract state variables.
+
+For solc 0.5.13 and later the exact storageLayout output of the compiler is converted into the variable details
+(var dicts) produced by calculate_layout, for older compilers (or if compilation fails) calculate_layout is used.
+
+LAYOUT_PROVIDER (config.ini) options:
+    auto        - storageLayout if supported by the compiler, otherwise calculate_layout.
+    solc        - storageLayout only (raises error if not available).
+    python      - calculate_layout only.
+    cross_check - storageLayout and calculate_layout, reports any disagreement and returns storageLayout results.
+"""
+
+from configparser import ConfigParser
+from src.state_extraction.layout_engine import calculate_layout
+from src.state_extraction.array_ranges import get_array_range, get_range_array_length
+from src.compilation.compiler_resolver import get_pragma_version
+from src.compilation.artifact_cache import get_compilation_artifacts, supports_storage_layout, STORAGE_LAYOUT_MIN_VERSION
+
+
+# converts solc storage type to the type name AST (solidity_parser format) used by mapping extraction
+def solc_type_to_type_name(type_id, types):
+    type_details = types[type_id]
+    if type_details['encoding'] == 'mapping':
+        return {'type': 'Mapping', 'keyType': solc_type_to_type_name(type_details['key'], types),
+                'valueType': solc_type_to_type_name(type_details['value'], types)}
+    if 'base' in type_details:
+        length = None
+        if type_details['encoding'] == 'inplace':
+            length = {'type': 'NumberLiteral', 'number': get_static_array_length(type_id), 'subdenomination': None}
+        return {'type': 'ArrayTypeName', 'baseTypeName': solc_type_to_type_name(type_details['base'], types), 'length': length}
+    label = type_details['label']
+    if label.startswith('struct ') or label.startswith('enum ') or label.startswith('contract '):
+        return {'type': 'UserDefinedTypeName', 'namePath': label.split(' ')[1].split('.')[-1]}
+    return {'type': 'ElementaryTypeName', 'name': get_elementary_type(label)}
+
+
+def get_elementary_type(label):
+    if label.startswith('address'):
+        return 'address'
+    if label.startswith('enum '):
+        return 'enum'
+    return label
+
+
+# static array type ids are of the form t_array(t_uint256)10_storage
+def get_static_array_length(type_id):
+    return type_id[type_id.rindex(')')+1:].split('_')[0]
+
+
+def get_array_details(type_id, types):
+    lens = []
+    while 'base' in types[type_id]:
+        if types[type_id]['encoding'] == 'inplace':
+            lens.append(get_static_array_length(type_id))
+        else:
+            lens.append(None)
+        type_id = types[type_id]['base']
+    return lens, type_id
+
+
+def layout_elementary_var(name, type_details, slot):
+    label = type_details['label']
+    var_dict = {}
+    var_dict['type'] = 'ElementaryTypeName'
+    if label.startswith('contract '):
+        # contract is a pointer/address
+        var_dict['dataType'] = 'address'
+        if ':key:' not in name:
+            name = name + '.address'
+    else:
+        var_dict['dataType'] = get_elementary_type(label)
+    var_dict['name'] = name
+    var_dict['bytes'] = int(type_details['numberOfBytes'])
+    var_dict['slot'] = slot
+    return var_dict
+
+
+def convert_storage_item(name, type_id, slot, types, all_contracts, range_length):
+    """
+    Converts a storage item of solc storageLayout into var dicts (same format as calculate_layout results).
+
+    Parameters:
+        name (str): variable name (including prefix of parent struct/array).
+        type_id (str): solc storage type id.
+        slot (int): slot of the variable.
+        types (dict): solc storageLayout types.
+        all_contracts (dict): details of all contracts, structs and enums in the source code.
+        range_length (int): length above which static arrays are converted into range descriptors.
+
+    Returns:
+        vars_slot_details (list): var dicts with slot details.
+    """
+    type_details = types[type_id]
+    if type_details['encoding'] == 'mapping':
+        var_dict = solc_type_to_type_name(type_id, types)
+        var_dict['name'] = name
+        var_dict['slot'] = slot
+        return [var_dict]
+    if type_details['encoding'] == 'dynamic_array':
+        lens, base_type = get_array_details(type_id, types)
+        base_name = solc_type_to_type_name(base_type, types)
+        var_dict = {}
+        var_dict['type'] = 'ArrayTypeName'
+        if base_name['type'] == 'ElementaryTypeName':
+            var_dict['dataTypeType'] = 'ElementaryTypeName'
+            var_dict['dataTypeName'] = base_name['name']
+        else:
+            var_dict['dataTypeType'] = 'UserDefinedTypeName'
+            var_dict['dataTypeName'] = base_name['namePath']
+        lens.reverse()
+        var_dict['length'] = lens
+        var_dict['name'] = name
+        var_dict['curr'] = -1
+        var_dict['dimension'] = 'multi' if len(lens) > 1 else 'single'
+        var_dict['StorageType'] = 'dynamic'
+        var_dict['slot'] = slot
+        base_label = types[base_type]['label']
+        if base_name['type'] == 'ElementaryTypeName':
+            var_dict['bytes'] = int(types[base_type]['numberOfBytes'])
+        elif base_label.startswith('contract '):
+            var_dict['dataType'] = 'address'
+        elif base_label.startswith('enum '):
+            var_dict['dataType'] = 'enum'
+        elif var_dict['dataTypeName'] in all_contracts:
+            var_dict['typeVars'] = all_contracts[var_dict['dataTypeName']]['vars']
+        return [var_dict]
+    if 'base' in type_details:
+        # static array, every element is laid out on its own (elements smaller than 32 bytes are packed)
+        vars_slot_details = []
+        element_type = type_details['base']
+        element_bytes = int(types[element_type]['numberOfBytes'])
+        length = int(get_static_array_length(type_id))
+        if length > range_length:
+            # only a single element is converted, relative to slot 0
+            element = convert_storage_item('', element_type, 0, types, all_contracts, range_length)
+            if element_bytes <= 16:
+                elements_per_slot, stride = 32 // element_bytes, 1
+            else:
+                elements_per_slot, stride = 1, (element_bytes + 31) // 32
+            data_type = solc_type_to_type_name(element_type, types)
+            data_type = data_type.get('name', data_type.get('namePath', data_type['type']))
+            return [get_array_range(name, data_type, slot, length, element, elements_per_slot, stride)]
+        if element_bytes <= 16:
+            per_slot = 32 // element_bytes
+            for i in range(length):
+                vars_slot_details += convert_storage_item(
+                    name + ':' + str(i), element_type, slot + i // per_slot, types, all_contracts, range_length)
+        else:
+            element_slots = (element_bytes + 31) // 32
+            for i in range(length):
+                vars_slot_details += convert_storage_item(
+                    name + ':' + str(i), element_type, slot + i * element_slots, types, all_contracts, range_length)
+        return vars_slot_details
+    if 'members' in type_details:
+        vars_slot_details = []
+        for member in sorted(type_details['members'], key=lambda m: (int(m['slot']), m['offset'])):
+            vars_slot_details += convert_storage_item(
+                name + '.' + member['label'], member['type'], slot + int(member['slot']), types, all_contracts, range_length)
+        return vars_slot_details
+    return [layout_elementary_var(name, type_details, slot)]
+
+
+def convert_storage_layout(storage_layout, all_contracts):
+    vars_slot_details = []
+    types = storage_layout['types'] or {}
+    range_length = get_range_array_length()
+    for item in sorted(storage_layout['storage'], key=lambda i: (int(i['slot']), i['offset'])):
+        vars_slot_details += convert_storage_item(item['label'], item['type'], int(item['slot']), types, all_contracts,
+                                                  range_length)
+    return vars_slot_details
+
+
+def get_solc_layout(contract_name, source_code, compiler_version, all_contracts):
+    # older compilers are rejected before the compiler is resolved (and installed) or the source code is compiled
+    if not supports_storage_layout(source_code, compiler_version):
+        version = compiler_version or get_pragma_version(source_code)
+        raise Exception(f"storageLayout is not supported by solc '{version}' (requires {STORAGE_LAYOUT_MIN_VERSION})")
+    artifacts = get_compilation_artifacts(source_code, compiler_version)
+    if 'storageLayout' not in artifacts['outputs']:
+        raise Exception(f"storageLayout is not supported by solc {artifacts['version']} (requires {STORAGE_LAYOUT_MIN_VERSION})")
+    storage_layout = artifacts['contracts'][contract_name]['storageLayout']
+    return convert_storage_layout(storage_layout, all_contracts)
+
+
+def get_python_layout(contract_name, all_contracts):
+    _, variables_slot_results = calculate_layout(all_contracts[contract_name]['vars'], -1, all_contracts)
+    return variables_slot_results
+
+
+def compare_layouts(solc_layout, python_layout):
+    """Returns list of disagreements between storageLayout and calculate_layout results."""
+    def layout_entries(layout):
+        entries = {}
+        for var in layout:
+            entries[var['name']] = (var['type'], var['slot'], var.get('bytes') if var['type'] == 'ElementaryTypeName' else None)
+        return entries
+    solc_entries = layout_entries(solc_layout)
+    python_entries = layout_entries(python_layout)
+    disagreements = []
+    for name in solc_entries:
+        if name not in python_entries:
+            disagreements.append([name, solc_entries[name], None])
+        elif solc_entries[name] != python_entries[name]:
+            disagreements.append([name, solc_entries[name], python_entries[name]])
+    for name in python_entries:
+        if name not in solc_entries:
+            disagreements.append([name, None, python_entries[name]])
+    return disagreements
+
+
+def get_variables_layout(contract_name, source_code, compiler_version, all_contracts, mode=None):
+    """
+    Returns slot details of all state variables of the contract.
+
+    Parameters:
+        contract_name (str): contract name.
+        source_code (str): source code of the contract.
+        compiler_version (str): required compiler version.
+        all_contracts (dict): details of all contracts, structs and enums (results of get_contract_details).
+        mode (str): layout provider (auto, solc, python or cross_check), read from config.ini if not provided.
+
+    Returns:
+        variables_slot_results (list): details of slots of all state variables.
+    """
+    if mode == None:
+        config = ConfigParser()
+        config.read("config.ini")
+        mode = config.get('layout', 'layout_provider', fallback='auto')
+    if mode == 'python':
+        return get_python_layout(contract_name, all_contracts)
+    try:
+        solc_layout = get_solc_layout(contract_name, source_code, compiler_version, all_contracts)
+    except Exception as e:
+        if mode == 'solc':
+            raise
+        if mode == 'cross_check':
+            print("Warning: Could not cross check slot layout -", e)
+        return get_python_layout(contract_name, all_contracts)
+    if mode == 'cross_check':
+        disagreements = compare_layouts(solc_layout, get_python_layout(contract_name, all_contracts))
+        if len(disagreements) > 0:
+            print(f"Slot layout disagreements (name, storageLayout, calculate_layout) - {len(disagreements)}")
+            for disagreement in disagreements:
+                print(disagreement)
+        else:
+            print("Slot layout of storageLayout and calculate_layout is same.")
+    return solc_layout
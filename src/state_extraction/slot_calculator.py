@@ -1,16 +1,15 @@
+# sizes of elementary types in storage, built once
+TYPE_BYTES = {'uint': 32, 'uint256': 32, 'address': 20, 'int256': 32,
+              'int': 32, 'string32': 32, 'bool': 1, 'string': 32, 'bytes': 32, 'enum': 1}
+for i in range(1, 33):
+    TYPE_BYTES['bytes' + str(i)] = i
+    TYPE_BYTES['uint' + str(i*8)] = i
+    TYPE_BYTES['int' + str(i*8)] = i
+
 
 def get_bytes(_type):
     """Takes in a type name, returns the bytes for the type"""
-    # Can be optimized with static allocation of sizemap
-    sizemap = {'uint': 32, 'uint256': 32, 'address': 20, 'int256': 32,
-               'int': 32, 'string32': 32, 'bool': 1, 'string': 32, 'bytes': 32, 'enum': 1}
-    for i in range(1, 33):
-        sizemap['bytes'+ str(i)] = i
-    for i in range(1, 33):
-        sizemap['uint'+ str(i*8)] = i
-    for i in range(1, 33):
-        sizemap['int'+ str(i*8)] = i
-    return sizemap[_type]
+    return TYPE_BYTES[_type]
 
 
 def calculate_slots(var_list, curr_slot_num, all_contracts):
@@ -1,71 +1,57 @@
 from logging import raiseExceptions
 import pprint
-from src.key_approx_analysis.key_approx_analyzer import extract_slot_details, generate_final_key_approx_results, key_approx_analyzer
-from src.state_extraction.transactions import get_internal_transactions
-from src.state_extraction.transactions import get_transactions
-from src.state_extraction.slot_calculator import calculate_slots
-from src.ast_parsing.ast_parser import generate_ast, get_contract_details, get_contract_details_new
+from src.key_approx_analysis.key_approx_analyzer import extract_slot_details, generate_final_key_approx_results, key_approx_analyzer, get_contract_layout
+from src.state_extraction.layout_engine import calculate_layout, get_rebased_layout, get_array_layout
+from src.state_extraction.array_ranges import RANGE_TYPE, expand_array_range, get_range_batches, get_range_batch_slots
+from src.state_extraction.storage_backend import RpcStorageBackend
+from src.ast_parsing.ast_parser import generate_ast, get_contract_details
+from src.compilation.artifact_cache import get_contract_abi
 import collections
 import itertools
 import math
 from hexbytes import HexBytes
 import warnings
-import solcx
-from solcx import compile_source
-from solc_select import solc_select
-from web3.auto import Web3
-from web3.middleware import geth_poa_middleware
 from configparser import ConfigParser
 import copy
 warnings.filterwarnings("ignore")
 
-# switch Solidity compiler to required version
-def switch_compiler(compiler_version):
-    if compiler_version != '':
-        for i in range(len(compiler_version)):
-            if compiler_version[i].isdigit():
-                compiler_version = compiler_version[i:]
-                break
-        for i in range(len(compiler_version)):
-            if not compiler_version[len(compiler_version)-i-1].isdigit():
-                compiler_version = compiler_version[:len(compiler_version)-i-1]
-                break
-            else:
-                break
-        if len(compiler_version.split('<=')) > 1:
-            compiler_version = compiler_version.split('<=')[1]
-        if len(compiler_version.split('<')) > 1:
-            compiler_version = compiler_version.split('<')[1]
-        compiler_version = compiler_version.split('>')[0]
-        compiler_version = compiler_version.split('^')[0]
-        if compiler_version.count('.') == 1:
-            compiler_version += '.0'
-
-        if str(solcx.get_solc_version()) != compiler_version:
-            compiler_version_solcx = compiler_version
-            if '0.3' in compiler_version:
-                compiler_version_solcx = '0.4.11'
-            if '0.4.1' in compiler_version and len(compiler_version) <= 5:
-                compiler_version_solcx = '0.4.11'
-            try:
-                solcx.set_solc_version(compiler_version_solcx)
-                print('solcx ->', solcx.get_solc_version())
-            except Exception as e:
-                print('solcx -', e)
-                try:
-                    solcx.install_solc(compiler_version_solcx)
-                    solcx.set_solc_version(compiler_version_solcx)
-                except:
-                    pass
-        if solc_select.current_version()[0] != compiler_version:
-            if '0.3' in compiler_version:
-                compiler_version = '0.4.0'
-            try:
-                solc_select.switch_global_version(compiler_version, True)
-                print('solc ->', solc_select.current_version()[0])
-            except Exception as e:
-                print('solc-select -', str(e))
-    return
+# heavy dependencies (web3, requests) are imported only in the code paths that need them
+
+# returns RPC and block explorer details of the provided network (configured in config.ini file)
+def get_network_details(net):
+    config = ConfigParser()
+    config.read("config.ini")
+    if net == "test":
+        scanner, node, node_prefix, tx_prefix = 'etherscan', 'infura', 'infura_test', 'test_'
+    elif net == "mainnet":
+        scanner, node, node_prefix, tx_prefix = 'etherscan', 'infura', 'infura', ''
+    elif net == "mumbai":
+        scanner, node, node_prefix, tx_prefix = 'polygonscan', 'infura', 'rpc_poly_test', 'test_'
+    elif net == "polygon":
+        scanner, node, node_prefix, tx_prefix = 'polygonscan', 'infura', 'rpc_poly', ''
+    elif net == "bsctest":
+        scanner, node, node_prefix, tx_prefix = 'bscscan', 'infura', 'rpc_bsc_test', 'test_'
+    elif net == "bsc":
+        scanner, node, node_prefix, tx_prefix = 'bscscan', 'infura', 'rpc_bsc', ''
+    else:
+        raise ValueError(f"Unknown network - {net}")
+    network = {}
+    network['node_link'] = config.get(node, node_prefix + '_node_link')
+    network['node_pid'] = config.get(node, node_prefix + '_pid')
+    network['api_key'] = config.get(scanner, scanner + '_api_key')
+    network['transaction_link'] = config.get(scanner, tx_prefix + 'transaction_link')
+    network['internal_transaction_link'] = config.get(scanner, tx_prefix + 'internal_transaction_link')
+    return network
+
+
+# creates web3 object connected to the RPC of provided network
+def connect_web3(net):
+    from web3.auto import Web3
+    from web3.middleware import geth_poa_middleware
+    network = get_network_details(net)
+    w3 = Web3(Web3.HTTPProvider(network['node_link'] + network['node_pid']))
+    w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+    return w3
 
 
 def get_final_results(results):
@@ -76,7 +62,7 @@ def get_final_results(results):
     return final_results
 
 # transforms raw extracted data into readable format
-def generate_readable_results(contract_addr, results, w3):
+def generate_readable_results(contract_addr, results, w3, storage):
     for var in results:
         if len(var) < 5:
             continue 
@@ -111,7 +97,7 @@ def generate_readable_results(contract_addr, results, w3):
                     string_data_slot = w3.to_int(string_data_slot)
                     complete_string = ''
                     for curr_slot in range(0, math.ceil(string_length/64)):
-                        val = w3.eth.get_storage_at(w3.to_checksum_address(contract_addr), string_data_slot+curr_slot)
+                        val = storage.get_storage(contract_addr, string_data_slot+curr_slot)
                         complete_string += val.decode("utf-8").split(u'\x00')[0]
                     var[2] = complete_string #updating string value
                     var[4] += "|"+str(string_data_slot) # updating string slot with string data slot
@@ -181,20 +167,11 @@ def transform_result(results):
     return mapping_data
 
 
-def generate_abi(source_code, cont_name):
-    compiled_contracts = compile_source(source_code)
-    for contract in compiled_contracts:
-        if ":" in contract:
-            curr_cont_name = contract.split(":")[1]
-        else:
-            curr_cont_name = contract
-        if cont_name == curr_cont_name:
-            cont_abi = compiled_contracts[contract]['abi']
-            break
-    return cont_abi
+def generate_abi(source_code, cont_name, compiler_version=''):
+    return get_contract_abi(source_code, cont_name, compiler_version)
 
 # extracts data/values of regular/elementary variables
-def extract_elementry_variables(ord_slots, cont_addr, slots_and_data, w3):
+def extract_elementry_variables(ord_slots, cont_addr, slots_and_data, w3, storage):
 
     total_vars = len(ord_slots)
     var_lst = []
@@ -202,60 +179,112 @@ def extract_elementry_variables(ord_slots, cont_addr, slots_and_data, w3):
         if not ind % 100 and total_vars > 100:
             print(f"Extracted {ind} out of {total_vars}")
         vars1 = ord_slots[key]
-        val = w3.eth.get_storage_at(w3.to_checksum_address(cont_addr), key)
-        bytes_used = 0
-        byte_str = val
-        sep_bytes = [byte_str[i:i+1] for i in range(0, len(byte_str), 1)]
-        if len(sep_bytes) == 1:
-            sep_bytes[0] = HexBytes(HexBytes('0x00')+HexBytes(sep_bytes[0]))
-        # as one slot is 32 bytes, list must have 32 entries
-        sep_bytes = [HexBytes('0x00')] * (32 - len(sep_bytes))+sep_bytes
-        var_names = [var['name'] for var in vars1]
-        hex_val = w3.to_hex(b''.join(sep_bytes))
-        if hex_val != "0x0000000000000000000000000000000000000000000000000000000000000000":
-            if [str(val), hex_val, hex(key), var_names] not in slots_and_data:
-                slots_and_data.append([str(val), hex_val, hex(key), var_names])
-        if len(vars1) > 1:
-            sep_bytes.reverse()
-            for var in vars1:
-                tmp = []
-                for j in range(math.ceil(bytes_used), math.ceil((bytes_used+var['bytes']))):
-                    try:
-                        tmp.append(sep_bytes[j])
-                    except Exception as e:
-                        print(e)
-                bytes_used += var['bytes']
-                tmp.reverse()
-                # print(b''.join(tmp))
-                extracted_var = [var['name'], var['dataType'], b''.join(tmp), var['bytes'], hex(key)]
-                var_lst.append(extracted_var) 
-        else:
-            sep_bytes.reverse()
+        val = storage.get_storage(cont_addr, key)
+        var_lst += decode_slot_variables(vars1, val, key, slots_and_data, w3)
+    if total_vars > 100:
+        print("Completed!")
+    return var_lst, slots_and_data
+
+# splits value of a slot into values of the variables packed in the slot
+def decode_slot_variables(vars1, val, key, slots_and_data, w3):
+    var_lst = []
+    bytes_used = 0
+    byte_str = val
+    sep_bytes = [byte_str[i:i+1] for i in range(0, len(byte_str), 1)]
+    if len(sep_bytes) == 1:
+        sep_bytes[0] = HexBytes(HexBytes('0x00')+HexBytes(sep_bytes[0]))
+    # as one slot is 32 bytes, list must have 32 entries
+    sep_bytes = [HexBytes('0x00')] * (32 - len(sep_bytes))+sep_bytes
+    var_names = [var['name'] for var in vars1]
+    hex_val = w3.to_hex(b''.join(sep_bytes))
+    if hex_val != "0x0000000000000000000000000000000000000000000000000000000000000000":
+        if [str(val), hex_val, hex(key), var_names] not in slots_and_data:
+            slots_and_data.append([str(val), hex_val, hex(key), var_names])
+    if len(vars1) > 1:
+        sep_bytes.reverse()
+        for var in vars1:
             tmp = []
-            for j in range(0, math.ceil(vars1[0]['bytes'])):
+            for j in range(math.ceil(bytes_used), math.ceil((bytes_used+var['bytes']))):
                 try:
                     tmp.append(sep_bytes[j])
                 except Exception as e:
                     print(e)
+            bytes_used += var['bytes']
             tmp.reverse()
-            extracted_var = [vars1[0]['name'], vars1[0]['dataType'], b''.join(tmp), vars1[0]['bytes'], hex(key)]
-            var_lst.append(extracted_var)
-    if total_vars > 100:
-        print("Completed!")
-    return var_lst, slots_and_data
+            # print(b''.join(tmp))
+            extracted_var = [var['name'], var['dataType'], b''.join(tmp), var['bytes'], hex(key)]
+            var_lst.append(extracted_var) 
+    else:
+        sep_bytes.reverse()
+        tmp = []
+        for j in range(0, math.ceil(vars1[0]['bytes'])):
+            try:
+                tmp.append(sep_bytes[j])
+            except Exception as e:
+                print(e)
+        tmp.reverse()
+        extracted_var = [vars1[0]['name'], vars1[0]['dataType'], b''.join(tmp), vars1[0]['bytes'], hex(key)]
+        var_lst.append(extracted_var)
+    return var_lst
+
+# values of variables packed in a zero slot, same as decode_slot_variables gives without splitting the slot bytes
+def zero_slot_variables(vars1, key):
+    var_lst = []
+    bytes_used = 0
+    for var in vars1:
+        size = math.ceil(bytes_used + var['bytes']) - math.ceil(bytes_used) if len(vars1) > 1 else math.ceil(var['bytes'])
+        bytes_used += var['bytes']
+        var_lst.append([var['name'], var['dataType'], b'\x00' * size, var['bytes'], hex(key)])
+    return var_lst
+
+# extracts values of elementary variables of array range elements from start to stop, returns other element variables
+def extract_array_range_values(cont_addr, array_range, start, stop, slots_and_data, w3, storage):
+    elementary_vars = {}
+    other_vars = []
+    for var in expand_array_range(array_range, start, stop):
+        if var['type'] == 'ElementaryTypeName':
+            if var['slot'] not in elementary_vars:
+                elementary_vars[var['slot']] = [var]
+            else:
+                elementary_vars[var['slot']].append(var)
+        else:
+            other_vars.append(var)
+    slots = sorted(elementary_vars.keys())
+    var_lst = []
+    for key, val in zip(slots, storage.get_storage_batch(cont_addr, slots)):
+        # zero slots are not decoded, as large arrays are mostly empty
+        if not any(val):
+            var_lst += zero_slot_variables(elementary_vars[key], key)
+            continue
+        var_lst += decode_slot_variables(elementary_vars[key], val, key, slots_and_data, w3)
+    return var_lst, other_vars
+
+# extracts data/values of static arrays laid out as ranges, elements are expanded and read batch by batch
+def extract_array_range_data(cont_addr, var, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3, storage):
+    batches = get_range_batches(var, get_range_batch_slots())
+    all_vars = list(all_vars)
+    for ind, [start, stop] in enumerate(batches):
+        if not ind % 100 and len(batches) > 100:
+            print(f"Extracted {start} out of {var['count']} elements of {var['name']}")
+        var_lst, other_vars = extract_array_range_values(cont_addr, var, start, stop, slots_and_data, w3, storage)
+        all_vars.extend(var_lst)
+        if len(other_vars) > 0:
+            all_vars = extract_variables_data_from_chain(cont_addr, other_vars, all_contracts, contract_abi,
+                                all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3, storage)
+    return all_vars
 
 # extracts data/values of user-defined variables
-def extract_user_defined_vars_data(cont_addr, var, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3):
+def extract_user_defined_vars_data(cont_addr, var, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3, storage):
     try:
         all_vars = extract_variables_data_from_chain(
-            cont_addr, var['object']['typeVars'], all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3)
+            cont_addr, var['object']['typeVars'], all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3, storage)
     except:
         all_vars = extract_variables_data_from_chain(
-            cont_addr, var['typeVars'], all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3)
+            cont_addr, var['typeVars'], all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3, storage)
     return all_vars
 
 # extracts data/values of array type variables
-def extract_array_data(cont_addr, var, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3):
+def extract_array_data(cont_addr, var, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3, storage):
                 
     levels = len(var['length'])  # levels/dimensions of array
     if levels == 1:
@@ -268,8 +297,7 @@ def extract_array_data(cont_addr, var, all_contracts, contract_abi, all_vars, ke
             for q in range(0, len(tmpc)):
                 slot = tmpc[q][1]
                 # "array_length" is no of entries (N-1 Dimension) in the array
-                array_length = w3.to_int(w3.eth.get_storage_at(
-                    w3.to_checksum_address(cont_addr), slot))
+                array_length = w3.to_int(storage.get_storage(cont_addr, slot))
                 start_slot = w3.to_int(w3.solidity_keccak(['uint256'], [slot]))
                 for idx in range(0, array_length):
                     loc = start_slot + idx
@@ -278,27 +306,27 @@ def extract_array_data(cont_addr, var, all_contracts, contract_abi, all_vars, ke
 
     count = 0
     for key_details in tmpc:
-        g = w3.to_int(w3.eth.get_storage_at(
-            w3.to_checksum_address(cont_addr), key_details[1]))
+        g = w3.to_int(storage.get_storage(cont_addr, key_details[1]))
         f = w3.to_int(w3.solidity_keccak(['uint256'], [key_details[1]]))
         var_dict = {}
         var_dict['type'] = 'ArrayTypeName'
         var_dict['dataTypeType'] = var['dataTypeType']
         var_dict['dataTypeName'] = var['dataTypeName']
-        var_dict['length'] = str(g)
+        var_dict['length'] = [str(g)]
         var_dict['name'] = var['name']+':'+str(count)
         count = count+1
         var_dict['curr'] = -1
         var_dict['dimension'] = 'single'
         var_dict['StorageType'] = 'static'
 
-        _, slot_results = calculate_slots([var_dict], f-1, all_contracts)
+        # layout of the element type is calculated once for all arrays
+        slot_results = get_array_layout(var_dict, f, all_contracts)
         all_vars = extract_variables_data_from_chain(cont_addr, slot_results, all_contracts, contract_abi,
-                            all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3)
+                            all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3, storage)
     return all_vars
 
 # extracts data/values of mapping type variables
-def extract_mapping_data(cont_addr, var, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3):
+def extract_mapping_data(cont_addr, var, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3, storage):
     keys_type = []
     mapping_ast = var
     all_possible_keys = []
@@ -513,15 +541,16 @@ def extract_mapping_data(cont_addr, var, all_contracts, contract_abi, all_vars,
                 keyss = keyss+":"+str(key)
             var_dict['name'] = var['name'] + ":key" + keyss
             try:
-                _, slot_results = calculate_slots([var_dict], slot[0] - 1, all_contracts)
+                # layout of the value type is calculated once for all keys
+                slot_results = get_rebased_layout(var_dict, slot[0], all_contracts)
                 all_vars = extract_variables_data_from_chain(cont_addr, slot_results, all_contracts, contract_abi,
-                                    all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3)
+                                    all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3, storage)
             except Exception as e:
                 print("Warning: Could not extract -", var_dict['name'], e)
                 
     return all_vars
 
-def extract_variables_data_from_chain(cont_addr, vars_slot, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3):
+def extract_variables_data_from_chain(cont_addr, vars_slot, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3, storage):
     """
     Take state variables and return their extracted value from the chain.
 
@@ -536,6 +565,7 @@ def extract_variables_data_from_chain(cont_addr, vars_slot, all_contracts, contr
         slots_and_data (list): list of slot and data already extracted.
         all_slots (list): list of slots already extracted/checked (used to make sure same value is not extracted multipe times).
         w3 (object): web3 object.
+        storage (object): storage backend all slots are read from.
 
     Returns:
         all_vars (list): list of all extracted values of provided variables.
@@ -549,19 +579,22 @@ def extract_variables_data_from_chain(cont_addr, vars_slot, all_contracts, contr
                 elementary_vars[var['slot']].append(var)
                 
     ord_slots = collections.OrderedDict(sorted(elementary_vars.items()))
-    var_lst, slots_and_data = extract_elementry_variables(ord_slots, cont_addr, slots_and_data, w3)
+    var_lst, slots_and_data = extract_elementry_variables(ord_slots, cont_addr, slots_and_data, w3, storage)
     all_vars = all_vars + [var for var in var_lst]
 
     for var in vars_slot:
         if var['type'] == 'UserDefinedTypeName':
             all_vars = extract_user_defined_vars_data(
-                cont_addr, var, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3)
+                cont_addr, var, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3, storage)
         if var['type'] == 'ArrayTypeName':
             all_vars = extract_array_data(
-                cont_addr, var, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3)
+                cont_addr, var, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3, storage)
+        if var['type'] == RANGE_TYPE:
+            all_vars = extract_array_range_data(
+                cont_addr, var, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3, storage)
         if var['type'] == 'Mapping':
             all_vars = extract_mapping_data(
-                cont_addr, var, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3)
+                cont_addr, var, all_contracts, contract_abi, all_vars, key_approx_results, tx_arg_details, slots_and_data, all_slots, w3, storage)
             print("mapping key-values extracted!")
     return all_vars
 
@@ -580,12 +613,12 @@ def get_variables_slot(cont_name, source_code):
     children, _ = generate_ast(source_code)
     children.pop(0)
     _, all_contracts_dict = get_contract_details(children)
-    _, variables_slot_results = calculate_slots(
+    _, variables_slot_results = calculate_layout(
         all_contracts_dict[cont_name]['vars'], -1, all_contracts_dict)
     return variables_slot_results
 
 
-def extract_regular_variables(cont_name, source_code, cont_addr, compiler_version, net):
+def extract_regular_variables(cont_name, source_code, cont_addr, compiler_version, net, w3=None, storage=None, layout=None):
     """
     Takes contracts source code and other details and extracts values of all regular variables. 
 
@@ -595,53 +628,26 @@ def extract_regular_variables(cont_name, source_code, cont_addr, compiler_versio
         cont_addr (str): contract address.
         compiler_version (str): required Solidity compiler version.
         net (str): Blockchain Network (should be configured in config.ini file).
+        w3 (object): already connected web3 object (optional), a new connection is created if not provided.
+            Storage is read at w3.eth.default_block ('latest' by default).
+        storage (object): storage backend (optional), i.e StateDumpBackend to extract from a local state dump.
+            Storage is read from the node of w3 if not provided.
+        layout (tuple): state variables and their slot layout (results of get_contract_layout, optional), calculated
+            from the source code if not provided.
 
     Returns:
         results (list): list of regular variables with extracted values.
         slot_details (list): slot/storage layout.
         slots_and_data (list): slots and their data/value.
-        block['number] (int): current block number.
+        block_number (int): block of the extracted state (None if the state dump does not contain it).
     """    
-    config = ConfigParser()
-    config.read("config.ini")
-    if net == "test":
-        BLOCKCHAIN_NODE_LINK = config.get('infura', 'infura_test_node_link')
-        BLOCKCHAIN_NODE_PID = config.get('infura', 'infura_test_pid')
-    elif net == "mainnet":
-        BLOCKCHAIN_NODE_LINK = config.get('infura', 'infura_node_link')
-        BLOCKCHAIN_NODE_PID = config.get('infura', 'infura_pid')
-    elif net == "mumbai":
-        BLOCKCHAIN_NODE_LINK = config.get('infura', 'rpc_poly_test_node_link')
-        BLOCKCHAIN_NODE_PID = config.get('infura', 'rpc_poly_test_pid')
-    elif net == "polygon":
-        BLOCKCHAIN_NODE_LINK = config.get('infura', 'rpc_poly_node_link')
-        BLOCKCHAIN_NODE_PID = config.get('infura', 'rpc_poly_pid')
-    elif net == "bsctest":
-        BLOCKCHAIN_NODE_LINK = config.get('infura', 'rpc_bsc_test_node_link')
-        BLOCKCHAIN_NODE_PID = config.get('infura', 'rpc_bsc_test_pid')
-    elif net == "bsc":
-        BLOCKCHAIN_NODE_LINK = config.get('infura', 'rpc_bsc_node_link')
-        BLOCKCHAIN_NODE_PID = config.get('infura', 'rpc_bsc_pid')
-
-    w3 = Web3(Web3.HTTPProvider(BLOCKCHAIN_NODE_LINK + BLOCKCHAIN_NODE_PID))
-    w3.middleware_onion.inject(geth_poa_middleware, layer=0)
-    if compiler_version != '':
-        children, _ = generate_ast(source_code)
-        switch_compiler(compiler_version)
-    else:
-        children, compiler_version = generate_ast(source_code)
-        switch_compiler(compiler_version)
-    children.pop(0)    
-    try:
-        all_vars, all_contracts_dict, diamonds = get_contract_details(children, cont_name)
-    except Exception as e:
-        print(f"Error occured in get_contract_details - {e}")
-        compiled_sol = compile_source(source_code)
-        cont_ast = compiled_sol['<stdin>:'+cont_name]['ast']['nodes']
-        all_vars, all_contracts_dict, diamonds = get_contract_details_new(cont_ast, cont_name)
-
-    _, variables_slot_results = calculate_slots(
-        all_contracts_dict[cont_name]['vars'], -1, all_contracts_dict)
+    if w3 == None:
+        w3 = connect_web3(net)
+    if storage == None:
+        storage = RpcStorageBackend(w3)
+    if layout == None:
+        layout = get_contract_layout(cont_name, source_code, compiler_version)
+    all_vars, variables_slot_results = layout
     slot_details = extract_slot_details(variables_slot_results)
     slots_and_data = []
     print("Extracting data from chain...")
@@ -653,15 +659,20 @@ def extract_regular_variables(cont_name, source_code, cont_addr, compiler_versio
             else:
                 elementary_vars[var['slot']].append(var)                
     ord_slots = collections.OrderedDict(sorted(elementary_vars.items()))
-    var_lst, _ = extract_elementry_variables(ord_slots, cont_addr, slots_and_data, w3)
+    var_lst, _ = extract_elementry_variables(ord_slots, cont_addr, slots_and_data, w3, storage)
     all_vars = all_vars + [var for var in var_lst]
+    # elementary elements of static arrays laid out as ranges
+    for var in variables_slot_results:
+        if var['type'] == RANGE_TYPE:
+            for start, stop in get_range_batches(var, get_range_batch_slots()):
+                var_lst, _ = extract_array_range_values(cont_addr, var, start, stop, slots_and_data, w3, storage)
+                all_vars.extend(var_lst)
     results = all_vars
-    results = generate_readable_results(cont_addr, results, w3)
-    block = w3.eth.get_block('latest')
-    return results, slot_details, slots_and_data, block['number']
+    results = generate_readable_results(cont_addr, results, w3, storage)
+    return results, slot_details, slots_and_data, storage.get_block_number()
 
 
-def extract_contract_state(cont_name, source_code, cont_addr, compiler_version, net):
+def extract_contract_state(cont_name, source_code, cont_addr, compiler_version, net, w3=None, contract_abi=None, analysis_results=None, selectors=None, storage=None):
     """
     Takes contracts source code and other details and extracts complete state of the smart contract. 
 
@@ -671,80 +682,52 @@ def extract_contract_state(cont_name, source_code, cont_addr, compiler_version,
         cont_addr (str): contract address.
         compiler_version (str): required Solidity compiler version.
         net (str): Blockchain Network (should be configured in config.ini file).
+        w3 (object): already connected web3 object (optional), a new connection is created if not provided.
+            Storage is read at w3.eth.default_block ('latest' by default).
+        storage (object): storage backend (optional), i.e StateDumpBackend to extract from a local state dump.
+            Storage is read from the node of w3 if not provided.
+        contract_abi (list): already generated ABI of the contract (optional).
+        analysis_results (tuple): already computed results of key_approx_analyzer (optional).
+        selectors (dict): function selectors of the contract (optional), transactions calling other functions are
+            skipped without decoding. Source code is not used if contract_abi and analysis_results are provided.
 
     Returns:
         final_results (list): list of all state variables with extracted values.
         slot_details (list): slot/storage layout.
         slots_and_data (list): slots and their data/value.
         key_analysis_result (dict): contains details of mapping keys' sources (all contracts).
-        block['number] (int): current block number.
+        block_number (int): block of the extracted state (None if the state dump does not contain it).
     """    
     
-    config = ConfigParser()
-    config.read("config.ini")
-    if net == "test":
-        BLOCK_SCANNER_API_KEY = config.get('etherscan', 'etherscan_api_key')
-        BLOCKCHAIN_NODE_LINK = config.get('infura', 'infura_test_node_link')
-        BLOCKCHAIN_NODE_PID = config.get('infura', 'infura_test_pid')
-        TRANSACTION_LINK = config.get('etherscan', 'test_transaction_link')
-        INTERNAL_TRANSACTION_LINK = config.get('etherscan', 'test_internal_transaction_link')
-    elif net == "mainnet":
-        BLOCK_SCANNER_API_KEY = config.get('etherscan', 'etherscan_api_key')
-        BLOCKCHAIN_NODE_LINK = config.get('infura', 'infura_node_link')
-        BLOCKCHAIN_NODE_PID = config.get('infura', 'infura_pid')
-        TRANSACTION_LINK = config.get('etherscan', 'transaction_link')
-        INTERNAL_TRANSACTION_LINK = config.get('etherscan', 'internal_transaction_link')
-    elif net == "mumbai":
-        BLOCK_SCANNER_API_KEY = config.get('polygonscan', 'polygonscan_api_key')
-        BLOCKCHAIN_NODE_LINK = config.get('infura', 'rpc_poly_test_node_link')
-        BLOCKCHAIN_NODE_PID = config.get('infura', 'rpc_poly_test_pid')
-        TRANSACTION_LINK = config.get('polygonscan', 'test_transaction_link')
-        INTERNAL_TRANSACTION_LINK = config.get('polygonscan', 'test_internal_transaction_link')
-    elif net == "polygon":
-        BLOCK_SCANNER_API_KEY = config.get('polygonscan', 'polygonscan_api_key')
-        BLOCKCHAIN_NODE_LINK = config.get('infura', 'rpc_poly_node_link')
-        BLOCKCHAIN_NODE_PID = config.get('infura', 'rpc_poly_pid')
-        TRANSACTION_LINK = config.get('polygonscan', 'transaction_link')
-        INTERNAL_TRANSACTION_LINK = config.get('polygonscan', 'internal_transaction_link')
-    elif net == "bsctest":
-        BLOCK_SCANNER_API_KEY = config.get('bscscan', 'bscscan_api_key')
-        BLOCKCHAIN_NODE_LINK = config.get('infura', 'rpc_bsc_test_node_link')
-        BLOCKCHAIN_NODE_PID = config.get('infura', 'rpc_bsc_test_pid')
-        TRANSACTION_LINK = config.get('bscscan', 'test_transaction_link')
-        INTERNAL_TRANSACTION_LINK = config.get('bscscan', 'test_internal_transaction_link')
-    elif net == "bsc":
-        BLOCK_SCANNER_API_KEY = config.get('bscscan', 'bscscan_api_key')
-        BLOCKCHAIN_NODE_LINK = config.get('infura', 'rpc_bsc_node_link')
-        BLOCKCHAIN_NODE_PID = config.get('infura', 'rpc_bsc_pid')
-        TRANSACTION_LINK = config.get('bscscan', 'transaction_link')
-        INTERNAL_TRANSACTION_LINK = config.get('bscscan', 'internal_transaction_link')
-
-
-    w3 = Web3(Web3.HTTPProvider(BLOCKCHAIN_NODE_LINK + BLOCKCHAIN_NODE_PID))
-    w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+    network = get_network_details(net)
+    if w3 == None:
+        w3 = connect_web3(net)
+    if storage == None:
+        storage = RpcStorageBackend(w3)
     all_transactions = []
-    if compiler_version != '':
-        switch_compiler(compiler_version)
-    else:
-        _, compiler_version = generate_ast(source_code)
-        switch_compiler(compiler_version)
 
-    key_analysis_result, complete_analysis_results = key_approx_analyzer(cont_name, source_code, compiler_version)
+    if analysis_results == None:
+        analysis_results = key_approx_analyzer(cont_name, source_code, compiler_version)
+    key_analysis_result, complete_analysis_results = analysis_results
     all_vars = complete_analysis_results['all_vars']
     variables_slot_results = complete_analysis_results['variables_slot_results']
     all_contracts_dict = complete_analysis_results['all_contracts_dict']
     slot_details = complete_analysis_results['slot_details']
     
-    contract_abi = generate_abi(source_code, cont_name)
+    if contract_abi == None:
+        contract_abi = generate_abi(source_code, cont_name, compiler_version)
 
+    from src.state_extraction.transactions import get_transactions, get_internal_transactions
     print("Retrieving transactions:")
-    all_transactions = get_transactions(cont_addr, all_transactions, TRANSACTION_LINK, BLOCK_SCANNER_API_KEY)
-    all_transactions += get_internal_transactions(cont_addr, all_transactions, INTERNAL_TRANSACTION_LINK, BLOCK_SCANNER_API_KEY)
+    all_transactions = get_transactions(cont_addr, all_transactions, network['transaction_link'], network['api_key'])
+    all_transactions += get_internal_transactions(cont_addr, all_transactions, network['internal_transaction_link'], network['api_key'])
     print("Total transactions ->", len(all_transactions))
     tx_arg_details = {}
     slots_and_data = []
     all_slots = []
     for tran in all_transactions:
+        if selectors != None and tran['input'][:10] not in selectors:
+            continue
         try:
             cont_abi = copy.deepcopy(contract_abi)
             contract = w3.eth.contract(abi=cont_abi)
@@ -764,13 +747,12 @@ def extract_contract_state(cont_name, source_code, cont_addr, compiler_version,
         cont_keys_results = []
     print("Extracting data from chain...")
     results = extract_variables_data_from_chain(
-        cont_addr, variables_slot_results, all_contracts_dict, contract_abi, all_vars, cont_keys_results, tx_arg_details, slots_and_data, all_slots, w3) 
+        cont_addr, variables_slot_results, all_contracts_dict, contract_abi, all_vars, cont_keys_results, tx_arg_details, slots_and_data, all_slots, w3, storage) 
     print("Done!")
-    results = generate_readable_results(cont_addr, results, w3)
+    results = generate_readable_results(cont_addr, results, w3, storage)
     final_results = get_final_results(results)
 
     print("Length of complete results ->", len(final_results))
     print("Length of Slot and Data ->", len(slots_and_data))
-    block = w3.eth.get_block('latest')
-    return final_results, results, slot_details, slots_and_data, key_analysis_result, block['number']
+    return final_results, results, slot_details, slots_and_data, key_analysis_result, storage.get_block_number()
 
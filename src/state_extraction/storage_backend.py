@@ -0,0 +1,211 @@
+"""
+Storage backends, every storage read of the state extraction goes through a backend.
+
+    RpcStorageBackend      - reads storage from a node with eth_getStorageAt, at w3.eth.default_block.
+    StateDumpBackend       - reads storage from a local state dump (geth dump or anvil state JSON) loaded into memory,
+                             extraction runs without RPC requests and always gives the same results.
+    SnapshotStorageBackend - reads storage from a memory-mapped binary snapshot (storage_snapshot.py), for contracts
+                             too large to load their storage into memory.
+
+A backend implements get_storage (value of a slot as 32 bytes), get_storage_batch (values of several slots, in order)
+and get_block_number (block of the state, None if not known).
+"""
+
+import json
+import time
+from hexbytes import HexBytes
+
+ZERO_SLOT = HexBytes(b'\x00' * 32)
+# attempts of a batch request, with exponential backoff from BATCH_RETRY_DELAY seconds
+BATCH_RETRIES = 3
+BATCH_RETRY_DELAY = 1
+# batches failing in a row (after retries) before batching is turned off
+BATCH_FAILURE_LIMIT = 3
+
+
+class BatchNotSupported(Exception):
+    """Raised when the node rejects JSON-RPC batch requests."""
+
+
+class StorageBackend:
+    """Base class of storage backends."""
+    def get_storage(self, cont_addr, slot):
+        raise NotImplementedError
+
+    def get_storage_batch(self, cont_addr, slots):
+        return [self.get_storage(cont_addr, slot) for slot in slots]
+
+    def get_block_number(self):
+        return None
+
+
+class RpcStorageBackend(StorageBackend):
+    """
+    Reads storage from the node the web3 object is connected to.
+
+    Parameters:
+        w3 (object): connected web3 object, storage is read at w3.eth.default_block ('latest' by default).
+        capture (bool): keep non-zero values read, in captured (address -> slot -> value), i.e to write them to a
+            storage snapshot.
+    """
+    def __init__(self, w3, capture=False):
+        self.w3 = w3
+        self.captured = {} if capture else None
+        # set to False if the node rejects batch requests, later batches are read slot by slot
+        self.batch_supported = getattr(w3.provider, 'endpoint_uri', None) != None
+        self.failed_batches = 0
+
+    def capture_storage(self, cont_addr, slots, values):
+        if self.captured == None:
+            return values
+        contract_storage = self.captured.setdefault(cont_addr.lower(), {})
+        for slot, value in zip(slots, values):
+            if any(value):
+                contract_storage[slot] = value
+        return values
+
+    def get_storage(self, cont_addr, slot):
+        value = self.w3.eth.get_storage_at(self.w3.to_checksum_address(cont_addr), slot)
+        return self.capture_storage(cont_addr, [slot], [value])[0]
+
+    def request_storage_batch(self, address, slots):
+        w3 = self.w3
+        if hasattr(w3, 'batch_requests'):
+            # web3 7, the batch goes through the middleware, session and retry settings of w3
+            with w3.batch_requests() as batch:
+                for slot in slots:
+                    batch.add(w3.eth.get_storage_at(address, slot))
+                return [HexBytes(value) for value in batch.execute()]
+        # web3 6 has no batch API, the batch is posted with the cached session and request settings of the provider
+        from web3._utils.request import make_post_request
+        block = w3.eth.default_block
+        if isinstance(block, int):
+            block = hex(block)
+        batch = [{'jsonrpc': '2.0', 'id': i, 'method': 'eth_getStorageAt', 'params': [address, hex(slot), block]}
+                 for i, slot in enumerate(slots)]
+        provider = w3.provider
+        response = json.loads(make_post_request(provider.endpoint_uri, json.dumps(batch).encode('utf-8'),
+                                                **provider.get_request_kwargs()))
+        if not isinstance(response, list):
+            # nodes without batch support answer with a single error object
+            raise BatchNotSupported(response.get('error') if isinstance(response, dict) else response)
+        values = {}
+        for item in response:
+            values[item['id']] = HexBytes(item['result'])
+        return [values[i] for i in range(len(slots))]
+
+    # reads storage of the slots with a single JSON-RPC batch request, slot by slot if the batch fails
+    def get_storage_batch(self, cont_addr, slots):
+        if self.batch_supported and len(slots) > 1:
+            address = self.w3.to_checksum_address(cont_addr)
+            for attempt in range(BATCH_RETRIES):
+                try:
+                    values = self.request_storage_batch(address, slots)
+                    self.failed_batches = 0
+                    return self.capture_storage(cont_addr, slots, values)
+                except BatchNotSupported as e:
+                    self.batch_supported = False
+                    print("Warning: Node does not support batch requests, reading slots one by one -", e)
+                    break
+                except Exception as e:
+                    error = e
+                    if attempt + 1 < BATCH_RETRIES:
+                        time.sleep(BATCH_RETRY_DELAY * 2**attempt)
+            else:
+                # failures of a few batches in a row mean batches are rejected, not that the node is unavailable
+                self.failed_batches += 1
+                if self.failed_batches >= BATCH_FAILURE_LIMIT:
+                    self.batch_supported = False
+                    print("Warning: Batch storage requests keep failing, reading slots one by one -", error)
+                else:
+                    print("Warning: Batch storage request failed, reading its slots one by one -", error)
+        return [self.get_storage(cont_addr, slot) for slot in slots]
+
+    def get_block_number(self):
+        return self.w3.eth.get_block(self.w3.eth.default_block)['number']
+
+
+class StateDumpBackend(StorageBackend):
+    """
+    Reads storage from a state dump loaded into memory, slots missing in the dump are zero.
+
+    Parameters:
+        dump_file (str): path of the state dump (geth dump or anvil state JSON).
+    """
+    def __init__(self, dump_file):
+        self.storage, self.block_number = load_state_dump(dump_file)
+
+    def get_storage(self, cont_addr, slot):
+        contract_storage = self.storage.get(cont_addr.lower())
+        if contract_storage == None:
+            return ZERO_SLOT
+        return contract_storage.get(slot, ZERO_SLOT)
+
+    def get_storage_batch(self, cont_addr, slots):
+        contract_storage = self.storage.get(cont_addr.lower(), {})
+        return [contract_storage.get(slot, ZERO_SLOT) for slot in slots]
+
+    def get_block_number(self):
+        return self.block_number
+
+
+def to_int(value):
+    if isinstance(value, int):
+        return value
+    return int(value, 16)
+
+
+def get_storage_dict(account_storage):
+    """Returns storage of an account as slot (int) -> value (32 bytes), zero values are skipped."""
+    storage = {}
+    for slot, value in account_storage.items():
+        value = to_int(value)
+        if value != 0:
+            storage[to_int(slot)] = HexBytes(value.to_bytes(32, 'big'))
+    return storage
+
+
+def load_state_dump(dump_file):
+    """
+    Loads storage of all accounts of a state dump.
+
+    Supported formats:
+        geth dump      - {"root": ..., "accounts": {address: {..., "storage": {slot: value}}}}, or one account per line
+                         with its "address" (geth dump --iterative). Slots are used as they are, so the dump must be
+                         created with preimages (hashed slots are not found).
+        anvil state    - {"block": {"number": ...}, "accounts": {address: {..., "storage": {slot: value}}}}
+                         (anvil --dump-state).
+
+    Parameters:
+        dump_file (str): path of the state dump.
+
+    Returns:
+        storage (dict): address (lower case) -> slot (int) -> value (32 bytes).
+        block_number (int): block of the state, None if the dump does not contain it.
+    """
+    with open(dump_file) as f:
+        content = f.read()
+    try:
+        dump = json.loads(content)
+        accounts = dump.get('accounts', {})
+    except json.JSONDecodeError:
+        # iterative geth dump, the first line is the state root and every other line an account
+        dump = {}
+        accounts = {}
+        for line in content.splitlines():
+            if line.strip() == '':
+                continue
+            item = json.loads(line)
+            if 'address' in item:
+                accounts[item['address']] = item
+    storage = {}
+    for address, account in accounts.items():
+        if 'address' in account:
+            address = account['address']
+        storage[address.lower()] = get_storage_dict(account.get('storage') or {})
+    block_number = None
+    if isinstance(dump.get('block'), dict) and dump['block'].get('number') != None:
+        block_number = to_int(dump['block']['number'])
+    elif dump.get('best_block_number') != None:
+        block_number = to_int(dump['best_block_number'])
+    return storage, block_number
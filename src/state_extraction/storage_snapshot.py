@@ -0,0 +1,276 @@
+"""
+Binary storage snapshot of a contract, read through mmap so storage of huge contracts is never loaded into memory.
+
+File format (all integers big-endian):
+    header   - 64 bytes: magic (8), contract address (20), padding (12), block number (8, 2**64-1 if not known),
+               record count (8), index stride (8).
+    records  - record count * 64 bytes: slot (32) and value (32), sorted by slot, zero values are not stored.
+    index    - slot of every index stride-th record (32 bytes each), the only part of the file kept in memory.
+
+A lookup bisects the sparse index to find the block of records the slot can be in, then binary searches that block
+in the mapped file, so it touches a few pages only.
+
+i.e
+    python3 -m src.state_extraction.storage_snapshot convert <state dump> <contract address> <snapshot file>
+    python3 -m src.state_extraction.storage_snapshot diff <old snapshot file> <new snapshot file>
+"""
+
+import bisect
+import heapq
+import mmap
+import os
+import struct
+import sys
+from hexbytes import HexBytes
+from src.utils.atomic_file import atomic_write, get_tmp_file
+from src.state_extraction.storage_backend import StorageBackend, ZERO_SLOT
+
+SNAPSHOT_MAGIC = b'SMVSNAP1'
+SNAPSHOT_HEADER = struct.Struct('>8s20s12xQQQ')
+RECORD_SIZE = 64
+INDEX_STRIDE = 256
+# records sorted in memory at a time by the writer, larger storage is sorted in runs on disk and merged
+SORT_CHUNK_RECORDS = 2**18
+# sorted runs merged at a time, more runs are merged in several passes to bound open files
+MERGE_RUNS = 64
+UNKNOWN_BLOCK = 2**64 - 1
+
+
+def get_slot_value(value):
+    """Returns value of a slot as 32 bytes (left padded)."""
+    if isinstance(value, int):
+        return value.to_bytes(32, 'big')
+    return bytes(value).rjust(32, b'\x00')
+
+
+def write_storage_snapshot(snapshot_file, cont_addr, storage_items, block_number=None, index_stride=INDEX_STRIDE):
+    """
+    Writes storage of a contract to a snapshot file. Records are sorted in chunks of SORT_CHUNK_RECORDS, written to
+    temporary run files next to the snapshot and merged, so memory use is bounded by one chunk (about 30 MB) and the
+    sparse index (32 bytes per index_stride records), whatever the size of the storage.
+
+    Parameters:
+        snapshot_file (str): path of the snapshot file.
+        cont_addr (str): contract address.
+        storage_items (iterable): (slot, value) pairs, slot as int and value as bytes or int.
+        block_number (int): block of the storage (optional).
+        index_stride (int): records per sparse index entry.
+
+    Returns:
+        record_count (int): number of non-zero slots written.
+    """
+    if block_number == None:
+        block_number = UNKNOWN_BLOCK
+    address = bytes.fromhex(cont_addr[2:] if cont_addr.startswith('0x') else cont_addr)
+    run_file = get_tmp_file(snapshot_file) + '.run'
+    run_files = []
+    next_run = 0
+    try:
+        # records are slot (32 bytes, big-endian) followed by value, so sorting the bytes sorts by slot
+        chunk = []
+        for slot, value in storage_items:
+            value = get_slot_value(value)
+            if any(value):
+                chunk.append(slot.to_bytes(32, 'big') + value)
+            if len(chunk) >= SORT_CHUNK_RECORDS:
+                run_files.append(write_sorted_run(run_file + str(next_run), chunk))
+                next_run += 1
+                chunk = []
+        chunk.sort()
+        while len(run_files) > MERGE_RUNS:
+            run_files = run_files[MERGE_RUNS:] + [merge_runs(run_files[:MERGE_RUNS], run_file + str(next_run))]
+            next_run += 1
+        runs = [open(path, 'rb') for path in run_files]
+        try:
+            # readers never map a partially written snapshot
+            record_count = atomic_write(snapshot_file, lambda f: write_snapshot_records(
+                f, address, block_number, index_stride, heapq.merge(chunk, *[read_run(run) for run in runs])))
+        finally:
+            for run in runs:
+                run.close()
+    finally:
+        for path in [run_file + str(run) for run in range(next_run)]:
+            if os.path.isfile(path):
+                os.remove(path)
+    return record_count
+
+
+def write_snapshot_records(f, address, block_number, index_stride, records):
+    # record count is known once all records are written, so the header is written again at the end
+    record_count = 0
+    index = []
+    f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, address, block_number, 0, index_stride))
+    for record in records:
+        if record_count % index_stride == 0:
+            index.append(record[:32])
+        f.write(record)
+        record_count += 1
+    f.writelines(index)
+    f.seek(0)
+    f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, address, block_number, record_count, index_stride))
+    return record_count
+
+
+def write_sorted_run(run_file, chunk):
+    chunk.sort()
+    with open(run_file, 'wb') as f:
+        f.writelines(chunk)
+    return run_file
+
+
+def merge_runs(run_files, merged_file):
+    runs = [open(run_file, 'rb') for run_file in run_files]
+    try:
+        with open(merged_file, 'wb') as f:
+            f.writelines(heapq.merge(*[read_run(run) for run in runs]))
+    finally:
+        for run in runs:
+            run.close()
+    for run_file in run_files:
+        os.remove(run_file)
+    return merged_file
+
+
+def read_run(run):
+    while True:
+        record = run.read(RECORD_SIZE)
+        if len(record) < RECORD_SIZE:
+            return
+        yield record
+
+
+class StorageSnapshot:
+    """
+    Memory-mapped storage snapshot.
+
+    Parameters:
+        snapshot_file (str): path of the snapshot file (write_storage_snapshot results).
+    """
+    def __init__(self, snapshot_file):
+        self.file = open(snapshot_file, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files can not be mapped
+            self.file.close()
+            raise ValueError(f"Not a storage snapshot - {snapshot_file}")
+        if len(self.map) < SNAPSHOT_HEADER.size:
+            self.close()
+            raise ValueError(f"Not a storage snapshot - {snapshot_file}")
+        magic, address, block_number, self.count, self.stride = SNAPSHOT_HEADER.unpack_from(self.map, 0)
+        index_count = (self.count + self.stride - 1) // self.stride
+        self.index_offset = SNAPSHOT_HEADER.size + self.count * RECORD_SIZE
+        if magic != SNAPSHOT_MAGIC or len(self.map) != self.index_offset + index_count * 32:
+            self.close()
+            raise ValueError(f"Not a storage snapshot - {snapshot_file}")
+        self.address = '0x' + address.hex()
+        self.block_number = None if block_number == UNKNOWN_BLOCK else block_number
+        self.index = [self.map[self.index_offset + i * 32:self.index_offset + (i + 1) * 32] for i in range(index_count)]
+
+    def get(self, slot):
+        """Returns value of the slot (32 bytes), None if the slot is zero."""
+        key = slot.to_bytes(32, 'big')
+        block = bisect.bisect_right(self.index, key) - 1
+        if block < 0:
+            return None
+        low = block * self.stride
+        high = min(low + self.stride, self.count)
+        while low < high:
+            mid = (low + high) // 2
+            offset = SNAPSHOT_HEADER.size + mid * RECORD_SIZE
+            record_slot = self.map[offset:offset + 32]
+            if record_slot < key:
+                low = mid + 1
+            elif record_slot > key:
+                high = mid
+            else:
+                return self.map[offset + 32:offset + RECORD_SIZE]
+        return None
+
+    def items(self):
+        """Yields (slot, value) of all records in slot order."""
+        for i in range(self.count):
+            offset = SNAPSHOT_HEADER.size + i * RECORD_SIZE
+            yield int.from_bytes(self.map[offset:offset + 32], 'big'), self.map[offset + 32:offset + RECORD_SIZE]
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SnapshotStorageBackend(StorageBackend):
+    """
+    Reads storage from a memory-mapped snapshot, slots missing in the snapshot and storage of other contracts are zero.
+
+    Parameters:
+        snapshot_file (str): path of the snapshot file.
+    """
+    def __init__(self, snapshot_file):
+        self.snapshot = StorageSnapshot(snapshot_file)
+
+    def get_storage(self, cont_addr, slot):
+        if cont_addr.lower() != self.snapshot.address:
+            return ZERO_SLOT
+        value = self.snapshot.get(slot)
+        if value == None:
+            return ZERO_SLOT
+        return HexBytes(value)
+
+    def get_block_number(self):
+        return self.snapshot.block_number
+
+
+def diff_storage_snapshots(old_snapshot, new_snapshot):
+    """
+    Yields slots whose values differ between two snapshots, by merging their sorted records.
+
+    Parameters:
+        old_snapshot (object): StorageSnapshot of the old storage.
+        new_snapshot (object): StorageSnapshot of the new storage.
+
+    Returns:
+        [slot, old value, new value] of every changed slot (None for zero values), in slot order.
+    """
+    old_items = old_snapshot.items()
+    new_items = new_snapshot.items()
+    old_item = next(old_items, None)
+    new_item = next(new_items, None)
+    while old_item != None or new_item != None:
+        if new_item == None or (old_item != None and old_item[0] < new_item[0]):
+            yield [old_item[0], old_item[1], None]
+            old_item = next(old_items, None)
+        elif old_item == None or new_item[0] < old_item[0]:
+            yield [new_item[0], None, new_item[1]]
+            new_item = next(new_items, None)
+        else:
+            if old_item[1] != new_item[1]:
+                yield [old_item[0], old_item[1], new_item[1]]
+            old_item = next(old_items, None)
+            new_item = next(new_items, None)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == 'convert':
+        from src.state_extraction.storage_backend import load_state_dump
+        _, _, dump_file, cont_addr, snapshot_file = sys.argv
+        storage, block_number = load_state_dump(dump_file)
+        count = write_storage_snapshot(snapshot_file, cont_addr, storage.get(cont_addr.lower(), {}).items(), block_number)
+        print(f"Storage snapshot saved - {snapshot_file} ({count} slots)")
+    elif len(sys.argv) == 4 and sys.argv[1] == 'diff':
+        with StorageSnapshot(sys.argv[2]) as old_snapshot, StorageSnapshot(sys.argv[3]) as new_snapshot:
+            for slot, old_value, new_value in diff_storage_snapshots(old_snapshot, new_snapshot):
+                print(hex(slot), '0x' + old_value.hex() if old_value != None else None, '->',
+                      '0x' + new_value.hex() if new_value != None else None)
+    else:
+        print("Usage:")
+        print("    python3 -m src.state_extraction.storage_snapshot convert <state dump> <contract address> <snapshot file>")
+        print("    python3 -m src.state_extraction.storage_snapshot diff <old snapshot file> <new snapshot file>")
@@ -0,0 +1,31 @@
+import os
+import threading
+
+
+def get_tmp_file(path):
+    """Returns a temporary file name next to the path, unique per process and thread."""
+    return path + '.' + str(os.getpid()) + '.' + str(threading.get_ident()) + '.tmp'
+
+
+def atomic_write(path, write, mode='wb'):
+    """
+    Writes a file through a temporary file that is renamed over the path once complete, so concurrent readers
+    (other threads, processes or runs) never read a partially written file. The temporary file is removed on failure.
+
+    Parameters:
+        path (str): path of the file.
+        write (function): writes the content to the opened temporary file, i.e. lambda f: json.dump(data, f).
+        mode (str): mode the temporary file is opened with, 'wb' or 'w'.
+
+    Returns:
+        result: return value of write.
+    """
+    tmp_file = get_tmp_file(path)
+    try:
+        with open(tmp_file, mode) as f:
+            result = write(f)
+        os.replace(tmp_file, path)
+    finally:
+        if os.path.isfile(tmp_file):
+            os.remove(tmp_file)
+    return result
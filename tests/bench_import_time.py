@@ -0,0 +1,67 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# cold-start latency of each SmartMuv entry point, every import is measured in a fresh interpreter
+ENTRY_POINTS = {
+    'ast_parsing': 'from src.ast_parsing.ast_parser import generate_ast',
+    'get_slot_details': 'from src.key_approx_analysis.key_approx_analyzer import get_slot_details',
+    'extract_regular_variables': 'from src.state_extraction.state_extractor import extract_regular_variables',
+    'extract_contract_state': 'from src.state_extraction.state_extractor import extract_contract_state',
+    'service': 'import src.service.server',
+}
+# modules that should only be loaded by the code paths that need them
+HEAVY_MODULES = ['slither', 'web3', 'solcx', 'solc_select', 'requests']
+
+CHILD_CODE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy} if m in sys.modules]
+print(json.dumps({{'seconds': elapsed, 'heavy_modules': heavy}}))
+"""
+
+
+def measure_entry_point(statement, repeat):
+    timings = []
+    heavy_modules = []
+    for _ in range(repeat):
+        code = CHILD_CODE.format(statement=statement, heavy=HEAVY_MODULES)
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        if output.returncode != 0:
+            return None, output.stderr.strip().split("\n")[-1]
+        result = json.loads(output.stdout.strip().split("\n")[-1])
+        timings.append(result['seconds'])
+        heavy_modules = result['heavy_modules']
+    return timings, heavy_modules
+
+
+def run_import_benchmark(repeat=5):
+    results = {}
+    for name, statement in ENTRY_POINTS.items():
+        timings, details = measure_entry_point(statement, repeat)
+        if timings == None:
+            results[name] = {'error': details}
+            print(f"{name:<28} failed - {details}")
+            continue
+        results[name] = {'min': min(timings), 'median': statistics.median(timings), 'heavy_modules': details}
+        print(f"{name:<28} min {min(timings)*1000:8.1f} ms   median {statistics.median(timings)*1000:8.1f} ms   heavy modules loaded: {details}")
+    return results
+
+
+if __name__ == "__main__":
+    print("Running import time benchmark...")
+    results = run_import_benchmark()
+    # optionally append results to a json file, to track cold-start latency over time
+    if len(sys.argv) > 1:
+        try:
+            with open(sys.argv[1]) as f:
+                history = json.load(f)
+        except FileNotFoundError:
+            history = []
+        history.append({'time': time.strftime("%Y-%m-%d %H:%M:%S"), 'results': results})
+        with open(sys.argv[1], 'w') as f:
+            json.dump(history, f, indent=4)
@@ -0,0 +1,167 @@
+import copy
+import random
+import sys
+import time
+from src.state_extraction.slot_calculator import calculate_slots
+from src.state_extraction.layout_engine import calculate_layout, get_rebased_layout
+from src.state_extraction.array_ranges import RANGE_TYPE, expand_array_range
+
+# slot layout benchmark on synthetic contracts, iterative layout engine vs the recursive calculate_slots
+SIZES = [1000, 10000, 50000]
+DEPTHS = [100, 300, 900]
+MAPPING_KEYS = 100000
+ELEMENTARY_TYPES = ['uint256', 'uint128', 'uint64', 'uint32', 'uint8', 'int256', 'int16', 'address', 'bool',
+                    'bytes32', 'bytes4', 'bytes1', 'string', 'enum']
+
+
+def generate_contracts(rnd, struct_count=20):
+    """Generates structs (some nested, some with arrays and mappings) and contract types used by the variables."""
+    all_contracts = {'Token': {'type': 'ContractDefinition', 'vars': []},
+                     'Oracle': {'type': 'ContractDefinition', 'vars': []},
+                     'Empty': {'type': 'StructDefinition', 'vars': []}}
+    for i in range(struct_count):
+        members = []
+        for j in range(rnd.randrange(1, 8)):
+            members.append(generate_variable(rnd, 'm' + str(j), all_contracts, i, nested=False))
+        all_contracts['S' + str(i)] = {'type': 'StructDefinition', 'vars': members}
+    return all_contracts
+
+
+def generate_variable(rnd, name, all_contracts, struct_count, nested=True):
+    kind = rnd.random()
+    if kind < 0.55:
+        return {'name': name, 'type': 'ElementaryTypeName', 'dataType': rnd.choice(ELEMENTARY_TYPES)}
+    if kind < 0.65:
+        return {'name': name, 'type': 'Mapping', 'keyType': 'address', 'valueType': 'uint256'}
+    if kind < 0.72:
+        return {'name': name, 'type': 'UserDefinedTypeName', 'dataType': rnd.choice(['Token', 'Oracle'])}
+    if kind < 0.85 and struct_count > 0:
+        struct = 'S' + str(rnd.randrange(struct_count))
+        if nested or rnd.random() < 0.5:
+            type_vars = struct if rnd.random() < 0.5 else all_contracts[struct]['vars']
+            return {'name': name, 'type': 'UserDefinedTypeName', 'dataType': struct, 'typeVars': type_vars}
+    if kind < 0.92:
+        data_type = rnd.choice(['uint256', 'address', 'Token', 'S0'] if struct_count > 0 else ['uint256', 'address'])
+        data_type_type = 'UserDefinedTypeName' if data_type in ['Token', 'S0'] else 'ElementaryTypeName'
+        return {'name': name, 'type': 'ArrayTypeName', 'StorageType': 'dynamic', 'dataTypeName': data_type,
+                'dataTypeType': data_type_type, 'length': [None], 'curr': -1, 'dimension': 'single'}
+    data_type = rnd.choice(['uint8', 'uint64', 'address', 'bytes32', 'Token'])
+    data_type_type = 'UserDefinedTypeName' if data_type == 'Token' else 'ElementaryTypeName'
+    return {'name': name, 'type': 'ArrayTypeName', 'StorageType': 'static', 'dataTypeName': data_type,
+            'dataTypeType': data_type_type, 'length': [str(rnd.randrange(1, 12))], 'curr': -1, 'dimension': 'single'}
+
+
+def generate_layout(size, seed=7):
+    """Generates state variables of a synthetic contract and details of the structs and contracts they use."""
+    rnd = random.Random(seed)
+    all_contracts = generate_contracts(rnd)
+    var_list = [generate_variable(rnd, 'v' + str(i), all_contracts, 20) for i in range(size)]
+    var_list.append({'name': 'empty', 'type': 'UserDefinedTypeName', 'dataType': 'Empty', 'typeVars': []})
+    return var_list, all_contracts
+
+
+def generate_nested_layout(depth):
+    """Generates a struct nested depth times, each level with two elementary members and the next level."""
+    all_contracts = {}
+    for level in range(depth):
+        members = [{'name': 'a', 'type': 'ElementaryTypeName', 'dataType': 'uint128'},
+                   {'name': 'b', 'type': 'ElementaryTypeName', 'dataType': 'address'}]
+        if level > 0:
+            members.append({'name': 'next', 'type': 'UserDefinedTypeName', 'dataType': 'N' + str(level - 1),
+                            'typeVars': 'N' + str(level - 1)})
+        all_contracts['N' + str(level)] = {'type': 'StructDefinition', 'vars': members}
+    var_list = [{'name': 'root', 'type': 'UserDefinedTypeName', 'dataType': 'N' + str(depth - 1),
+                 'typeVars': 'N' + str(depth - 1)}]
+    return var_list, all_contracts
+
+
+def time_layout(calculate, var_list, all_contracts, repeat):
+    timings = []
+    for _ in range(repeat):
+        # layouts modify the var dicts, every run gets its own copy
+        layout_vars, layout_contracts = copy.deepcopy((var_list, all_contracts))
+        start = time.perf_counter()
+        results = calculate(layout_vars, -1, layout_contracts)
+        timings.append(time.perf_counter() - start)
+    return min(timings), results
+
+
+def check_multi_dimension_array():
+    # uint8[3][2] (lengths innermost first), 2 arrays of 3 elements, each array in its own slot
+    var = {'name': 'grid', 'type': 'ArrayTypeName', 'StorageType': 'static', 'dataTypeName': 'uint8',
+           'dataTypeType': 'ElementaryTypeName', 'length': ['3', '2'], 'curr': -1, 'dimension': 'multi'}
+    last_slot, results = calculate_layout([var], -1, {})
+    assert last_slot == 1
+    assert [(result['name'], result['slot']) for result in results] == \
+        [('grid:0:0', 0), ('grid:0:1', 0), ('grid:0:2', 0), ('grid:1:0', 1), ('grid:1:1', 1), ('grid:1:2', 1)]
+
+
+def expand_ranges(layout):
+    expanded = []
+    for var in layout:
+        if var['type'] == RANGE_TYPE:
+            expanded += expand_ranges(expand_array_range(var))
+        else:
+            expanded.append(var)
+    return expanded
+
+
+def check_array_ranges(size=2000):
+    # every static array longer than 3 elements is a range, expanded ranges must give the complete layout
+    var_list, all_contracts = generate_layout(size)
+    range_vars, range_contracts = copy.deepcopy((var_list, all_contracts))
+    range_slot, range_results = calculate_layout(range_vars, -1, range_contracts, 3)
+    assert any(var['type'] == RANGE_TYPE for var in range_results)
+    assert (range_slot, expand_ranges(range_results)) == calculate_slots(var_list, -1, all_contracts)
+    # layout of a 2**20 elements array does not depend on its length
+    var = {'name': 'table', 'type': 'ArrayTypeName', 'StorageType': 'static', 'dataTypeName': 'uint64',
+           'dataTypeType': 'ElementaryTypeName', 'length': [str(2**20)], 'curr': -1, 'dimension': 'single'}
+    last_slot, results = calculate_layout([var], -1, {})
+    assert last_slot == 2**18 - 1 and len(results) == 1
+
+
+def run_layout_benchmark(sizes=SIZES, repeat=3):
+    check_multi_dimension_array()
+    check_array_ranges()
+    results = {}
+    for size in sizes:
+        var_list, all_contracts = generate_layout(size)
+        engine_time, engine_results = time_layout(calculate_layout, var_list, all_contracts, repeat)
+        recursive_time, recursive_results = time_layout(calculate_slots, var_list, all_contracts, repeat)
+        assert engine_results == recursive_results, f"Layout of {size} variables differs from calculate_slots"
+        results[size] = {'engine': engine_time, 'recursive': recursive_time, 'slots': engine_results[0] + 1,
+                         'entries': len(engine_results[1])}
+        print(f"{size:>6} vars   {len(engine_results[1]):>7} entries   engine {engine_time*1000:9.1f} ms   "
+              f"calculate_slots {recursive_time*1000:9.1f} ms   speedup {recursive_time/engine_time:5.1f}x")
+    # calculate_slots copies members of nested structs once for each enclosing struct
+    for depth in DEPTHS:
+        var_list, all_contracts = generate_nested_layout(depth)
+        engine_time, engine_results = time_layout(calculate_layout, var_list, all_contracts, repeat)
+        recursive_time, recursive_results = time_layout(calculate_slots, var_list, all_contracts, 1)
+        assert engine_results == recursive_results, f"Layout of struct nested {depth} times differs from calculate_slots"
+        print(f"{depth:>6} deep   {len(engine_results[1]):>7} entries   engine {engine_time*1000:9.1f} ms   "
+              f"calculate_slots {recursive_time*1000:9.1f} ms   speedup {recursive_time/engine_time:5.1f}x")
+    # struct values of a mapping, laid out for every key vs rebased from the relative layout of the struct
+    var_list, all_contracts = generate_nested_layout(5)
+    value = {'name': 'balances:key:0', 'type': 'UserDefinedTypeName', 'dataType': 'N4', 'typeVars': 'N4'}
+    keys = range(MAPPING_KEYS)
+    start = time.perf_counter()
+    for key in keys:
+        _, layout_results = calculate_layout([dict(value, name='balances:key:' + str(key))], key * 100 - 1, all_contracts)
+    layout_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for key in keys:
+        rebased_results = get_rebased_layout(dict(value, name='balances:key:' + str(key)), key * 100, all_contracts)
+    rebased_time = time.perf_counter() - start
+    assert rebased_results == layout_results
+    print(f"{MAPPING_KEYS:>6} keys   {len(rebased_results):>7} entries   rebased {rebased_time*1000:8.1f} ms   "
+          f"calculate_layout {layout_time*1000:9.1f} ms   speedup {layout_time/rebased_time:5.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    print("Running slot layout benchmark...")
+    sizes = SIZES
+    if len(sys.argv) > 1:
+        sizes = [int(size) for size in sys.argv[1:]]
+    run_layout_benchmark(sizes)
@@ -0,0 +1,142 @@
+import copy
+import random
+import sys
+import time
+from src.key_approx_analysis.dataflow import reaching_definitions, decode_definitions
+
+# reach analysis micro-benchmark on synthetic function CFGs, worklist bitset engine vs the previous list based analysis
+SIZES = [250, 1000, 2000, 4000]
+STATE_VARS = 30
+LOCAL_VARS = 60
+
+
+def generate_function(size, seed=7):
+    """
+    Generates a synthetic function CFG with straight line code, if/else branches and loops.
+
+    Returns:
+        entry_id (int): id of entry node.
+        sons, fathers (dict): node id to successor and predecessor node ids.
+        node_defs (dict): node id to (declared var or None, list of vars defined by the node).
+        entry_defs (list): [var, node_id] definitions at function entry.
+    """
+    rnd = random.Random(seed)
+    sons = {0: []}
+    fathers = {0: []}
+    node_defs = {}
+    declared = set()
+
+    def add_node(preds):
+        node_id = len(sons)
+        sons[node_id] = []
+        fathers[node_id] = []
+        for pred in preds:
+            sons[pred].append(node_id)
+            fathers[node_id].append(pred)
+        var = 'v' + str(rnd.randrange(LOCAL_VARS))
+        if var not in declared:
+            declared.add(var)
+            node_defs[node_id] = (var, [var])
+        else:
+            node_defs[node_id] = (None, [var, 'tou', 'balances:i:' + var])
+        return node_id
+
+    last = [0]
+    while len(sons) < size:
+        kind = rnd.random()
+        if kind < 0.6:
+            last = [add_node(last)]
+        elif kind < 0.8:
+            # if/else
+            cond = add_node(last)
+            then_node = add_node([cond])
+            else_node = add_node([cond])
+            last = [then_node, else_node]
+        else:
+            # loop, body jumps back to the loop condition
+            cond = add_node(last)
+            body = add_node([cond])
+            sons[body].append(cond)
+            fathers[cond].append(body)
+            last = [cond]
+    entry_defs = [['s' + str(i), 0] for i in range(STATE_VARS)]
+    entry_defs += [['balances', 0], ['to', -1], ['value', -1], ['msg.sender', -1], ['msg.value', -1]]
+    return 0, sons, fathers, node_defs, entry_defs
+
+
+def get_exec_sequence(entry_id, sons):
+    exec_sequence = []
+    visited = set([entry_id])
+    queue = list(sons[entry_id])
+    visited.update(queue)
+    while len(queue) > 0:
+        node_id = queue.pop(0)
+        exec_sequence.append(node_id)
+        for son in sons[node_id]:
+            if son not in visited:
+                visited.add(son)
+                queue.append(son)
+    return exec_sequence
+
+
+def list_reach_analysis(entry_id, sons, fathers, node_defs, entry_defs):
+    # previous analysis, single pass over nodes with list of definitions copied for each node
+    out_nodes = {node_id: [] for node_id in sons}
+    out_nodes[entry_id] = copy.deepcopy(entry_defs)
+    in_nodes = {}
+    for node_id in get_exec_sequence(entry_id, sons):
+        prev_out_nodes = []
+        for pred in fathers[node_id]:
+            for nd in out_nodes[pred]:
+                if nd not in prev_out_nodes:
+                    prev_out_nodes.append(nd)
+        in_nodes[node_id] = copy.deepcopy(prev_out_nodes)
+        node_out = copy.deepcopy(in_nodes[node_id])
+        declared_var, vars_used = node_defs[node_id]
+        if declared_var != None:
+            node_out.append([declared_var, node_id])
+        for var in vars_used:
+            for dff in node_out:
+                if dff[0] == var:
+                    node_out.remove(dff)
+                    node_out.append([var, node_id])
+                    break
+        out_nodes[node_id] = copy.deepcopy(node_out)
+    return in_nodes
+
+
+def bitset_reach_analysis(entry_id, sons, fathers, node_defs, entry_defs):
+    exec_sequence = get_exec_sequence(entry_id, sons)
+    in_sets, defs = reaching_definitions(exec_sequence, fathers, sons, entry_id, entry_defs, node_defs)
+    return {node_id: decode_definitions(in_sets[node_id], defs) for node_id in exec_sequence}
+
+
+def time_analysis(analysis, function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        in_nodes = analysis(*function)
+        timings.append(time.perf_counter() - start)
+    return min(timings), in_nodes
+
+
+def run_reach_benchmark(sizes=SIZES, repeat=3):
+    results = {}
+    for size in sizes:
+        function = generate_function(size)
+        bitset_time, bitset_in = time_analysis(bitset_reach_analysis, function, repeat)
+        # previous analysis grows quadratically, so it is only run once on large functions
+        list_time, list_in = time_analysis(list_reach_analysis, function, 1 if size > 1000 else repeat)
+        avg_defs = sum(len(defs) for defs in bitset_in.values()) / max(1, len(bitset_in))
+        results[size] = {'bitset': bitset_time, 'list': list_time, 'avg_reaching_defs': avg_defs}
+        print(f"{size:>6} nodes   bitset {bitset_time*1000:9.1f} ms   list {list_time*1000:9.1f} ms   "
+              f"speedup {list_time/bitset_time:6.1f}x   avg reaching defs {avg_defs:.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    print("Running reach analysis benchmark...")
+    sizes = SIZES
+    if len(sys.argv) > 1:
+        sizes = [int(size) for size in sys.argv[1:]]
+    run_reach_benchmark(sizes)
@@ -0,0 +1,70 @@
+pragma solidity ^0.4.24;
+
+// token whose balances are written only by internal helpers, keys of the callers come from function summaries
+contract HelperToken {
+    string public name = "Helper Token";
+    string public symbol = "HLP";
+    uint8 public decimals = 18;
+    uint256 public totalSupply;
+    address public owner;
+
+    mapping(address => uint256) balances;
+    mapping(address => mapping(address => uint256)) allowed;
+
+    event Transfer(address indexed from, address indexed to, uint256 value);
+    event Approval(address indexed owner, address indexed spender, uint256 value);
+
+    constructor(uint256 _supply) public {
+        owner = msg.sender;
+        _mint(msg.sender, _supply);
+    }
+
+    function balanceOf(address _owner) public view returns (uint256) {
+        return balances[_owner];
+    }
+
+    function allowance(address _owner, address _spender) public view returns (uint256) {
+        return allowed[_owner][_spender];
+    }
+
+    function transfer(address _to, uint256 _value) public returns (bool) {
+        _transfer(msg.sender, _to, _value);
+        return true;
+    }
+
+    function transferFrom(address _from, address _to, uint256 _value) public returns (bool) {
+        require(_value <= allowed[_from][msg.sender]);
+        allowed[_from][msg.sender] -= _value;
+        _transfer(_from, _to, _value);
+        return true;
+    }
+
+    function approve(address _spender, uint256 _value) public returns (bool) {
+        _approve(msg.sender, _spender, _value);
+        return true;
+    }
+
+    function mint(address _to, uint256 _value) public {
+        require(msg.sender == owner);
+        _mint(_to, _value);
+    }
+
+    function _transfer(address _from, address _to, uint256 _value) internal {
+        require(_to != address(0));
+        require(_value <= balances[_from]);
+        balances[_from] -= _value;
+        balances[_to] += _value;
+        emit Transfer(_from, _to, _value);
+    }
+
+    function _approve(address _owner, address _spender, uint256 _value) internal {
+        allowed[_owner][_spender] = _value;
+        emit Approval(_owner, _spender, _value);
+    }
+
+    function _mint(address _to, uint256 _value) internal {
+        totalSupply += _value;
+        balances[_to] += _value;
+        emit Transfer(address(0), _to, _value);
+    }
+}
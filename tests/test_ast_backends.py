@@ -0,0 +1,79 @@
+from src.ast_parsing.ast_parser import parse_with_solc, parse_with_solidity_parser, parse_ast
+from configparser import ConfigParser
+import json
+
+# parse_ast results of the solc backend (converted solc AST) must be the same as those of solidity_parser, the examples
+# include compilers from 0.4.11, so the legacy 0.4.x AST output of solc is converted as well
+
+def read_source_code(contract_name, input_dir):
+    input_path = input_dir + contract_name + ".sol"
+    f = open(input_path)
+    source_code = f.read()
+    return source_code
+
+def read_json(file_name, input_dir):
+    input_path = input_dir + file_name + ".json"
+    with open(input_path) as f:
+        read_file = json.load(f)
+    return read_file
+
+def get_parse_results(children):
+    children.pop(0)
+    return parse_ast(children)
+
+# returns path of the first difference between the results, None if they are the same
+def find_difference(solc_results, parser_results, path=''):
+    if type(solc_results) != type(parser_results):
+        return path
+    if isinstance(solc_results, dict):
+        for key in list(parser_results) + [key for key in solc_results if key not in parser_results]:
+            if key not in solc_results or key not in parser_results:
+                return path + '/' + str(key)
+            difference = find_difference(solc_results[key], parser_results[key], path + '/' + str(key))
+            if difference != None:
+                return difference
+        return None
+    if isinstance(solc_results, list):
+        if len(solc_results) != len(parser_results):
+            return path + ' (length)'
+        for ind in range(len(solc_results)):
+            difference = find_difference(solc_results[ind], parser_results[ind], path + '/' + str(ind))
+            if difference != None:
+                return difference
+        return None
+    if solc_results != parser_results:
+        return path
+    return None
+
+def ast_backends_test():
+    config = ConfigParser()
+    config.read("config.ini")
+    input_dir = config.get('directories', 'contract_directory')
+    contracts = read_json("contracts", input_dir) + read_json("summary_contracts", input_dir)
+    print("Running AST Backends Test...")
+    passed = 0
+    for ind in range(len(contracts)):
+        print("Checking on contract #", ind+1)
+        contract_name = contracts[ind]['Contract Name']
+        source_code = read_source_code(contract_name, input_dir)
+        try:
+            # parse_with_solc is called directly, generate_ast would fall back to solidity_parser on failure
+            solc_results = get_parse_results(parse_with_solc(source_code, contracts[ind]['Compiler Version']))
+            parser_results = get_parse_results(parse_with_solidity_parser(source_code, use_cache=False))
+            difference = find_difference(solc_results, parser_results)
+            if difference != None:
+                print(f"Results of {contract_name} differ at {difference}")
+            result = difference == None
+        except Exception as e:
+            print(f"Could not compare parsers on {contract_name} - {e}")
+            result = False
+        if result == True:
+            passed+=1
+    return passed, len(contracts)
+
+if __name__ == "__main__":
+    passed, total = ast_backends_test()
+    if passed < total:
+        print(f"Passed {passed} tests out of {total} tests")
+    else:
+        print("Successfully passed all ast backends tests!")
@@ -0,0 +1,58 @@
+from src.key_approx_analysis.function_summary import get_call_marks
+
+# call marks of summaries of internal helpers, i.e. transfer(to, value) calling _transfer(msg.sender, to, value)
+TRANSFER_SUMMARY = {'params': 3, 'rows': [
+    [['balances', '_from', -1, 'Argument', 0, 'regular']],
+    [['balances', '_to', -1, 'Argument', 1, 'regular']],
+]}
+STATIC_KEY = ['fees', '0x1C200fD1A330c1548e3e867e583ed2CD2fa6EA16', '0x1C200fD1A330c1548e3e867e583ed2CD2fa6EA16', 'Static', -1, 'regular']
+
+
+def check_parameter_keys():
+    # parameter keys are replaced by the call arguments
+    marks = get_call_marks([TRANSFER_SUMMARY], ['msg.sender', '_to', '_value'])
+    return marks == [['balances:i:msg.sender', {}], ['balances:i:_to', {}]]
+
+
+def check_passed_globals():
+    # msg.sender of the helper is msg.sender of the caller, whatever the arguments are
+    summary = {'params': 2, 'rows': [[['allowed', 'msg.sender', -1, 'Argument', 2, 'regular'],
+                                      ['allowed', '_spender', -1, 'Argument', 0, 'regular']]]}
+    marks = get_call_marks([summary], ['_delegate', '_amount'])
+    return marks == [['allowed:i:msg.sender:i:_delegate', {}]]
+
+
+def check_static_keys():
+    # keys not depending on the call are resolved from the summary, only the parameter key is back tracked
+    summary = {'params': 1, 'rows': [[STATIC_KEY, ['fees', '_payer', -1, 'Argument', 0, 'regular']]]}
+    marks = get_call_marks([summary], ['msg.sender'])
+    return marks == [['fees:i:summary:i:msg.sender', {0: STATIC_KEY}]]
+
+
+def check_overload_arity():
+    # only overloads with as many parameters as the call has arguments are applied
+    overload = {'params': 2, 'rows': [[['balances', '_to', -1, 'Argument', 0, 'regular']]]}
+    marks = get_call_marks([TRANSFER_SUMMARY, overload], ['_recipient', '_value'])
+    return marks == [['balances:i:_recipient', {}]] and get_call_marks([overload], ['_recipient']) == []
+
+
+def check_duplicate_marks():
+    # rows giving the same mark at the call site are applied once
+    summary = {'params': 2, 'rows': [[['balances', '_a', -1, 'Argument', 0, 'regular']],
+                                     [['balances', '_b', -1, 'Argument', 1, 'regular']]]}
+    return get_call_marks([summary], ['_to', '_to']) == [['balances:i:_to', {}]]
+
+
+def run_function_summary_test():
+    checks = [check_parameter_keys(), check_passed_globals(), check_static_keys(), check_overload_arity(),
+              check_duplicate_marks()]
+    return checks.count(True), len(checks)
+
+
+if __name__ == "__main__":
+    print("Running function summary test...")
+    passed, total = run_function_summary_test()
+    if passed < total:
+        print(f"Passed {passed} tests out of {total} tests")
+    else:
+        print("Successfully passed all function summary tests!")
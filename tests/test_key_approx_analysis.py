@@ -33,7 +33,8 @@ def key_analysis_test():
     config.read("config.ini")
     input_dir = config.get('directories', 'contract_directory')
     test_dir = config.get('test_directories', 'key_analysis_directory')
-    contracts = read_json("contracts", input_dir)
+    # summary contracts are not deployed, they check keys of callers produced through internal helper calls
+    contracts = read_json("contracts", input_dir) + read_json("summary_contracts", input_dir)
     print("Running Key Approximation Test...")
     passed = 0
     for ind in range(len(contracts)):
@@ -42,7 +43,7 @@ def key_analysis_test():
         compiler_version = contracts[int(ind)]['Compiler Version']
         source_code = read_source_code(contract_name, input_dir)
         try:
-            current_analysis_results, _ = key_approx_analyzer(contract_name, source_code, compiler_version)
+            current_analysis_results, _ = key_approx_analyzer(contract_name, source_code, compiler_version, use_cache=False)
             expected_analysis_results = read_json(contract_name, test_dir)
             result = compare_results(current_analysis_results, expected_analysis_results)
         except:
@@ -0,0 +1,48 @@
+from src.compilation import artifact_cache
+from src.state_extraction.layout_provider import get_variables_layout
+
+# compilers older than 0.5.13 have no storageLayout, their layout must be calculated without resolving a compiler
+ALL_CONTRACTS = {'Token': {'vars': [
+    {'type': 'ElementaryTypeName', 'dataType': 'uint256', 'name': 'totalSupply'},
+    {'type': 'ElementaryTypeName', 'dataType': 'address', 'name': 'owner'},
+    {'type': 'ElementaryTypeName', 'dataType': 'bool', 'name': 'paused'},
+]}}
+EXPECTED_SLOTS = [['totalSupply', 0], ['owner', 1], ['paused', 1]]
+
+
+def check_python_layout(source_code, compiler_version, mode, resolved):
+    def resolve_compiler(compiler_version, source_code=None):
+        resolved.append(compiler_version)
+        raise Exception("compiler must not be resolved")
+    resolve = artifact_cache.resolve_compiler
+    artifact_cache.resolve_compiler = resolve_compiler
+    try:
+        layout = get_variables_layout('Token', source_code, compiler_version, ALL_CONTRACTS, mode)
+    finally:
+        artifact_cache.resolve_compiler = resolve
+    return [[var['name'], var['slot']] for var in layout] == EXPECTED_SLOTS
+
+
+def run_layout_provider_test():
+    checks = []
+    for source_code, compiler_version, mode in [
+            ('pragma solidity ^0.4.24; contract Token {}', '', 'auto'),
+            ('pragma solidity ^0.4.24; contract Token {}', '0.4.16', 'auto'),
+            ('pragma solidity >=0.4.22 <0.5.0; contract Token {}', '', 'cross_check'),
+            ('pragma solidity ^0.8.0; contract Token {}', '', 'python'),
+            ('contract Token {}', '', 'auto')]:
+        resolved = []
+        checks.append(check_python_layout(source_code, compiler_version, mode, resolved) and resolved == [])
+    # compilers with storageLayout are resolved, and the layout is calculated if compilation fails
+    resolved = []
+    checks.append(check_python_layout('pragma solidity ^0.8.0; contract Token {}', '', 'auto', resolved) and resolved == [''])
+    return checks.count(True), len(checks)
+
+
+if __name__ == "__main__":
+    print("Running layout provider test...")
+    passed, total = run_layout_provider_test()
+    if passed < total:
+        print(f"Passed {passed} tests out of {total} tests")
+    else:
+        print("Successfully passed all layout provider tests!")
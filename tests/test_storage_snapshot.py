@@ -0,0 +1,103 @@
+import os
+import random
+import tempfile
+from src.state_extraction import storage_snapshot
+from src.state_extraction.storage_snapshot import StorageSnapshot, SnapshotStorageBackend, write_storage_snapshot, diff_storage_snapshots
+from src.state_extraction.storage_backend import ZERO_SLOT
+
+# storage snapshot write/lookup/diff checks on random storage, every lookup is compared with the storage dict
+CONTRACT_ADDRESS = '0x51bb7917efcad03ec8b1d37251a06cd56b0c4a72'
+SLOT_COUNT = 20000
+
+
+def generate_storage(rnd, slot_count):
+    """Generates storage with sequential slots (regular variables and arrays) and hashed slots (mappings)."""
+    storage = {}
+    for slot in range(slot_count // 2):
+        storage[slot] = rnd.getrandbits(256).to_bytes(32, 'big')
+    for _ in range(slot_count // 2):
+        storage[rnd.getrandbits(256)] = rnd.getrandbits(rnd.choice([8, 160, 256])).to_bytes(32, 'big')
+    return storage
+
+
+def check_lookups(snapshot_file, storage, rnd):
+    backend = SnapshotStorageBackend(snapshot_file)
+    # addresses are not case sensitive
+    address = CONTRACT_ADDRESS[:2] + CONTRACT_ADDRESS[2:].upper()
+    try:
+        for slot, value in storage.items():
+            if backend.get_storage(address, slot) != (value if any(value) else ZERO_SLOT):
+                return False
+        # missing slots, random ones, next to stored ones and the last slot
+        missing = [rnd.getrandbits(256) for _ in range(1000)] + [slot + 1 for slot in list(storage)[-1000:]] + [2**256 - 1]
+        for slot in missing:
+            if slot not in storage and backend.get_storage(CONTRACT_ADDRESS, slot) != ZERO_SLOT:
+                return False
+        # storage of other contracts is not in the snapshot
+        if backend.get_storage('0x' + '11' * 20, 0) != ZERO_SLOT:
+            return False
+        return backend.get_block_number() == 17000000
+    finally:
+        backend.snapshot.close()
+
+
+def check_diff(tmp_dir, storage, rnd):
+    new_storage = dict(storage)
+    changed = {}
+    for slot in rnd.sample(sorted(storage), 100):
+        new_storage[slot] = rnd.getrandbits(256).to_bytes(32, 'big')
+        changed[slot] = [storage[slot], new_storage[slot]]
+    for slot in rnd.sample(sorted(storage), 10):
+        if slot not in changed:
+            del new_storage[slot]
+            changed[slot] = [storage[slot], None]
+    new_slot = 2**255 + 7
+    new_storage[new_slot] = (1).to_bytes(32, 'big')
+    changed[new_slot] = [None, new_storage[new_slot]]
+    old_file, new_file = os.path.join(tmp_dir, 'old.snapshot'), os.path.join(tmp_dir, 'new.snapshot')
+    write_storage_snapshot(old_file, CONTRACT_ADDRESS, storage.items())
+    write_storage_snapshot(new_file, CONTRACT_ADDRESS, new_storage.items())
+    with StorageSnapshot(old_file) as old_snapshot, StorageSnapshot(new_file) as new_snapshot:
+        differences = {slot: [old_value, new_value] for slot, old_value, new_value in diff_storage_snapshots(old_snapshot, new_snapshot)}
+        return differences == changed and old_snapshot.block_number == None
+
+
+def run_storage_snapshot_test():
+    rnd = random.Random(11)
+    checks = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_file = os.path.join(tmp_dir, 'storage.snapshot')
+        sort_chunk_records = storage_snapshot.SORT_CHUNK_RECORDS
+        # small sort chunks write and merge sorted runs on disk
+        for slot_count, index_stride, chunk_records in [(0, 256, sort_chunk_records), (1, 256, sort_chunk_records),
+                (SLOT_COUNT, 256, sort_chunk_records), (SLOT_COUNT, 1, sort_chunk_records),
+                (SLOT_COUNT, 10**6, sort_chunk_records), (SLOT_COUNT, 256, 1000), (SLOT_COUNT, 100, 10)]:
+            storage = generate_storage(rnd, slot_count)
+            if slot_count > 0:
+                storage[slot_count] = bytes(32) # zero values are not stored
+            storage_snapshot.SORT_CHUNK_RECORDS = chunk_records
+            try:
+                count = write_storage_snapshot(snapshot_file, CONTRACT_ADDRESS, storage.items(), 17000000, index_stride)
+            finally:
+                storage_snapshot.SORT_CHUNK_RECORDS = sort_chunk_records
+            checks.append(count == len([value for value in storage.values() if any(value)]) and
+                          check_lookups(snapshot_file, storage, rnd) and os.listdir(tmp_dir) == ['storage.snapshot'])
+        checks.append(check_diff(tmp_dir, generate_storage(rnd, SLOT_COUNT), rnd))
+        # other files are rejected
+        with open(snapshot_file, 'wb') as f:
+            f.write(b'{"accounts": {}}')
+        try:
+            StorageSnapshot(snapshot_file)
+            checks.append(False)
+        except ValueError:
+            checks.append(True)
+    return checks.count(True), len(checks)
+
+
+if __name__ == "__main__":
+    print("Running storage snapshot test...")
+    passed, total = run_storage_snapshot_test()
+    if passed < total:
+        print(f"Passed {passed} tests out of {total} tests")
+    else:
+        print("Successfully passed all storage snapshot tests!")